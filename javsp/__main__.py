@@ -1,16 +1,17 @@
 import os
 import re
 import sys
+import copy
 import json
 import time
 import logging
 import argparse
 from PIL import Image
 from pydantic import ValidationError
-from pydantic_extra_types.pendulum_dt import Duration
 import requests
 import threading
-from typing import Dict, List
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Sized
 from enum import Enum
 
 sys.stdout.reconfigure(encoding='utf-8')
@@ -43,7 +44,21 @@ from javsp.file import *
 from javsp.func import *
 from javsp.image import *
 from javsp.datatype import Movie, MovieInfo
+from javsp.pipeline import Stage, Pipeline
+from javsp.crawler_pool import CrawlerPool, time_remaining
+from javsp.crawler_registry import CrawlerRegistry
+from javsp.crawler_cache import CrawlerCache, crawler_version
+from javsp.scan_index import ScanIndex
+from javsp.journal import RunJournal, Step, config_fingerprint, dump_info, load_info
+from javsp.store import cache_dir
+from javsp.datafiles import get_actress_index
+from javsp.blobstore import BlobStore
 from javsp.web.base import download
+from javsp.web.breaker import get_breaker
+from javsp.web.httpcache import close_http_cache
+from javsp.web.probe import rank_covers
+from javsp.web.session import log_session_stats
+from javsp.web.xpath import log_xpath_stats
 from javsp.web.exceptions import *
 from javsp.web.translate import translate_movie_info
 from javsp.avid import guess_av_type
@@ -51,66 +66,201 @@ from javsp.avid import guess_av_type
 from javsp.config import Cfg, CrawlerID, UseJavDBCover
 from javsp.prompt import prompt
 
-actressAliasMap = {}
+# 女优别名到固定名字的索引
+actressAliasIndex = {}
 
 def resolve_alias(name):
     """将别名解析为固定的名字"""
-    for fixedName, aliases in actressAliasMap.items():
-        if name in aliases:
-            return fixedName
-    return name  # 如果找不到别名对应的固定名字，则返回原名
-
-
-def import_crawlers():
-    """按配置文件的抓取器顺序将该字段转换为抓取器的函数列表"""
-    unknown_mods = []
-    for _, mods in Cfg().crawler.selection.items():
-        valid_mods = []
-        for name in mods:
-            try:
-                # 导入fc2fan抓取器的前提: 配置了fc2fan的本地路径
-                # if name == 'fc2fan' and (not os.path.isdir(Cfg().Crawler.fc2fan_local_path)):
-                #     logger.debug('由于未配置有效的fc2fan路径，已跳过该抓取器')
-                #     continue
-                import_name = 'javsp.web.' + name
-                __import__(import_name)
-                valid_mods.append(import_name)  # 抓取器有效: 使用完整模块路径，便于程序实际使用
-            except ModuleNotFoundError:
-                unknown_mods.append(name)       # 抓取器无效: 仅使用模块名，便于显示
-    if unknown_mods:
-        logger.warning('配置的抓取器无效: ' + ', '.join(unknown_mods))
+    return actressAliasIndex.get(name, name)  # 如果找不到别名对应的固定名字，则返回原名
+
+
+crawler_registry: CrawlerRegistry = None
+
+def init_crawler_registry() -> CrawlerRegistry:
+    """根据配置文件的抓取器设置创建抓取器注册表（抓取器模块会在首次需要时才导入）"""
+    global crawler_registry
+    crawler_registry = CrawlerRegistry(Cfg().crawler.selection)
+    return crawler_registry
+
+
+crawler_pool: CrawlerPool = None
+
+def init_crawler_pool() -> CrawlerPool:
+    """根据抓取器的配置创建供所有影片共用的抓取器线程池"""
+    global crawler_pool
+    # 单部影片最多同时使用的抓取器数量（cid影片还会额外尝试normal的抓取器）
+    selection = Cfg().crawler.selection
+    per_movie = max(len(mods) for _, mods in selection.items())
+    per_movie = max(per_movie, len(selection.cid) + len(selection.normal))
+    max_workers = per_movie * Cfg().pipeline.crawl_workers
+    if Cfg().crawler.max_workers:
+        max_workers = min(max_workers, Cfg().crawler.max_workers)
+    crawler_pool = CrawlerPool(max_workers)
+    logger.debug(f'抓取器线程池: {crawler_pool.max_workers}个线程')
+    return crawler_pool
+
+
+crawler_cache: CrawlerCache = None
+
+def load_cached_info(crawler_name: str, movie_id: str, info: MovieInfo) -> bool:
+    """尝试使用缓存的抓取器解析结果更新info，返回是否成功"""
+    if not (crawler_cache and Cfg().crawler.cache.enabled):
+        return False
+    ttl = Cfg().crawler.cache.ttl.total_seconds()
+    data = crawler_cache.load(crawler_name.split('.')[-1], movie_id, crawler_version(crawler_name), ttl)
+    if data is None:
+        return False
+    for k, v in data.items():
+        setattr(info, k, v)
+    return True
+
+
+def is_known_not_found(crawler_name: str, movie_id: str) -> bool:
+    """抓取器是否在近期已经确认过站点上没有此影片"""
+    ttl = Cfg().crawler.cache.not_found_ttl.total_seconds()
+    if not crawler_cache or ttl <= 0:
+        return False
+    return crawler_cache.is_not_found(crawler_name.split('.')[-1], movie_id, crawler_version(crawler_name), ttl)
+
+
+def _has_field(info: MovieInfo, attr: str) -> bool:
+    """判断info中的字段是否有值（与info_summary中选取字段时的判断标准一致）"""
+    value = getattr(info, attr, None)
+    if attr == 'uncensored':
+        return value is not None
+    return bool(value)
+
+
+def missing_keys(ordered_info: List[MovieInfo], keys) -> set:
+    """按优先级依次汇总ordered_info中的数据后，仍然没有值的字段"""
+    missing = {getattr(i, 'value', i) for i in keys}
+    for info in ordered_info:
+        missing = {i for i in missing if not _has_field(info, i)}
+        if not missing:
+            break
+    return missing
+
+
+def job_result(future: Future) -> MovieInfo | None:
+    """已完成的抓取任务的结果：抓取成功时为抓取器填充了数据的MovieInfo，否则为None"""
+    if not future.done() or future.cancelled() or future.exception() is not None:
+        return None
+    return future.result()
+
+
+def wait_jobs(futures: Dict[str, Future], timeout: float):
+    """等待所有抓取任务完成或超时（每个任务从开始运行时计时）"""
+    since = time.monotonic()
+    pending = set(futures.values())
+    while pending:
+        remaining = time_remaining(pending, timeout, since)
+        if remaining <= 0:
+            logger.debug(f'{len(pending)}个抓取任务超时')
+            break
+        _, pending = wait(pending, timeout=remaining)
+
+
+def wait_sufficient(futures: Dict[str, Future], keys, timeout: float, required=()) -> List[str]:
+    """等待抓取任务，直到按优先级排在前面的抓取器已经获取到了keys中的所有字段
+
+    info_summary仅在高优先级的数据源缺少某一字段时才会采用低优先级数据源的值，
+    因此一旦所有高优先级的抓取器都已完成且获取到了keys中的所有字段，剩余抓取器的结果已不会影响这些字段，
+    此时取消剩余的抓取任务并丢弃其结果，不再等待慢速站点。
+    required中的抓取器的结果不论优先级都会被info_summary采用（如javdb的genre），总是要等待它们完成
+
+    Args:
+        futures: 按优先级排列的各个抓取器的任务
+
+    Returns:
+        List[str]: 结果可能被采用的抓取器（保持原有的优先级顺序）
+    """
+    since = time.monotonic()
+    pending = set(futures.values())
+    names = list(futures)
+    required = [i for i in required if i in futures]
+    while pending:
+        # 找出从最高优先级开始连续已完成的抓取器
+        finished = 0
+        for name in names:
+            if not futures[name].done():
+                break
+            finished += 1
+        if finished < len(names) and all(futures[i].done() for i in required):
+            ordered = [i for i in (job_result(futures[name]) for name in names[:finished]) if i is not None]
+            if ordered and not missing_keys(ordered, keys):
+                kept = names[:finished] + [i for i in names[finished:] if i in required]
+                dropped = [i for i in names if i not in kept]
+                for name in dropped:
+                    futures[name].cancel()
+                logger.debug(f"已获取所需的全部字段，不再等待: {', '.join(dropped)}")
+                return kept
+        remaining = time_remaining(pending, timeout, since)
+        if remaining <= 0:
+            logger.debug(f'{len(pending)}个抓取任务超时')
+            break
+        _, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+    return names
 
 
 # 爬虫是IO密集型任务，可以通过多线程提升效率
 def parallel_crawler(movie: Movie, tqdm_bar=None):
-    """使用多线程抓取不同网站的数据"""
-    def wrapper(parser, info: MovieInfo, retry):
-        """对抓取器函数进行包装，便于更新提示信息和自动重试"""
-        crawler_name = threading.current_thread().name
-        task_info = f'Crawler: {crawler_name}: {info.dvdid}'
+    """使用线程池并发抓取不同网站的数据"""
+    def wrapper(crawler_name, parser, template: MovieInfo, retry, stop_event: threading.Event) -> MovieInfo | None:
+        """对抓取器函数进行包装，便于更新提示信息和自动重试
+
+        抓取器在template的副本上进行抓取，抓取成功时返回该副本。超时后仍在运行的任务不会再修改已经用于汇总的数据
+        """
+        info = copy.deepcopy(template)
+        movie_id = info.dvdid or info.cid
+        if is_known_not_found(crawler_name, movie_id):
+            logger.debug(f"{crawler_name}: 近期已确认站点上没有此影片，跳过: '{movie_id}'")
+            return
+        if load_cached_info(crawler_name, movie_id, info):
+            logger.debug(f"{crawler_name}: 使用缓存的抓取结果: '{movie_id}'")
+            return info
+        breaker = get_breaker(crawler_name)
+        if not breaker.allow():
+            logger.debug(f"{crawler_name}: 站点暂时不可用，跳过: '{movie_id}'")
+            return
         for cnt in range(retry):
+            if stop_event.is_set() or breaker.is_open:
+                break
             try:
                 parser(info)
-                movie_id = info.dvdid or info.cid
+                breaker.record_success()
                 logger.debug(f"{crawler_name}: 抓取成功: '{movie_id}': '{info.url}'")
-                setattr(info, 'success', True)
+                if crawler_cache and Cfg().crawler.cache.enabled:
+                    crawler_cache.save(crawler_name.split('.')[-1], movie_id, crawler_version(crawler_name), info)
                 if isinstance(tqdm_bar, tqdm):
                     tqdm_bar.set_description(f'{crawler_name}: 抓取完成')
-                break
+                return info
             except MovieNotFoundError as e:
+                breaker.record_success()
                 logger.debug(e)
+                if crawler_cache and Cfg().crawler.cache.not_found_ttl.total_seconds() > 0:
+                    crawler_cache.save_not_found(crawler_name.split('.')[-1], movie_id, crawler_version(crawler_name))
                 break
             except MovieDuplicateError as e:
+                breaker.record_success()
                 logger.exception(e)
                 break
-            except (SiteBlocked, SitePermissionError, CredentialError) as e:
+            except SitePermissionError as e:
+                # 缺少权限只针对个别影片，站点本身是正常的
+                breaker.record_success()
+                logger.error(e)
+                break
+            except (SiteBlocked, CredentialError) as e:
+                breaker.record_failure(trip=True)
                 logger.error(e)
                 break
             except requests.exceptions.RequestException as e:
+                breaker.record_failure()
                 logger.debug(f'{crawler_name}: 网络错误，正在重试 ({cnt+1}/{retry}): \n{repr(e)}')
                 if isinstance(tqdm_bar, tqdm):
                     tqdm_bar.set_description(f'{crawler_name}: 网络错误，正在重试')
             except Exception as e:
+                if isinstance(e, WebsiteError):
+                    breaker.record_failure()
                 logger.exception(e)
 
     # 根据影片的数据源获取对应的抓取器
@@ -124,26 +274,41 @@ def parallel_crawler(movie: Movie, tqdm_bar=None):
             i.dvdid = None
         for i in Cfg().crawler.selection.normal:
             all_info[i] = MovieInfo(movie.dvdid)
-    thread_pool = []
+    pool = crawler_pool or init_crawler_pool()
+    # 设置为True后，尚未开始的抓取任务将被取消，正在进行的任务也不再重试
+    stop_event = threading.Event()
+    futures = {}
+    registry = crawler_registry or init_crawler_registry()
     for mod_partial, info in all_info.items():
         mod = f"javsp.web.{mod_partial}"
-        parser = getattr(sys.modules[mod], 'parse_data')
-        # 将all_info中的info实例传递给parser，parser抓取完成后，info实例的值已经完成更新
-        # TODO: 抓取器如果带有parse_data_raw，说明它已经自行进行了重试处理，此时将重试次数设置为1
-        if hasattr(sys.modules[mod], 'parse_data_raw'):
-            th = threading.Thread(target=wrapper, name=mod, args=(parser, info, 1))
-        else:
-            th = threading.Thread(target=wrapper, name=mod, args=(parser, info, Cfg().network.retry))
-        th.start()
-        thread_pool.append(th)
-    # 等待所有线程结束
+        # 首次需要某个抓取器时才导入并初始化它
+        crawler = registry.get(mod_partial)
+        if crawler is None or crawler.load() is None:
+            continue
+        parser = crawler.parse_data
+        # parser在info的副本上抓取，抓取成功时任务的结果即为更新后的副本
+        # 抓取器如果带有parse_data_raw，说明它已经自行进行了重试处理，此时将重试次数设置为1
+        retry = 1 if crawler.self_retry else Cfg().network.retry
+        futures[mod_partial] = pool.submit(mod, wrapper, mod, parser, info, retry, stop_event)
+    # 等待抓取任务结束（每个任务的超时时间从它开始运行时算起，不计入在共用线程池中排队的时间）
     timeout = Cfg().network.retry * Cfg().network.timeout.total_seconds()
-    for th in thread_pool:
-        th: threading.Thread
-        th.join(timeout=timeout)
+    # cid影片需要对比两类抓取器的结果来判断影片类型；respect_site_avid需要所有站点对番号投票，
+    # 这两种情况下提前结束会改变汇总的结果，因此必须等待所有抓取器完成
+    if (Cfg().crawler.early_exit and not (movie.data_src == 'cid' and movie.dvdid)
+            and not Cfg().crawler.respect_site_avid):
+        keys = set(Cfg().crawler.required_keys) | set(Cfg().crawler.sufficient_keys)
+        # info_summary总是优先采用javdb的genre
+        kept = wait_sufficient(futures, keys, timeout, required=[CrawlerID.javdb.value])
+    else:
+        wait_jobs(futures, timeout)
+        kept = list(futures)
+    stop_event.set()
+    # 只采用已经完成并且抓取成功的站点的数据（按优先级排列）
+    results = {name: job_result(futures[name]) for name in kept}
+    all_info = {k: v for k, v in results.items() if v is not None}
     # 根据抓取结果更新影片类型判定
     if movie.data_src == 'cid' and movie.dvdid:
-        titles = [all_info[i].title for i in Cfg().crawler.selection[movie.data_src]]
+        titles = [getattr(all_info.get(i), 'title', None) for i in Cfg().crawler.selection[movie.data_src]]
         if any(titles):
             movie.dvdid = None
             all_info = {k: v for k, v in all_info.items() if k in Cfg().crawler.selection['cid']}
@@ -152,12 +317,6 @@ def parallel_crawler(movie: Movie, tqdm_bar=None):
             movie.data_src = 'normal'
             movie.cid = None
             all_info = {k: v for k, v in all_info.items() if k not in Cfg().crawler.selection['cid']}
-    # 删除抓取失败的站点对应的数据
-    all_info = {k:v for k,v in all_info.items() if hasattr(v, 'success')}
-    for info in all_info.values():
-        del info.success
-    # 删除all_info中键名中的'web.'
-    all_info = {k[4:]:v for k,v in all_info.items()}
     return all_info
 
 
@@ -223,6 +382,11 @@ def info_summary(movie: Movie, all_info: Dict[str, MovieInfo]):
     javdb_cover = getattr(all_info.get('javdb'), 'cover', None)
     javdb_big_cover = getattr(all_info.get('javdb'), 'big_cover', None)
     
+    # 下载封面时，fallback策略下的javdb封面即使分辨率更高也排在其他封面之后
+    fallback_covers = []
+    if Cfg().crawler.use_javdb_cover == UseJavDBCover.fallback:
+        fallback_covers = [i for i in (javdb_cover, javdb_big_cover) if i]
+
     # 处理普通封面
     if javdb_cover is not None and javdb_cover in covers:
         match Cfg().crawler.use_javdb_cover:
@@ -245,6 +409,7 @@ def info_summary(movie: Movie, all_info: Dict[str, MovieInfo]):
 
     setattr(final_info, 'covers', covers)
     setattr(final_info, 'big_covers', big_covers)
+    setattr(final_info, 'fallback_covers', fallback_covers)
     # 对cover和big_cover赋值，避免后续检查必须字段时出错
     # 优先使用高清封面作为默认封面
     if big_covers:
@@ -585,146 +750,286 @@ def process_poster(movie: Movie):
             fanart_cropped = add_label_to_poster(fanart_cropped, UNCENSORED_MARK_FILE, LabelPostion.BOTTOM_LEFT)
     fanart_cropped.save(movie.poster_file)
 
-def RunNormalMode(all_movies):
-    """普通整理模式"""
-    def check_step(result, msg='步骤错误'):
-        """检查一个整理步骤的结果，并负责更新tqdm的进度"""
-        if result:
-            inner_bar.update()
-        else:
-            raise Exception(msg + '\n')
+image_store: BlobStore = None
 
-    outer_bar = tqdm(all_movies, desc='整理影片', ascii=True, leave=False)
-    total_step = 6
-    if Cfg().translator.engine:
-        total_step += 1
-    if Cfg().summarizer.extra_fanarts.enabled:
-        total_step += 1
+def download_image(url: str, dst: str, desc=None, hardlink=True) -> dict:
+    """下载图片，如果图片存储中已经有此url的图片，则直接使用存储中的图片
 
-    return_movies = []
-    for movie in outer_bar:
+    之后可能被就地修改的图片（如封面）应将hardlink设置为False，避免修改到存储中的图片
+    """
+    if image_store:
+        info = image_store.fetch(url, dst, hardlink)
+        if info:
+            return info
+    return download(url, dst, desc=desc)
+
+
+def store_image(url: str, path: str, hardlink=True):
+    """将已下载并检查过的图片加入图片存储"""
+    if image_store and url.startswith('http'):
         try:
-            # 初始化本次循环要整理影片任务
-            filenames = [os.path.split(i)[1] for i in movie.files]
-            logger.info('正在整理: ' + ', '.join(filenames))
-            inner_bar = tqdm(total=total_step, desc='步骤', ascii=True, leave=False)
-            # 依次执行各个步骤
-            inner_bar.set_description(f'启动并发任务')
-            all_info = parallel_crawler(movie, inner_bar)
+            image_store.add(url, path, hardlink)
+        except OSError as e:
+            logger.debug(f"无法将图片加入存储: {e!r}")
+
+
+def download_extrafanart(pic_id: int, pic_url: str, dst: str) -> bool:
+    """下载并检查单张剧照，失败时单独重试"""
+    for cnt in range(Cfg().network.retry):
+        try:
+            info = download_image(pic_url, dst, desc=f'剧照{pic_id}')
+            if not valid_pic(dst):
+                logger.debug(f"剧照{pic_id}无效或已损坏: '{pic_url}'")
+                continue
+            store_image(pic_url, dst)
+            filesize = get_fmt_size(dst)
+            width, height = get_pic_size(dst)
+            elapsed = time.strftime("%M:%S", time.gmtime(info['elapsed']))
+            speed = get_fmt_size(info['rate']) + '/s'
+            logger.info(f"已下载剧照{pic_url} {pic_id}.png: {width}x{height}, {filesize} [{elapsed}, {speed}]")
+            return True
+        except requests.exceptions.HTTPError as e:
+            # 图片不存在时重试也没有意义
+            logger.debug(e)
+            break
+        except Exception as e:
+            logger.debug(f"下载剧照{pic_id}出错 ({cnt+1}/{Cfg().network.retry}): {e!r}")
+    logger.warning(f"下载剧照{pic_id}失败: {pic_url}")
+    return False
+
+
+def download_extrafanarts(movie: Movie) -> int:
+    """并发下载影片的所有剧照（对各个主机的请求仍然受限速规则约束），返回下载成功的数量"""
+    extrafanartdir = movie.save_dir + '/extrafanart'
+    os.makedirs(extrafanartdir, exist_ok=True)
+    workers = min(Cfg().summarizer.extra_fanarts.concurrency, len(movie.info.preview_pics))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='extrafanart') as executor:
+        futures = []
+        for (id, pic_url) in enumerate(movie.info.preview_pics):
+            logger.debug(f"Downloading extrafanart {id} from url: {pic_url}")
+            fanart_destination = f"{extrafanartdir}/{id}.png"
+            futures.append(executor.submit(download_extrafanart, id, pic_url, fanart_destination))
+        success = sum(1 for f in futures if f.result())
+    if success < len(futures):
+        logger.warning(f"{len(futures) - success}/{len(futures)}张剧照下载失败: {movie!r}")
+    return success
+
+
+def check_step(result, msg='步骤错误'):
+    """检查一个整理步骤的结果，失败时抛出异常以中止该影片后续的步骤"""
+    if not result:
+        raise Exception(msg + '\n')
+
+
+journal: RunJournal = None
+
+def journal_load(movie: Movie, step: Step):
+    """获取影片在上次运行中已完成的步骤的结果（未启用断点续传时总是返回None）"""
+    if journal:
+        return journal.load(movie, step)
+
+
+def journal_record(movie: Movie, step: Step, data=None):
+    """记录影片完成了某一步骤"""
+    if journal:
+        journal.record(movie, step, data)
+
+
+def _movie_state(movie: Movie) -> dict:
+    return {'dvdid': movie.dvdid, 'cid': movie.cid, 'data_src': movie.data_src}
+
+
+def _restore_movie_state(movie: Movie, state: dict):
+    for k, v in state.items():
+        setattr(movie, k, v)
+
+
+def crawl_stage(movie: Movie):
+    """流水线阶段: 抓取、汇总、翻译影片数据并生成文件名"""
+    filenames = [os.path.split(i)[1] for i in movie.files]
+    logger.info('正在整理: ' + ', '.join(filenames))
+    translated = journal_load(movie, Step.translated)
+    summarized = translated or journal_load(movie, Step.summarized)
+    if summarized:
+        logger.info(f'从上次中断处继续整理: {movie!r}')
+        _restore_movie_state(movie, summarized['movie'])
+        movie.info = load_info(summarized['info'])
+    else:
+        crawled = journal_load(movie, Step.crawled)
+        if crawled:
+            _restore_movie_state(movie, crawled['movie'])
+            all_info = {k: load_info(v) for k, v in crawled['all_info'].items()}
+        else:
+            all_info = parallel_crawler(movie)
             msg = f'为其配置的{len(Cfg().crawler.selection[movie.data_src])}个抓取器均未获取到影片信息'
             check_step(all_info, msg)
+            journal_record(movie, Step.crawled, {
+                'movie': _movie_state(movie),
+                'all_info': {k: dump_info(v) for k, v in all_info.items()}})
+
+        has_required_keys = info_summary(movie, all_info)
+        check_step(has_required_keys)
+        journal_record(movie, Step.summarized, {'movie': _movie_state(movie), 'info': dump_info(movie.info)})
+
+    if Cfg().translator.engine and not translated:
+        success = translate_movie_info(movie.info)
+        check_step(success)
+        journal_record(movie, Step.translated, {'movie': _movie_state(movie), 'info': dump_info(movie.info)})
+
+    generate_names(movie)
+    check_step(movie.save_dir, '无法按命名规则生成目标文件夹')
+    if not os.path.exists(movie.save_dir):
+        os.makedirs(movie.save_dir, exist_ok=True)
+    return movie
+
+
+def image_stage(movie: Movie):
+    """流水线阶段: 下载封面、生成海报并下载剧照"""
+    cover_dl = journal_load(movie, Step.cover)
+    # 上次运行已下载的封面文件需要仍然存在才可以跳过下载
+    if not (cover_dl and os.path.exists(cover_dl[1])):
+        # 从旧的运行记录中恢复的数据可能没有fallback_covers
+        fallback = getattr(movie.info, 'fallback_covers', [])
+        if Cfg().summarizer.cover.highres:
+            cover_dl = download_cover(movie.info.covers, movie.fanart_file, movie.info.big_covers, fallback)
+        else:
+            cover_dl = download_cover(movie.info.covers, movie.fanart_file, fallback=fallback)
+        check_step(cover_dl, '下载封面图片失败')
+        journal_record(movie, Step.cover, list(cover_dl))
+    cover, pic_path = cover_dl
+    # 确保实际下载的封面的url与即将写入到movie.info中的一致
+    if cover != movie.info.cover:
+        movie.info.cover = cover
+    # 根据实际下载的封面的格式更新fanart/poster等图片的文件名
+    if pic_path != movie.fanart_file:
+        movie.fanart_file = pic_path
+        actual_ext = os.path.splitext(pic_path)[1]
+        movie.poster_file = os.path.splitext(movie.poster_file)[0] + actual_ext
+
+    if not (journal_load(movie, Step.poster) and os.path.exists(movie.poster_file)):
+        process_poster(movie)
+        journal_record(movie, Step.poster, True)
+
+    if Cfg().summarizer.extra_fanarts.enabled and movie.info.preview_pics:
+        download_extrafanarts(movie)
+    return movie
+
+
+def output_stage(movie: Movie):
+    """流水线阶段: 写入NFO并移动影片文件"""
+    if not (journal_load(movie, Step.nfo) and os.path.exists(movie.nfo_file)):
+        write_nfo(movie.info, movie.nfo_file)
+        journal_record(movie, Step.nfo, True)
+    if Cfg().summarizer.move_files:
+        movie.rename_files(Cfg().summarizer.path.hard_link)
+        logger.info(f'整理完成，相关文件已保存到: {movie.save_dir}\n')
+    else:
+        logger.info(f'刮削完成，相关文件已保存到: {movie.nfo_file}\n')
+    # 影片已整理完成，不再需要断点续传的记录
+    if journal:
+        journal.finish(movie)
+    return movie
+
+
+def RunNormalMode(all_movies):
+    """普通整理模式（all_movies也可以是边扫描边返回影片的迭代器，此时进度条的总数随之增长）"""
+    if isinstance(all_movies, Sized):
+        outer_bar = tqdm(total=len(all_movies), desc='整理影片', ascii=True, leave=False)
+    else:
+        outer_bar = tqdm(total=0, desc='整理影片', ascii=True, leave=False)
+        all_movies = _count_movies(all_movies, outer_bar)
+
+    def on_error(stage: Stage, movie: Movie, e: Exception):
+        logger.debug(e, exc_info=True)
+        logger.error(f'整理失败({stage.name}): {movie!r}: {e}')
+        outer_bar.update()
+
+    def on_done(movie: Movie):
+        outer_bar.set_description(f'已整理: {movie!r}')
+        outer_bar.update()
+
+    def on_drop(stage: Stage, movie: Movie):
+        logger.error(f'整理失败({stage.name}): {movie!r}')
+        outer_bar.update()
+
+    pipe_cfg = Cfg().pipeline
+    stages = [
+        Stage('crawl', crawl_stage, pipe_cfg.crawl_workers),
+        Stage('image', image_stage, pipe_cfg.image_workers),
+        Stage('output', output_stage, pipe_cfg.output_workers),
+    ]
+    pipeline = Pipeline(stages, queue_size=pipe_cfg.queue_size, on_error=on_error, on_done=on_done, on_drop=on_drop)
+    try:
+        return_movies = pipeline.run(all_movies)
+    finally:
+        outer_bar.close()
+        if crawler_pool:
+            crawler_pool.log_stats()
+        log_session_stats()
+        log_xpath_stats()
+    return return_movies
 
-            inner_bar.set_description('汇总数据')
-            has_required_keys = info_summary(movie, all_info)
-            check_step(has_required_keys)
 
-            if Cfg().translator.engine:
-                inner_bar.set_description('翻译影片信息')
-                success = translate_movie_info(movie.info)
-                check_step(success)
+def _count_movies(movies: Iterable[Movie], bar: tqdm) -> Iterator[Movie]:
+    for movie in movies:
+        bar.total += 1
+        bar.refresh()
+        yield movie
 
-            generate_names(movie)
-            check_step(movie.save_dir, '无法按命名规则生成目标文件夹')
-            if not os.path.exists(movie.save_dir):
-                os.makedirs(movie.save_dir, exist_ok=True)
 
-            inner_bar.set_description('下载封面图片')
-            if Cfg().summarizer.cover.highres:
-                cover_dl = download_cover(movie.info.covers, movie.fanart_file, movie.info.big_covers)
-            else:
-                cover_dl = download_cover(movie.info.covers, movie.fanart_file)
-            check_step(cover_dl, '下载封面图片失败')
-            cover, pic_path = cover_dl
-            # 确保实际下载的封面的url与即将写入到movie.info中的一致
-            if cover != movie.info.cover:
-                movie.info.cover = cover
-            # 根据实际下载的封面的格式更新fanart/poster等图片的文件名
-            if pic_path != movie.fanart_file:
-                movie.fanart_file = pic_path
-                actual_ext = os.path.splitext(pic_path)[1]
-                movie.poster_file = os.path.splitext(movie.poster_file)[0] + actual_ext
-
-            process_poster(movie)
-
-            check_step(True)
-
-            if Cfg().summarizer.extra_fanarts.enabled:
-                scrape_interval = Cfg().summarizer.extra_fanarts.scrap_interval.total_seconds()
-                inner_bar.set_description('下载剧照')
-                if movie.info.preview_pics:
-                    extrafanartdir = movie.save_dir + '/extrafanart'
-                    os.makedirs(extrafanartdir, exist_ok=True)
-                    for (id, pic_url) in enumerate(movie.info.preview_pics):
-                        inner_bar.set_description(f"Downloading extrafanart {id} from url: {pic_url}")
-                                                                                                                                
-                        fanart_destination = f"{extrafanartdir}/{id}.png"
-                        try:
-                            info = download(pic_url, fanart_destination)
-                            if valid_pic(fanart_destination):
-                                filesize = get_fmt_size(pic_path)
-                                width, height = get_pic_size(pic_path)
-                                elapsed = time.strftime("%M:%S", time.gmtime(info['elapsed']))
-                                speed = get_fmt_size(info['rate']) + '/s'
-                                logger.info(f"已下载剧照{pic_url} {id}.png: {width}x{height}, {filesize} [{elapsed}, {speed}]")
-                            else:
-                                check_step(False, f"下载剧照{id}: {pic_url}失败")
-                        except:
-                            check_step(False, f"下载剧照{id}: {pic_url}失败")
-                        time.sleep(scrape_interval)
-                check_step(True)
-
-            inner_bar.set_description('写入NFO')
-            write_nfo(movie.info, movie.nfo_file)
-            check_step(True)
-            if Cfg().summarizer.move_files:
-                inner_bar.set_description('移动影片文件')
-                movie.rename_files(Cfg().summarizer.path.hard_link)
-                check_step(True)
-                logger.info(f'整理完成，相关文件已保存到: {movie.save_dir}\n')
-            else:
-                logger.info(f'刮削完成，相关文件已保存到: {movie.nfo_file}\n')
-
-            if movie != all_movies[-1] and Cfg().crawler.sleep_after_scraping > Duration(0):
-                time.sleep(Cfg().crawler.sleep_after_scraping.total_seconds())
-            return_movies.append(movie)
-        # except Exception as e:
-        #     logger.debug(e, exc_info=True)
-        #     logger.error(f'整理失败: {e}')
-        finally:
-            inner_bar.close()
-    return return_movies
+def RunStreamingMode(root: str, scan_index: ScanIndex, mode):
+    """边扫描边整理: 每扫描完一个文件夹就将其中的影片交给流水线，而不必等待整个文件夹树遍历完成"""
+    found, filtered = 0, 0
 
+    def stream():
+        nonlocal found, filtered
+        try:
+            for movie in iter_movies(root, scan_index):
+                found += 1
+                if movie_matches_mode(movie, mode):
+                    filtered += 1
+                    yield movie
+        except Exception as e:
+            # 扫描在流水线的线程中进行，在这里记录异常，已经找到的影片仍会被整理
+            logger.debug(e, exc_info=True)
+            logger.error(f'扫描影片文件时出错: {e}')
 
-def download_cover(covers, fanart_path, big_covers=[]):
+    try:
+        RunNormalMode(stream())
+    finally:
+        if scan_index:
+            scan_index.close()
+    error_exit(found, '未找到影片文件')
+    logger.info(f'扫描影片文件：共找到 {found} 部影片')
+    report_filtered(mode, found, filtered)
+    sys.exit(0)
+
+
+def download_cover(covers, fanart_path, big_covers=[], fallback=()):
     """下载封面图片"""
-    # 优先下载高清封面
-    for url in big_covers:
+    # 先并发探测所有候选地址，然后按排名依次下载（通常第一个就能成功），探测失败的地址排在最后但仍会尝试下载
+    for probe in rank_covers(big_covers, covers, fallback):
+        url = probe.url
         pic_path = get_pic_path(fanart_path, url)
         for _ in range(Cfg().network.retry):
             try:
-                info = download(url, pic_path)
+                # 封面会被裁剪为海报，也可能被其他工具就地修改（如添加水印），不与图片存储共用同一个文件
+                info = download_image(url, pic_path, hardlink=False)
                 if valid_pic(pic_path):
+                    store_image(url, pic_path, hardlink=False)
                     filesize = get_fmt_size(pic_path)
                     width, height = get_pic_size(pic_path)
                     elapsed = time.strftime("%M:%S", time.gmtime(info['elapsed']))
                     speed = get_fmt_size(info['rate']) + '/s'
-                    logger.info(f"已下载高清封面: {width}x{height}, {filesize} [{elapsed}, {speed}]")
-                    return (url, pic_path)
-            except requests.exceptions.HTTPError:
-                # HTTPError通常说明猜测的高清封面地址实际不可用，因此不再重试
-                break
-    # 如果没有高清封面或高清封面下载失败
-    for url in covers:
-        pic_path = get_pic_path(fanart_path, url)
-        for _ in range(Cfg().network.retry):
-            try:
-                download(url, pic_path)
-                if valid_pic(pic_path):
-                    logger.debug(f"已下载封面: '{url}'")
+                    kind = '高清封面' if url in big_covers else '封面'
+                    logger.info(f"已下载{kind}: {width}x{height}, {filesize} [{elapsed}, {speed}]")
                     return (url, pic_path)
                 else:
                     logger.debug(f"图片无效或已损坏: '{url}'，尝试更换下载地址")
                     break
+            except requests.exceptions.HTTPError:
+                # 服务器明确拒绝了请求（如404），重试也无济于事
+                break
             except Exception as e:
                 logger.debug(e, exc_info=True)
     logger.error(f"下载封面图片失败")
@@ -785,39 +1090,53 @@ def select_scrape_mode():
     return mode
 
 
-def filter_movies_by_mode(movies, mode):
-    """根据模式过滤影片列表"""
+def movie_matches_mode(movie: Movie, mode) -> bool:
+    """判断影片是否需要在指定的模式下处理"""
     if mode == ScrapeMode.AUTO:
         # 自动模式：不进行过滤，使用原有的guess_av_type逻辑
-        return movies
+        return True
     elif mode == ScrapeMode.NORMAL:
         # 普通模式：处理所有影片，不进行动漫判断
         # 根据用户反馈，普通模式下应该处理所有影片，包括可能被识别为动漫的影片
-        return movies
+        return True
     elif mode == ScrapeMode.ANIME:
         # 动漫模式：只处理动漫
-        filtered = []
-        for movie in movies:
-            avid = movie.dvdid or movie.cid
-            av_type = guess_av_type(avid)
-            if av_type == 'anime':
-                filtered.append(movie)
-            else:
-                logger.debug(f"跳过非动漫影片 (模式={mode.value}): {avid} ({av_type})")
-        return filtered
+        avid = movie.dvdid or movie.cid
+        av_type = guess_av_type(avid)
+        if av_type == 'anime':
+            return True
+        logger.debug(f"跳过非动漫影片 (模式={mode.value}): {avid} ({av_type})")
+        return False
     elif mode == ScrapeMode.WESTERN:
         # 欧美模式：只处理欧美影片
-        filtered = []
-        for movie in movies:
-            avid = movie.dvdid or movie.cid
-            av_type = guess_av_type(avid)
-            if av_type == 'western':
-                filtered.append(movie)
+        avid = movie.dvdid or movie.cid
+        av_type = guess_av_type(avid)
+        if av_type == 'western':
+            return True
+        logger.debug(f"跳过非欧美影片 (模式={mode.value}): {avid} ({av_type})")
+        return False
+    return True
+
+
+def filter_movies_by_mode(movies, mode):
+    """根据模式过滤影片列表"""
+    return [movie for movie in movies if movie_matches_mode(movie, mode)]
+
+
+def report_filtered(mode, movie_count: int, filtered_count: int):
+    """输出按模式过滤后剩余的影片数量，没有剩余影片时给出提示"""
+    if filtered_count < movie_count:
+        logger.info(f"根据模式 '{mode.value}' 过滤后，剩余 {filtered_count} 部影片")
+        if filtered_count == 0:
+            # 提供更友好的提示信息
+            if mode == ScrapeMode.ANIME:
+                logger.warning(f"没有找到动漫影片。请检查：")
+                logger.warning(f"1. 文件名是否包含动漫关键词（如ANIMATION、OVA、THE ANIMATION等）")
+                logger.warning(f"2. 文件名是否包含动漫厂商（如Queen Bee、ピンクパイナップル、nur、魔人等）")
+                logger.warning(f"3. 文件名是否包含日文字符")
+                logger.warning(f"4. 是否选择了正确的刮削模式")
             else:
-                logger.debug(f"跳过非欧美影片 (模式={mode.value}): {avid} ({av_type})")
-        return filtered
-    
-    return movies
+                logger.warning(f"没有符合模式 '{mode.value}' 的影片，程序退出")
 
 
 def error_exit(success, err_info):
@@ -827,6 +1146,14 @@ def error_exit(success, err_info):
         sys.exit(1)
 
 
+def close_stores():
+    """关闭运行日志、抓取缓存等本地数据库"""
+    for store in (journal, crawler_cache, image_store):
+        if store:
+            store.close()
+    close_http_cache()
+
+
 def entry():
     try:
         Cfg()
@@ -834,11 +1161,9 @@ def entry():
         print(e.errors())
         exit(1)
 
-    global actressAliasMap
+    global actressAliasIndex, journal, crawler_cache, image_store
     if Cfg().crawler.normalize_actress_name:
-        actressAliasFilePath = resource_path("data/actress_alias.json")
-        with open(actressAliasFilePath, "r", encoding="utf-8") as file:
-            actressAliasMap = json.load(file)
+        actressAliasIndex = get_actress_index()
 
     colorama.init(autoreset=True)
 
@@ -852,36 +1177,48 @@ def entry():
     
     root = get_scan_dir(Cfg().scanner.input_directory)
     error_exit(root, '未选择要扫描的文件夹')
-    # 导入抓取器，必须在chdir之前
-    import_crawlers()
+    init_crawler_registry()
+    init_crawler_pool()
+    # 在切换到扫描目录之前确定缓存文件夹，之后按需创建的数据库（如网页缓存）也会使用同一个文件夹
+    cache_dir()
+    # 影片数据的缓存和“站点上没有此影片”的记录使用同一个数据库，两者可以分别启用
+    if Cfg().crawler.cache.enabled or Cfg().crawler.cache.not_found_ttl.total_seconds() > 0:
+        crawler_cache = CrawlerCache(os.path.join(cache_dir(), 'crawler.db'))
+    if Cfg().summarizer.image_store.enabled:
+        store_path = Cfg().summarizer.image_store.path or os.path.join(cache_dir(), 'images')
+        image_store = BlobStore(os.path.abspath(store_path))
+    if Cfg().other.resume:
+        journal = RunJournal(os.path.join(cache_dir(), 'journal.db'), config_fingerprint())
+        pending = journal.pending_count()
+        if pending:
+            logger.info(f'上次运行有{pending}部影片未整理完成，将从中断处继续')
+    # 抓取器在整理时才按需导入，导入时会读取的路径（如fc2fan_local_path）已在加载配置时转换为绝对路径
     os.chdir(root)
 
-    print(f'扫描影片文件...')
-    recognized = scan_movies(root)
-    movie_count = len(recognized)
-    recognize_fail = []
-    error_exit(movie_count, '未找到影片文件')
-    logger.info(f'扫描影片文件：共找到 {movie_count} 部影片')
-    
-    # 根据模式过滤影片
-    filtered_movies = filter_movies_by_mode(recognized, mode)
-    filtered_count = len(filtered_movies)
-    
-    if filtered_count < movie_count:
-        logger.info(f"根据模式 '{mode.value}' 过滤后，剩余 {filtered_count} 部影片")
-        if filtered_count == 0:
-            # 提供更友好的提示信息
-            if mode == ScrapeMode.ANIME:
-                logger.warning(f"没有找到动漫影片。请检查：")
-                logger.warning(f"1. 文件名是否包含动漫关键词（如ANIMATION、OVA、THE ANIMATION等）")
-                logger.warning(f"2. 文件名是否包含动漫厂商（如Queen Bee、ピンクパイナップル、nur、魔人等）")
-                logger.warning(f"3. 文件名是否包含日文字符")
-                logger.warning(f"4. 是否选择了正确的刮削模式")
-            else:
-                logger.warning(f"没有符合模式 '{mode.value}' 的影片，程序退出")
+    try:
+        print(f'扫描影片文件...')
+        scan_index = None
+        if Cfg().scanner.incremental:
+            scan_index = ScanIndex(os.path.join(cache_dir(), 'scan.db'))
+        if Cfg().scanner.streaming:
+            RunStreamingMode(root, scan_index, mode)
+        recognized = scan_movies(root, scan_index)
+        if scan_index:
+            scan_index.close()
+        movie_count = len(recognized)
+        recognize_fail = []
+        error_exit(movie_count, '未找到影片文件')
+        logger.info(f'扫描影片文件：共找到 {movie_count} 部影片')
+
+        # 根据模式过滤影片
+        filtered_movies = filter_movies_by_mode(recognized, mode)
+        report_filtered(mode, movie_count, len(filtered_movies))
+        if not filtered_movies:
             sys.exit(0)
-    
-    RunNormalMode(filtered_movies + recognize_fail)
+
+        RunNormalMode(filtered_movies + recognize_fail)
+    finally:
+        close_stores()
 
     sys.exit(0)
 
@@ -0,0 +1,138 @@
+"""按内容寻址的图片存储，在不同影片之间复用相同的图片"""
+# 重新整理、重新刮削，或者同一影片有多个版本时，相同的封面和剧照会被反复下载并在每个影片文件夹中各保存一份。
+# 这里将下载过的图片按内容的SHA-256保存到一个公共的文件夹中，并记录图片URL与内容哈希的对应关系：
+# 再次需要同一URL的图片时直接从存储中取出，优先使用硬链接（不占用额外空间），其次使用reflink（写时复制），
+# 都不支持时（例如跨越了不同的文件系统）才复制文件。
+# 硬链接与存储中的文件是同一个文件，就地修改（如裁剪、添加水印）会同时改变存储中的图片，
+# 因此之后可能被修改的图片（如封面）不使用硬链接
+import os
+import sys
+import time
+import shutil
+import hashlib
+import logging
+import threading
+
+from javsp.store import SqliteStore
+
+
+__all__ = ['BlobStore', 'link_or_copy']
+
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    time REAL NOT NULL
+);
+'''
+
+# Linux上用于reflink的ioctl请求码
+_FICLONE = 0x40049409
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """尝试以reflink（写时复制）方式复制文件，不支持时返回False"""
+    if not sys.platform.startswith('linux'):
+        return False
+    import fcntl
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+
+
+def link_or_copy(src: str, dst: str, hardlink=True) -> str:
+    """将src放置到dst（dst已存在时会被覆盖），返回实际使用的方式: 'hardlink', 'reflink'或'copy'
+
+    hardlink为False时不使用硬链接，dst之后被就地修改也不会影响src
+    """
+    # 临时文件名包含进程和线程的id，多个线程同时放置同一个文件时互不干扰
+    tmp = f'{dst}.{os.getpid()}-{threading.get_ident()}.tmp'
+    method = None
+    try:
+        if hardlink:
+            try:
+                os.link(src, tmp)
+                method = 'hardlink'
+            except OSError:
+                pass
+        if method is None:
+            if _reflink(src, tmp):
+                method = 'reflink'
+            else:
+                shutil.copyfile(src, tmp)
+                method = 'copy'
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return method
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BlobStore():
+    """按内容寻址的图片存储"""
+    def __init__(self, root: str) -> None:
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.index = SqliteStore(os.path.join(root, 'index.db'), _SCHEMA)
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def fetch(self, url: str, dst: str, hardlink=True) -> dict | None:
+        """如果存储中有url对应的图片，则将其放置到dst并返回与download()相同格式的统计信息，否则返回None
+
+        dst之后可能被就地修改时应将hardlink设置为False
+        """
+        rows = self.index.query('SELECT hash, size FROM urls WHERE url=?', (url,))
+        if not rows:
+            return None
+        digest, size = rows[0]
+        blob = self.blob_path(digest)
+        if not os.path.exists(blob) or os.path.getsize(blob) != size:
+            # 存储中的文件已丢失或被修改
+            self.index.execute('DELETE FROM urls WHERE url=?', (url,))
+            return None
+        start = time.perf_counter()
+        method = link_or_copy(blob, dst, hardlink)
+        elapsed = time.perf_counter() - start
+        logger.debug(f"使用已存储的图片({method}): {url}")
+        return {'total': size, 'elapsed': elapsed, 'rate': size / elapsed if elapsed > 0 else 0}
+
+    def add(self, url: str, path: str, hardlink=True) -> str:
+        """将已下载到path的url的图片加入存储，并将path替换为指向存储的链接（内容相同的图片只保存一份），返回内容哈希
+
+        hardlink为False时存储中的文件与path是相互独立的副本（path之后可能被就地修改）
+        """
+        digest = _file_hash(path)
+        blob = self.blob_path(digest)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            link_or_copy(path, blob, hardlink)
+        elif hardlink and not os.path.samefile(blob, path):
+            # 相同内容的图片已经存在（例如来自其他URL），让path也指向它以节省空间
+            link_or_copy(blob, path)
+        self.index.execute('INSERT OR REPLACE INTO urls (url, hash, size, time) VALUES (?, ?, ?, ?)',
+                           (url, digest, os.path.getsize(blob), time.time()))
+        return digest
+
+    def close(self):
+        self.index.close()
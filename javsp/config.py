@@ -1,20 +1,26 @@
+import logging
 from argparse import ArgumentParser, RawTextHelpFormatter
 from enum import Enum
 from typing import Dict, List, Literal, TypeAlias, Union
 from confz import BaseConfig, CLArgSource, EnvSource, FileSource
-from pydantic import ByteSize, Field, NonNegativeInt, PositiveInt
+from pydantic import ByteSize, Field, NonNegativeInt, PositiveInt, field_validator, model_validator
 from pydantic_extra_types.pendulum_dt import Duration
 from pydantic_core import Url
 from pathlib import Path
 
 from javsp.lib import resource_path
 
+logger = logging.getLogger(__name__)
+
 class Scanner(BaseConfig):
     ignored_id_pattern: List[str]
     input_directory: Path | None = None
     filename_extensions: List[str]
     ignored_folder_name_pattern: List[str]
     minimum_size: ByteSize
+    incremental: bool = True
+    workers: NonNegativeInt = 0
+    streaming: bool = False
 
 class CrawlerID(str, Enum):
     airav = 'airav'
@@ -37,11 +43,26 @@ class CrawlerID(str, Enum):
     arzon = 'arzon'
     arzon_iv = 'arzon_iv'
 
+class RateLimit(BaseConfig):
+    default_interval: Duration = Duration()
+    burst: PositiveInt = 1
+    crawler: Dict[CrawlerID, Duration] = {}
+    host: Dict[str, Duration] = {}
+
+class HttpCache(BaseConfig):
+    enabled: bool = True
+    default_ttl: Duration = Duration(days=1)
+    crawler: Dict[CrawlerID, Duration] = {}
+    max_size: ByteSize = ByteSize(512 * 1024 * 1024)
+
 class Network(BaseConfig):
     proxy_server: Url | None
     retry: NonNegativeInt = 3
     timeout: Duration
     proxy_free: Dict[CrawlerID, Url]
+    rate_limit: RateLimit = RateLimit()
+    http_cache: HttpCache = HttpCache()
+    connections_per_host: NonNegativeInt = 0
 
 class CrawlerSelect(BaseConfig):
     def items(self) -> List[tuple[str, list[CrawlerID]]]:
@@ -112,15 +133,34 @@ class UseJavDBCover(str, Enum):
     no = "no"
     fallback = "fallback"
 
+class CrawlerCache(BaseConfig):
+    enabled: bool = True
+    ttl: Duration = Duration(days=30)
+    not_found_ttl: Duration = Duration(days=14)
+
+class CircuitBreaker(BaseConfig):
+    failure_threshold: PositiveInt = 5
+    cooldown: Duration = Duration(minutes=10)
+
 class Crawler(BaseConfig):
     selection: CrawlerSelect
     required_keys: list[MovieInfoField]
     hardworking: bool
     respect_site_avid: bool
     fc2fan_local_path: Path | None
-    sleep_after_scraping: Duration
     use_javdb_cover: UseJavDBCover
     normalize_actress_name: bool
+    max_workers: NonNegativeInt = 0
+    early_exit: bool = False
+    sufficient_keys: list[MovieInfoField] = []
+    cache: CrawlerCache = CrawlerCache()
+    circuit_breaker: CircuitBreaker = CircuitBreaker()
+
+    @field_validator('fc2fan_local_path')
+    @classmethod
+    def _absolute_path(cls, path: Path | None) -> Path | None:
+        # 抓取器在切换到扫描目录之后才导入，相对路径需要在加载配置时（切换目录之前）转换为绝对路径
+        return path.absolute() if path else path
 
 class MovieDefault(BaseConfig):
     title: str
@@ -149,7 +189,7 @@ class NFOSummarize(BaseConfig):
 
 class ExtraFanartSummarize(BaseConfig):
     enabled: bool
-    scrap_interval: Duration
+    concurrency: PositiveInt = 4
 
 class SlimefaceEngine(BaseConfig):
     name: Literal['slimeface']
@@ -167,6 +207,10 @@ class CoverSummarize(BaseConfig):
 class FanartSummarize(BaseConfig):
     basename_pattern: str
 
+class ImageStore(BaseConfig):
+    enabled: bool = False
+    path: Path | None = None
+
 class Summarizer(BaseConfig):
     default: MovieDefault
     censor_options_representation: list[str]
@@ -177,6 +221,7 @@ class Summarizer(BaseConfig):
     cover: CoverSummarize
     fanart: FanartSummarize
     extra_fanarts: ExtraFanartSummarize
+    image_store: ImageStore = ImageStore()
 
 class BaiduTranslateEngine(BaseConfig):
     name: Literal['baidu']
@@ -221,6 +266,14 @@ class Other(BaseConfig):
     check_update: bool
     auto_update: bool
     default_mode: str = 'auto'
+    resume: bool = True
+    cache_dir: Path | None = None
+
+class Pipeline(BaseConfig):
+    crawl_workers: PositiveInt = 1
+    image_workers: PositiveInt = 2
+    output_workers: PositiveInt = 1
+    queue_size: PositiveInt = 4
 
 def get_config_source():
     parser = ArgumentParser(prog='JavSP', description='汇总多站点数据的AV元数据刮削器', formatter_class=RawTextHelpFormatter)
@@ -242,9 +295,37 @@ class Cfg(BaseConfig):
     crawler: Crawler
     summarizer: Summarizer
     translator: Translator
+    pipeline: Pipeline = Pipeline()
     other: Other
     _args, CONFIG_SOURCES = get_config_source()
-    
+
+    @model_validator(mode='before')
+    @classmethod
+    def _migrate_removed_keys(cls, data):
+        """将旧版本配置文件中已移除的配置项转换为新的配置项，无法转换时提示用户"""
+        if not isinstance(data, dict):
+            return data
+        crawler = data.get('crawler')
+        if isinstance(crawler, dict) and 'sleep_after_scraping' in crawler:
+            crawler = data['crawler'] = dict(crawler)
+            interval = crawler.pop('sleep_after_scraping')
+            network = data['network'] = dict(data.get('network') or {})
+            rate_limit = network['rate_limit'] = dict(network.get('rate_limit') or {})
+            if 'crawler' in rate_limit:
+                logger.warning("配置项'crawler.sleep_after_scraping'已移除，将使用'network.rate_limit.crawler'的设置")
+            else:
+                # 与tools/config_migration.py相同：原本的等待主要是为了避免被javdb/javlib限制访问
+                rate_limit['crawler'] = {'javdb': interval, 'javlib': interval}
+                logger.warning("配置项'crawler.sleep_after_scraping'已移除，已将其转换为javdb和javlib的请求间隔"
+                               "（'network.rate_limit.crawler'），请更新配置文件")
+        extra_fanarts = (data.get('summarizer') or {}).get('extra_fanarts')
+        if isinstance(extra_fanarts, dict) and 'scrap_interval' in extra_fanarts:
+            summarizer = data['summarizer'] = dict(data['summarizer'])
+            summarizer['extra_fanarts'] = {k: v for k, v in extra_fanarts.items() if k != 'scrap_interval'}
+            logger.warning("配置项'summarizer.extra_fanarts.scrap_interval'已移除，"
+                           "请使用'network.rate_limit.host'设置图片站点的请求间隔")
+        return data
+
     @property
     def mode_arg(self):
         """获取命令行中的模式参数"""
@@ -0,0 +1,124 @@
+"""按(抓取器, 番号)缓存抓取器解析出的影片数据"""
+# 网页缓存只能省去网络请求，每次仍然需要解析网页。这里直接保存各个抓取器解析得到的MovieInfo，
+# 再次整理同一批影片（例如调整了use_javdb_cover或抓取器的优先级后重新生成元数据）时，
+# 不需要任何网络请求和网页解析即可重新汇总数据。
+# 抓取器的代码更新后，解析结果可能会有所不同，因此每条缓存都记录了生成它的抓取器的版本，版本不一致时缓存失效。
+# 解析结果还取决于各抓取器共用的解析代码和数据文件（如genre映射表），它们的改动同样会使所有缓存失效。
+# 此外还记录了哪些番号在哪些站点上不存在（data为NULL），在有效期内不再向这些站点发送请求
+import sys
+import json
+import time
+import hashlib
+import logging
+import threading
+
+from javsp.store import SqliteStore
+from javsp.datatype import MovieInfo
+from javsp.datafiles import data_digest
+
+
+__all__ = ['crawler_version', 'shared_version', 'CrawlerCache']
+
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    crawler TEXT NOT NULL,
+    avid TEXT NOT NULL,
+    version TEXT NOT NULL,
+    data TEXT,
+    time REAL NOT NULL,
+    PRIMARY KEY (crawler, avid)
+);
+'''
+
+
+# 缓存格式或者无法通过源码哈希反映的解析逻辑发生变化时，递增此值使所有缓存失效
+CACHE_VERSION = 1
+# 所有抓取器共用的解析代码
+_SHARED_MODULES = ['javsp.web.base', 'javsp.web.base_crawler', 'javsp.web.xpath', 'javsp.datatype']
+
+
+def _source_hash(mod_name: str) -> str | None:
+    """模块源码的哈希值，无法读取源码时（如打包后的程序）返回None"""
+    try:
+        __import__(mod_name)
+        with open(sys.modules[mod_name].__file__, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except (ImportError, OSError, TypeError, AttributeError):
+        return None
+
+
+_versions = {}
+_shared_version = None
+_versions_lock = threading.Lock()
+def shared_version() -> str:
+    """各抓取器共用的解析代码和数据文件的版本"""
+    global _shared_version
+    if _shared_version is None:
+        items = [str(CACHE_VERSION), data_digest()]
+        items += [_source_hash(i) or getattr(sys, 'javsp_version', 'unknown') for i in _SHARED_MODULES]
+        _shared_version = hashlib.sha1('\n'.join(items).encode('utf-8')).hexdigest()
+    return _shared_version
+
+
+def crawler_version(mod_name: str) -> str:
+    """获取抓取器模块的版本
+
+    模块定义了CACHE_VERSION时使用它，否则使用模块源码的哈希值（代码有任何改动都会使版本变化），
+    无法读取源码时（如打包后的程序）使用程序的版本号。最终的版本还包括共用的解析代码和数据文件的版本（见shared_version）
+    """
+    with _versions_lock:
+        version = _versions.get(mod_name)
+        if version is None:
+            mod = sys.modules[mod_name]
+            version = getattr(mod, 'CACHE_VERSION', None)
+            if version is None:
+                version = _source_hash(mod_name) or getattr(sys, 'javsp_version', 'unknown')
+            combined = f'{version}\n{shared_version()}'
+            version = hashlib.sha1(combined.encode('utf-8')).hexdigest()[:12]
+            _versions[mod_name] = version
+        return version
+
+
+class CrawlerCache():
+    """抓取器解析结果的缓存"""
+    def __init__(self, path: str) -> None:
+        self.store = SqliteStore(path, _SCHEMA)
+
+    def load(self, crawler: str, avid: str, version: str, ttl: float) -> dict | None:
+        """获取缓存的解析结果（MovieInfo的属性字典），不存在、已过期或版本不一致时返回None"""
+        rows = self.store.query('SELECT version, data, time FROM results WHERE crawler=? AND avid=?', (crawler, avid))
+        if not rows:
+            return None
+        cached_version, data, stored = rows[0]
+        if data is None or cached_version != version or time.time() - stored >= ttl:
+            return None
+        return json.loads(data)
+
+    def is_not_found(self, crawler: str, avid: str, version: str, ttl: float) -> bool:
+        """在有效期内，抓取器是否已经确认过站点上没有此影片"""
+        rows = self.store.query('SELECT version, time FROM results WHERE crawler=? AND avid=? AND data IS NULL', (crawler, avid))
+        if not rows:
+            return False
+        cached_version, stored = rows[0]
+        return cached_version == version and time.time() - stored < ttl
+
+    def save_not_found(self, crawler: str, avid: str, version: str) -> None:
+        """记录站点上没有此影片"""
+        self.store.execute('INSERT OR REPLACE INTO results (crawler, avid, version, data, time) VALUES (?, ?, ?, NULL, ?)',
+                           (crawler, avid, version, time.time()))
+
+    def save(self, crawler: str, avid: str, version: str, info: MovieInfo) -> None:
+        """保存抓取器的解析结果"""
+        data = {k: v for k, v in vars(info).items() if k != 'success'}
+        self.store.execute('INSERT OR REPLACE INTO results (crawler, avid, version, data, time) VALUES (?, ?, ?, ?, ?)',
+                           (crawler, avid, version, json.dumps(data, ensure_ascii=False), time.time()))
+
+    def delete(self, crawler: str, avid: str) -> None:
+        self.store.execute('DELETE FROM results WHERE crawler=? AND avid=?', (crawler, avid))
+
+    def close(self):
+        self.store.close()
@@ -0,0 +1,103 @@
+"""供所有影片共用的抓取器线程池"""
+# 以前每部影片都要为每个抓取器创建新的线程，整理数千部影片时线程的创建和销毁开销可观，也无法限制总的并发数。
+# 这里在启动时创建一个长期存在的线程池，抓取任务以(抓取器, MovieInfo)的形式提交并返回Future，
+# 同时记录每个抓取器的排队等待时间和运行时间，便于找出拖慢整理速度的站点。
+# 线程池是所有影片共用的，任务可能要在队列中等待，因此抓取的超时时间应当从任务实际开始运行时算起
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable
+
+
+from javsp.web.throttle import crawler_context
+
+
+__all__ = ['CrawlerStats', 'CrawlerPool', 'time_remaining']
+
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlerStats():
+    """单个抓取器的任务统计"""
+    def __init__(self) -> None:
+        self.submitted = 0
+        self.finished = 0
+        self.total_wait = 0.0   # 任务在队列中等待的总时间（秒）
+        self.total_run = 0.0    # 任务实际运行的总时间（秒）
+        self.max_run = 0.0
+
+    def __repr__(self) -> str:
+        avg_wait = self.total_wait / self.finished if self.finished else 0
+        avg_run = self.total_run / self.finished if self.finished else 0
+        return (f"{self.finished}/{self.submitted} done, avg wait {avg_wait:.2f}s, "
+                f"avg run {avg_run:.2f}s, max run {self.max_run:.2f}s")
+
+
+class CrawlerPool():
+    """执行抓取任务的线程池"""
+    def __init__(self, max_workers: int) -> None:
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='crawler')
+        self._stats: Dict[str, CrawlerStats] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, crawler: str, func: Callable, *args) -> Future:
+        """提交一个抓取任务，任务在线程池中以crawler的身份运行（影响请求的限速规则等）
+
+        返回的Future带有job属性，任务开始运行后job.started为开始的时间（time.monotonic）
+        """
+        with self._lock:
+            self._stats.setdefault(crawler, CrawlerStats()).submitted += 1
+        submit_time = time.perf_counter()
+        job = SimpleNamespace(started=None)
+        future = self._executor.submit(self._run, crawler, submit_time, job, func, *args)
+        future.job = job
+        return future
+
+    def _run(self, crawler: str, submit_time: float, job: SimpleNamespace, func: Callable, *args):
+        job.started = time.monotonic()
+        start = time.perf_counter()
+        try:
+            with crawler_context(crawler):
+                return func(*args)
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                stats = self._stats[crawler]
+                stats.finished += 1
+                stats.total_wait += start - submit_time
+                stats.total_run += end - start
+                stats.max_run = max(stats.max_run, end - start)
+
+    def stats(self) -> Dict[str, CrawlerStats]:
+        """获取各个抓取器的任务统计"""
+        with self._lock:
+            return dict(self._stats)
+
+    def log_stats(self, level=logging.DEBUG):
+        """将各个抓取器的任务统计写入日志"""
+        for crawler, stats in sorted(self.stats().items()):
+            logger.log(level, f'{crawler}: {stats}')
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+def time_remaining(futures: Iterable[Future], timeout: float, since: float) -> float:
+    """距离未完成的任务全部超时还有多少秒
+
+    每个任务的超时时间从它开始运行时算起，尚未开始的任务按现在开始计算（在队列中等待的时间不计入）。
+    不是由CrawlerPool提交的任务按since（time.monotonic）开始计算
+    """
+    now = time.monotonic()
+    remaining = 0.0
+    for future in futures:
+        if future.done():
+            continue
+        job = getattr(future, 'job', None)
+        started = job.started if job else since
+        remaining = max(remaining, timeout if started is None else started + timeout - now)
+    return remaining
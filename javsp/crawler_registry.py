@@ -0,0 +1,111 @@
+"""抓取器注册表，按需导入抓取器模块"""
+# 以前启动时会导入配置的所有分类中的全部抓取器，而导入抓取器有不小的副作用: 读取GenreMap的CSV文件、
+# 为javdb/javlib/airav等站点创建cloudscraper实例、确定站点地址等。即使本次只整理普通番号的影片，
+# 也要为fc2、getchu、gyutto等抓取器付出这些开销。
+# 这里在启动时只记录各个抓取器的元数据（不导入模块），直到第一部需要某个抓取器的影片被调度时才导入并初始化它
+import time
+import logging
+import importlib
+import importlib.util
+import threading
+from types import ModuleType
+from typing import Callable, Dict, List
+
+
+__all__ = ['CrawlerInfo', 'CrawlerRegistry']
+
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlerInfo():
+    """单个抓取器的元数据"""
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.module_name = 'javsp.web.' + name
+        self.data_src: List[str] = []   # 在哪些影片类型的抓取器配置中使用
+        self.self_retry = False         # 抓取器是否自行进行重试（带有parse_data_raw）
+        self.module: ModuleType = None
+        self.error: Exception = None    # 导入失败时的异常
+        self.load_time = 0.0
+        self._lock = threading.Lock()
+        spec = importlib.util.find_spec(self.module_name)
+        self.exists = spec is not None
+        if self.exists and spec.origin:
+            # 不导入模块，直接从源码判断是否带有parse_data_raw（打包后的程序无法读取源码，导入后会再次确认）
+            try:
+                with open(spec.origin, encoding='utf-8') as f:
+                    self.self_retry = 'def parse_data_raw' in f.read()
+            except (OSError, UnicodeDecodeError):
+                pass
+
+    @property
+    def loaded(self) -> bool:
+        return self.module is not None
+
+    def load(self) -> ModuleType | None:
+        """导入并初始化抓取器模块（只在首次调用时导入），导入失败时返回None"""
+        if self.module is not None or self.error is not None:
+            return self.module
+        with self._lock:
+            if self.module is None and self.error is None:
+                start = time.perf_counter()
+                try:
+                    module = importlib.import_module(self.module_name)
+                except Exception as e:
+                    self.error = e
+                    logger.error(f"无法加载抓取器'{self.name}': {e!r}")
+                    return None
+                self.load_time = time.perf_counter() - start
+                self.self_retry = hasattr(module, 'parse_data_raw')
+                self.module = module
+                logger.debug(f"已加载抓取器'{self.name}' ({self.load_time*1000:.0f} ms)")
+        return self.module
+
+    @property
+    def parse_data(self) -> Callable:
+        return getattr(self.load(), 'parse_data')
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.loaded else ('failed' if self.error else 'pending')
+        return f"CrawlerInfo('{self.name}', data_src={self.data_src}, self_retry={self.self_retry}, {state})"
+
+
+class CrawlerRegistry():
+    """配置中用到的所有抓取器"""
+    def __init__(self, selection) -> None:
+        """
+        Args:
+            selection: 各影片类型对应的抓取器列表，即Cfg().crawler.selection
+        """
+        self.crawlers: Dict[str, CrawlerInfo] = {}
+        unknown = []
+        for data_src, names in selection.items():
+            for name in names:
+                name = str(getattr(name, 'value', name))
+                info = self.crawlers.get(name)
+                if info is None:
+                    info = CrawlerInfo(name)
+                    if not info.exists:
+                        unknown.append(name)
+                        continue
+                    self.crawlers[name] = info
+                if data_src not in info.data_src:
+                    info.data_src.append(data_src)
+        if unknown:
+            logger.warning('配置的抓取器无效: ' + ', '.join(unknown))
+
+    def get(self, name: str) -> CrawlerInfo | None:
+        return self.crawlers.get(str(getattr(name, 'value', name)))
+
+    def load(self, name: str) -> ModuleType | None:
+        """获取已初始化的抓取器模块，抓取器无效或加载失败时返回None"""
+        info = self.get(name)
+        return info.load() if info else None
+
+    def for_data_src(self, data_src: str) -> List[CrawlerInfo]:
+        return [i for i in self.crawlers.values() if data_src in i.data_src]
+
+    def loaded(self) -> List[str]:
+        """已加载的抓取器"""
+        return [name for name, info in self.crawlers.items() if info.loaded]
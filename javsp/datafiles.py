@@ -0,0 +1,221 @@
+"""将data文件夹中的数据文件预编译为二进制文件，加快启动速度"""
+# genre_*.csv（每个50~70 KB）在每个抓取器导入时都要用csv.DictReader解析一次，actress_alias.json也要在每次启动时解析，
+# 这在打包后的程序中会明显拖慢启动。这里将所有数据文件编译为一个marshal格式的二进制文件（data/javsp_data.bin），
+# 运行时只需要一次marshal.loads即可得到所有数据，并由所有抓取器共享。
+# 二进制文件中记录了每个源文件的大小、修改时间和SHA-1: 大小和修改时间不变时直接使用，
+# 否则比较SHA-1（例如打包时复制文件改变了修改时间），源文件被修改后会自动重新编译
+import os
+import csv
+import sys
+import glob
+import json
+import marshal
+import hashlib
+import logging
+import threading
+
+
+from javsp.lib import resource_path
+
+
+__all__ = ['DataBundle', 'build', 'load', 'data_digest', 'get_genre_map', 'get_actress_alias', 'get_actress_index', 'get_anime_ids',
+           'read_genre_csv', 'read_anime_ids']
+
+
+logger = logging.getLogger(__name__)
+# 二进制文件的格式版本，格式或编译方式改变时需要增加
+FORMAT_VERSION = 1
+_MAGIC = b'JAVSPDAT'
+BUNDLE_NAME = 'javsp_data.bin'
+
+
+def read_genre_csv(path: str) -> dict:
+    """读取genre映射表: {id: translate}"""
+    genres = {}
+    with open(path, newline='', encoding='utf-8-sig') as csvfile:
+        reader = csv.DictReader(csvfile)
+        try:
+            for row in reader:
+                genres[row['id']] = row['translate']
+        except UnicodeDecodeError:
+            logger.error('CSV file must be saved as UTF-8-BOM to edit is in Excel')
+        except KeyError:
+            logger.error("The columns 'id' and 'translate' must exist in the csv file")
+    return genres
+
+
+def read_anime_ids(path: str) -> list:
+    """读取动漫番号前缀列表（忽略注释和空行）"""
+    prefixes = []
+    with open(path, encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            prefix = line.split(',', 1)[0].strip().upper()
+            if prefix and prefix not in prefixes:
+                prefixes.append(prefix)
+    return prefixes
+
+
+def _sources(data_dir: str) -> dict:
+    """所有需要编译的源文件: {相对于data文件夹的文件名: 路径}"""
+    files = sorted(glob.glob(os.path.join(data_dir, 'genre_*.csv')))
+    files += [os.path.join(data_dir, i) for i in ('actress_alias.json', 'anime_ids.csv')]
+    return {os.path.basename(i): i for i in files if os.path.isfile(i)}
+
+
+def _file_sha1(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _header() -> bytes:
+    # marshal的格式与Python版本相关，因此也要记录Python版本
+    return _MAGIC + f'{FORMAT_VERSION}:{sys.version_info[0]}.{sys.version_info[1]}\n'.encode()
+
+
+class DataBundle():
+    """编译后的所有数据"""
+    def __init__(self, genre: dict, actress_alias: dict, actress_index: dict, anime_ids: list, digest: str = '') -> None:
+        self.genre = genre                  # {文件名: {id: translate}}
+        self.actress_alias = actress_alias  # {固定的名字: [别名]}
+        self.actress_index = actress_index  # {别名: 固定的名字}
+        self.anime_ids = anime_ids
+        self.digest = digest                # 所有源文件内容的摘要，任一数据文件改变时都会变化
+
+
+def _compile(sources: dict) -> dict:
+    genre, actress_alias, anime_ids = {}, {}, []
+    for name, path in sources.items():
+        if name.startswith('genre_'):
+            genre[name] = read_genre_csv(path)
+        elif name == 'actress_alias.json':
+            with open(path, 'r', encoding='utf-8') as f:
+                actress_alias = json.load(f)
+        elif name == 'anime_ids.csv':
+            anime_ids = read_anime_ids(path)
+    # 别名到固定名字的索引。同一别名出现在多个女优中时以先出现的为准
+    actress_index = {}
+    for fixed_name, aliases in actress_alias.items():
+        for alias in aliases:
+            actress_index.setdefault(alias, fixed_name)
+    stats = {}
+    for name, path in sources.items():
+        st = os.stat(path)
+        stats[name] = (st.st_size, st.st_mtime_ns, _file_sha1(path))
+    return {'sources': stats, 'genre': genre, 'actress_alias': actress_alias,
+            'actress_index': actress_index, 'anime_ids': anime_ids}
+
+
+def build(data_dir: str = None, output: str = None) -> str:
+    """编译data_dir中的数据文件，返回生成的二进制文件的路径"""
+    data_dir = data_dir or resource_path('data')
+    output = output or os.path.join(data_dir, BUNDLE_NAME)
+    data = _compile(_sources(data_dir))
+    _write(output, data)
+    return output
+
+
+def _write(output: str, data: dict):
+    tmp = output + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_header())
+        f.write(marshal.dumps(data))
+    os.replace(tmp, output)
+
+
+def _read(path: str) -> dict | None:
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read()
+    except OSError:
+        return None
+    header = _header()
+    if not raw.startswith(header):
+        return None
+    try:
+        return marshal.loads(raw[len(header):])
+    except (ValueError, EOFError, TypeError):
+        return None
+
+
+def _is_fresh(data: dict, sources: dict) -> bool:
+    """检查编译后的数据是否与源文件一致"""
+    recorded = data.get('sources', {})
+    if set(recorded) != set(sources):
+        return False
+    for name, path in sources.items():
+        size, mtime_ns, sha1 = recorded[name]
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size == size and st.st_mtime_ns == mtime_ns:
+            continue
+        if st.st_size != size or _file_sha1(path) != sha1:
+            return False
+    return True
+
+
+def _load(data_dir: str) -> DataBundle:
+    sources = _sources(data_dir)
+    path = os.path.join(data_dir, BUNDLE_NAME)
+    data = _read(path)
+    if data is None or not _is_fresh(data, sources):
+        logger.debug('数据文件已改变，重新编译: ' + path)
+        data = _compile(sources)
+        try:
+            _write(path, data)
+        except OSError as e:
+            # 程序所在的文件夹不可写时，仍然可以使用编译得到的数据，只是下次启动时还要重新编译
+            logger.debug(f'无法保存编译后的数据文件: {e!r}')
+    return DataBundle(data['genre'], data['actress_alias'], data['actress_index'], data['anime_ids'],
+                      _digest(data['sources']))
+
+
+def _digest(stats: dict) -> str:
+    """根据_compile记录的各个源文件的SHA-1计算所有数据文件的摘要"""
+    items = ''.join(f'{name}:{sha1}\n' for name, (_, _, sha1) in sorted(stats.items()))
+    return hashlib.sha1(items.encode('utf-8')).hexdigest()
+
+
+_bundle: DataBundle = None
+_bundle_lock = threading.Lock()
+def load() -> DataBundle:
+    """加载编译后的数据（只在首次调用时加载，之后所有调用方共享同一份数据）"""
+    global _bundle
+    if _bundle is None:
+        with _bundle_lock:
+            if _bundle is None:
+                _bundle = _load(resource_path('data'))
+    return _bundle
+
+
+def get_genre_map(file: str) -> dict | None:
+    """获取data文件夹中的genre映射表（如'data/genre_javbus.csv'），不是data文件夹中的文件时返回None"""
+    path = os.path.abspath(resource_path(file))
+    if os.path.dirname(path) != os.path.abspath(resource_path('data')):
+        return None
+    return load().genre.get(os.path.basename(path))
+
+
+def data_digest() -> str:
+    """所有数据文件（genre映射表、女优别名等）内容的摘要"""
+    return load().digest
+
+
+def get_actress_alias() -> dict:
+    return load().actress_alias
+
+
+def get_actress_index() -> dict:
+    return load().actress_index
+
+
+def get_anime_ids() -> list:
+    return load().anime_ids
+
+
+if __name__ == "__main__":
+    print(build())
@@ -1,6 +1,5 @@
 """定义数据类型和一些通用性的对数据类型的操作"""
 import os
-import csv
 import json
 import shutil
 import logging
@@ -8,6 +7,7 @@ from functools import cached_property
 
 from javsp.config import Cfg
 from javsp.lib import resource_path, detect_special_attr
+from javsp.datafiles import get_genre_map, read_genre_csv
 
 
 logger = logging.getLogger(__name__)
@@ -253,16 +253,10 @@ class Movie:
 class GenreMap(dict):
     """genre的映射表"""
     def __init__(self, file):
-        genres = {}
-        with open(resource_path(file), newline='', encoding='utf-8-sig') as csvfile:
-            reader = csv.DictReader(csvfile)
-            try:
-                for row in reader:
-                    genres[row['id']] = row['translate']
-            except UnicodeDecodeError:
-                logger.error('CSV file must be saved as UTF-8-BOM to edit is in Excel')
-            except KeyError:
-                logger.error("The columns 'id' and 'translate' must exist in the csv file")
+        # data文件夹中的映射表使用预编译的数据，其他位置的文件直接解析
+        genres = get_genre_map(file)
+        if genres is None:
+            genres = read_genre_csv(resource_path(file))
         self.update(genres)
 
     def map(self, ls):
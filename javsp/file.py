@@ -7,14 +7,16 @@ import logging
 import itertools
 import json
 from sys import platform
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Tuple
 
 
-__all__ = ['scan_movies', 'get_fmt_size', 'get_remaining_path_len', 'replace_illegal_chars', 'get_failed_when_scan', 'find_subtitle_in_dir']
+__all__ = ['scan_movies', 'iter_movies', 'walk_videos', 'iter_walk_videos', 'get_fmt_size', 'get_remaining_path_len', 'replace_illegal_chars', 'get_failed_when_scan', 'find_subtitle_in_dir']
 
 
 from javsp.avid import *
-from javsp.lib import re_escape
+from javsp.scan_index import ScanIndex, VideoFile
+from javsp.slices import group_slices
+from javsp.walker import list_dir, parallel_walk, preorder_key
 from javsp.config import Cfg
 from javsp.datatype import Movie
 
@@ -22,55 +24,80 @@ logger = logging.getLogger(__name__)
 failed_items = []
 
 
-def scan_movies(root: str) -> List[Movie]:
-    """获取文件夹内的所有影片的列表（自动探测同一文件夹内的分片）"""
-    # 由于实现的限制: 
-    # 1. 以数字编号最多支持10个分片，字母编号最多支持26个分片
-    # 2. 允许分片间的编号有公共的前导符（如编号01, 02, 03），因为求prefix时前导符也会算进去
+def walk_videos(root: str, recognizer: IDRecognizer, workers: int = 0) -> List[VideoFile]:
+    """遍历文件夹内的所有影片文件（包括小于minimum_size的文件）并识别番号
 
-    # 扫描所有影片文件并获取它们的番号
-    dic = {}    # avid: [abspath1, abspath2...]
-    small_videos = {}
+    文件夹在线程池中并行列出，每列出一个文件夹就立即识别其中的文件。
+    返回结果的顺序为先序遍历，同一文件夹内的文件和子文件夹均按名称排序
+    """
+    per_dir = sorted((preorder_key(root, dirpath), videos) for dirpath, videos in iter_walk_videos(root, recognizer, workers))
+    return list(itertools.chain.from_iterable(i[1] for i in per_dir))
+
+
+def iter_walk_videos(root: str, recognizer: IDRecognizer, workers: int = 0, ordered: bool = False) -> Iterator[Tuple[str, List[VideoFile]]]:
+    """与walk_videos相同，但是每列出一个文件夹就立即返回(文件夹路径, [VideoFile])
+
+    ordered为False时按完成顺序返回，为True时按先序遍历的顺序返回（参见parallel_walk）
+    """
+    extensions = {i.lower() for i in Cfg().scanner.filename_extensions}
     ignore_folder_name_pattern = re.compile('|'.join(Cfg().scanner.ignored_folder_name_pattern))
-    for dirpath, dirnames, filenames in os.walk(root):
-        for name in dirnames.copy():
-            if ignore_folder_name_pattern.match(name):
-                dirnames.remove(name)
-        for file in filenames:
-            ext = os.path.splitext(file)[1].lower()
-            if ext in Cfg().scanner.filename_extensions:
-                fullpath = os.path.join(dirpath, file)
-                # 忽略小于指定大小的文件
-                filesize = os.path.getsize(fullpath)
-                if filesize < Cfg().scanner.minimum_size:
-                    small_videos.setdefault(file, []).append(fullpath)
-                    continue
-                dvdid = get_id(fullpath)
-                cid = get_cid(fullpath)
-                # 如果文件名能匹配到cid，那么将cid视为有效id，因为此时dvdid多半是错的
-                avid = cid if cid else dvdid
-                if avid:
-                    if avid in dic:
-                        dic[avid].append(fullpath)
-                    else:
-                        dic[avid] = [fullpath]
-                else:
-                    fail = Movie('无法识别番号')
-                    fail.files = [fullpath]
-                    failed_items.append(fail)
-                    # 改为debug级别，避免输出过多错误信息
-                    logger.debug(f"无法提取影片番号: '{fullpath}'")
-    # 多分片影片容易有文件大小低于阈值的子片，进行特殊处理
-    has_avid = {}
-    for name in list(small_videos.keys()):
-        dvdid = get_id(name)
-        cid = get_cid(name)
+
+    def visit(path: str, display: str):
+        listing = list_dir(path, extensions, ignore_folder_name_pattern)
+        if listing is None:
+            return [], []
+        return [(os.path.join(path, i), os.path.join(display, i)) for i in listing.subdirs], listing.files
+
+    for dirpath, _, files in parallel_walk(root, visit, workers, ordered=ordered):
+        paths = [os.path.join(dirpath, name) for name, _ in files]
+        videos = [VideoFile(path, st.st_size, dvdid, cid) for path, (_, st), (dvdid, cid)
+                  in zip(paths, files, recognizer.recognize(paths))]
+        yield dirpath, videos
+
+
+def _iter_video_dirs(root: str, index: ScanIndex = None) -> Iterator[Tuple[str, List[VideoFile]]]:
+    """按先序遍历的顺序逐个返回每个文件夹中的影片文件，指定index时进行增量扫描"""
+    recognizer = get_recognizer()
+    if index is not None:
+        return index.iter_scan(root, recognizer, Cfg().scanner.workers, ordered=True)
+    return iter_walk_videos(root, recognizer, Cfg().scanner.workers, ordered=True)
+
+
+def _collect_videos(videos: Iterable[VideoFile], dic: Dict[str, List[str]], small_videos: Dict[str, List[str]]):
+    """按番号归类影片文件，小于指定大小的文件按文件名归入small_videos，无法识别番号的文件记录到failed_items"""
+    for fullpath, filesize, dvdid, cid in videos:
+        # 忽略小于指定大小的文件
+        if filesize < Cfg().scanner.minimum_size:
+            small_videos.setdefault(os.path.basename(fullpath), []).append(fullpath)
+            continue
+        # 如果文件名能匹配到cid，那么将cid视为有效id，因为此时dvdid多半是错的
+        avid = cid if cid else dvdid
+        if avid:
+            if avid in dic:
+                dic[avid].append(fullpath)
+            else:
+                dic[avid] = [fullpath]
+        else:
+            fail = Movie('无法识别番号')
+            fail.files = [fullpath]
+            failed_items.append(fail)
+            # 改为debug级别，避免输出过多错误信息
+            logger.debug(f"无法提取影片番号: '{fullpath}'")
+
+
+def _merge_small_videos(dic: Dict[str, List[str]], small_videos: Dict[str, List[str]], has_avid: Dict[str, str]):
+    """多分片影片容易有文件大小低于阈值的子片，将番号与dic中的影片相同的小文件合并到dic中"""
+    names = list(small_videos.keys())
+    for name, (dvdid, cid) in zip(names, get_recognizer().recognize(names)):
         avid = cid if cid else dvdid
         if avid in dic:
             dic[avid].extend(small_videos.pop(name))
         elif avid:
             has_avid[name] = avid
-    # 对于前面忽略的视频生成一个简单的提示
+
+
+def _report_small_videos(small_videos: Dict[str, List[str]], has_avid: Dict[str, str]):
+    """对于前面忽略的视频生成一个简单的提示"""
     small_videos = {k:sorted(v) for k,v in sorted(small_videos.items())}
     skipped_files = list(itertools.chain(*small_videos.values()))
     skipped_cnt = len(skipped_files)
@@ -80,8 +107,54 @@ def scan_movies(root: str) -> List[Movie]:
         else:
             logger.info(f"跳过了{skipped_cnt}个小于指定大小的视频文件")
         logger.debug('跳过的视频文件如下:\n' + '\n'.join(skipped_files))
+
+
+def _format_dup(root: str, dup: Dict[str, List[str]], reasons: Dict[str, str] = {}) -> str:
+    msg = ''
+    for avid, files in dup.items():
+        msg += f'{avid}: ({reasons[avid]})\n' if avid in reasons else f'{avid}: \n'
+        for f in files:
+            msg += ('  ' + os.path.relpath(f, root) + '\n')
+    return msg
+
+
+def _make_movie(avid: str, files: List[str]) -> Movie:
+    """由番号和（已按分片顺序排列的）文件创建Movie"""
+    src = guess_av_type(avid)
+    if src != 'cid':
+        mov = Movie(avid)
+    else:
+        mov = Movie(cid=avid)
+        # 即使初步识别为cid，也存储dvdid以供误识别时退回到dvdid模式进行抓取
+        mov.dvdid = get_id(files[0])
+    mov.files = files
+    mov.data_src = src
+    logger.debug(f'影片数据源类型: {avid}: {src}')
+    return mov
+
+
+def scan_movies(root: str, index: ScanIndex = None) -> List[Movie]:
+    """获取文件夹内的所有影片的列表（自动探测同一文件夹内的分片）
+
+    Args:
+        root (str): 要扫描的文件夹
+        index (ScanIndex, optional): 扫描索引，指定时进行增量扫描，只重新列出和识别发生了变化的文件夹
+    """
+    # 扫描所有影片文件并获取它们的番号
+    dic = {}    # avid: [abspath1, abspath2...]
+    small_videos = {}
+    recognizer = get_recognizer()
+    if index is not None:
+        videos = index.scan(root, recognizer, Cfg().scanner.workers)
+    else:
+        videos = walk_videos(root, recognizer, Cfg().scanner.workers)
+    _collect_videos(videos, dic, small_videos)
+    has_avid = {}
+    _merge_small_videos(dic, small_videos, has_avid)
+    _report_small_videos(small_videos, has_avid)
     # 检查是否有多部影片对应同一个番号
     non_slice_dup = {}  # avid: [abspath1, abspath2...]
+    reasons = {}        # avid: 不符合分片规则的原因
     for avid, files in dic.copy().items():
         # 一一对应的直接略过
         if len(files) == 1:
@@ -90,263 +163,78 @@ def scan_movies(root: str) -> List[Movie]:
         # 不同位置的多部影片有相同番号时，略过并报错
         if len(dirs) > 1:
             non_slice_dup[avid] = files
+            reasons[avid] = '位于不同的文件夹'
             del dic[avid]
             continue
         
-        # 特殊处理：动漫影片的多语言版本
-        # 检查是否是动漫影片（番号以ANIME:开头）
-        if avid.startswith('ANIME:'):
-            # 对于动漫影片，检查是否是不同语言版本（chs, cht等）
-            basenames = [os.path.basename(i) for i in files]
-            
-            # 检查文件名是否包含语言标记
-            language_patterns = [r'\.chs\.', r'\.cht\.', r'\.简中\.', r'\.繁中\.', r'\.简体\.', r'\.繁体\.']
-            has_language_versions = False
-            for pattern in language_patterns:
-                if any(re.search(pattern, name, re.I) for name in basenames):
-                    has_language_versions = True
-                    break
-            
-            # 检查是否是分片（包含CD, Part, 数字后缀等）
-            is_slice = False
-            slice_patterns = [
-                r'[-_\s]CD[-_\s]*\d',
-                r'[-_\s]Part[-_\s]*\d',
-                r'[-_\s]\d{1,3}\.',
-                r'[-_\s][A-Za-z]\.[a-zA-Z0-9]+$'
-            ]
-            for pattern in slice_patterns:
-                if any(re.search(pattern, name, re.I) for name in basenames):
-                    is_slice = True
-                    break
-            
-            # 如果是动漫多语言版本，保留所有文件
-            # 对于动漫多语言版本，直接接受，不进行分片识别
-            if has_language_versions and not is_slice:
-                logger.debug(f"识别为动漫多语言版本（非分片）: {avid}, 文件数: {len(files)}")
-                # 按语言版本排序：raw/mkv优先，然后chs，最后cht
-                def language_priority(filename):
-                    filename_lower = filename.lower()
-                    if '.mkv' in filename_lower and not any(p in filename_lower for p in ['.chs.', '.cht.', '.简中.', '.繁中.']):
-                        return 0  # raw版本
-                    elif '.chs.' in filename_lower or '.简中.' in filename_lower:
-                        return 1  # 简体中文
-                    elif '.cht.' in filename_lower or '.繁中.' in filename_lower:
-                        return 2  # 繁体中文
-                    else:
-                        return 3  # 其他
-                
-                files.sort(key=lambda x: language_priority(os.path.basename(x)))
-                dic[avid] = files
-                continue  # 跳过后续的分片识别逻辑
-        # 提取分片信息（改进版，支持多字符分片标识）
-        basenames = [os.path.basename(i) for i in files]
-        prefix = os.path.commonprefix(basenames)
-        
-        # 改进的正则表达式：支持多字符分片标识
-        patterns = [
-            # 模式1: 共同前缀后跟可选分隔符和数字（1-3位）
-            re_escape(prefix) + r'[-_\s]*(\d{1,3})',
-            # 模式2: 共同前缀后跟CD和数字
-            re_escape(prefix) + r'[-_\s]*CD[-_\s]*(\d{1,3})',
-            # 模式3: 共同前缀后跟单个字母
-            re_escape(prefix) + r'[-_\s]*([a-zA-Z])',
-            # 模式4: 共同前缀后跟part和数字
-            re_escape(prefix) + r'[-_\s]*PART[-_\s]*(\d{1,3})',
-        ]
-        
-        slice_numbers = []
-        postfixes = []
-        has_explicit_slice = [False] * len(basenames)
-        
-        # 第一遍：识别有明确分片标识的文件
-        for i, name in enumerate(basenames):
-            matched = False
-            for pattern in patterns:
-                try:
-                    match = re.search(pattern, name, re.I)
-                except re.error:
-                    logger.debug(f"正则识别影片分片信息时出错: '{pattern}'")
-                    continue
-                
-                if match:
-                    slice_id = match.group(1)
-                    # 提取剩余部分（分片标识之后的部分）
-                    remaining = name[match.end():]
-                    slice_numbers.append(slice_id)
-                    postfixes.append(remaining)
-                    has_explicit_slice[i] = True
-                    matched = True
-                    break
-            
-            if not matched:
-                # 暂时标记为None，第二遍处理
-                slice_numbers.append(None)
-                postfixes.append(None)
-        
-        # 第二遍：处理没有明确分片标识的文件
-        for i in range(len(basenames)):
-            if slice_numbers[i] is None:
-                name = basenames[i]
-                # 检查是否正好是共同前缀（没有分片标识）
-                if name.startswith(prefix):
-                    remaining = name[len(prefix):]
-                    # 检查是否已经有明确的分片1
-                    has_slice_1 = False
-                    for j in range(len(basenames)):
-                        if has_explicit_slice[j] and slice_numbers[j] == '1':
-                            has_slice_1 = True
-                            break
-                    
-                    if not has_slice_1:
-                        # 没有明确的分片1，假设这是分片1
-                        slice_numbers[i] = '1'
-                        postfixes[i] = remaining
-                        has_explicit_slice[i] = False  # 这是推断的，不是明确的
-                    else:
-                        # 已经有明确的分片1，这个文件无法识别
-                        logger.debug(f"无法识别分片信息: 文件 '{name}' 没有分片标识，但已有明确的分片1")
-                        slice_numbers[i] = None
-                        postfixes[i] = None
-                else:
-                    # 无法识别
-                    slice_numbers[i] = None
-                    postfixes[i] = None
-        
-        # 检查是否有None值
-        if any(x is None for x in slice_numbers):
-            # 对于动漫影片，如果没有分片标识，可能是多语言版本
-            # 为每个文件分配基于语言版本的标识符
-            if avid.startswith('ANIME:'):
-                logger.debug(f"动漫影片无分片标识，尝试按语言版本处理: {prefix=}")
-                # 重新分配slice_numbers基于语言版本
-                for i, name in enumerate(basenames):
-                    filename_lower = name.lower()
-                    if '.chs.' in filename_lower or '.简中.' in filename_lower:
-                        slice_numbers[i] = 'chs'
-                    elif '.cht.' in filename_lower or '.繁中.' in filename_lower:
-                        slice_numbers[i] = 'cht'
-                    elif '.mkv' in filename_lower and not any(p in filename_lower for p in ['.chs.', '.cht.', '.简中.', '.繁中.']):
-                        slice_numbers[i] = 'raw'
-                    else:
-                        slice_numbers[i] = f'file{i}'
-                
-                # 检查是否还有None值
-                if any(x is None for x in slice_numbers):
-                    logger.debug(f"无法识别分片信息: {prefix=}, {slice_numbers=}")
-                    non_slice_dup[avid] = files
-                    del dic[avid]
-                    continue
-            else:
-                logger.debug(f"无法识别分片信息: {prefix=}, {slice_numbers=}")
-                non_slice_dup[avid] = files
-                del dic[avid]
-                continue
-        
-        # 检查后缀是否一致
-        # 对于动漫影片，允许不同的语言版本后缀（.chs.mp4, .cht.mp4, .mkv等）
-        if len(set(postfixes)) != 1:
-            # 检查是否是动漫影片
-            if avid.startswith('ANIME:'):
-                # 对于动漫影片，检查后缀差异是否只是语言版本差异
-                # 提取所有后缀的文件扩展名部分
-                extensions = []
-                for postfix in postfixes:
-                    # 提取文件扩展名（最后一个点之后的部分）
-                    if '.' in postfix:
-                        ext = postfix[postfix.rfind('.'):].lower()
-                        extensions.append(ext)
-                    else:
-                        extensions.append('')
-                
-                # 检查扩展名是否都是视频格式
-                video_extensions = ['.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.mpg', '.mpeg']
-                all_video_ext = all(ext in video_extensions for ext in extensions)
-                
-                if all_video_ext:
-                    # 所有都是视频格式，可能是不同语言版本
-                    logger.debug(f"动漫影片允许不同的语言版本后缀: {set(postfixes)}")
-                else:
-                    logger.debug(f"无法识别分片信息: 后缀不一致 {set(postfixes)}")
-                    non_slice_dup[avid] = files
-                    del dic[avid]
-                    continue
-            else:
-                logger.debug(f"无法识别分片信息: 后缀不一致 {set(postfixes)}")
-                non_slice_dup[avid] = files
-                del dic[avid]
-                continue
-        
-        # 检查分片标识是否唯一
-        if len(slice_numbers) != len(set(slice_numbers)):
-            logger.debug(f"无法识别分片信息: 分片标识重复 {slice_numbers}")
+        group = group_slices(avid, files)
+        if group.files is None:
             non_slice_dup[avid] = files
+            reasons[avid] = group.reason
             del dic[avid]
-            continue
-        
-        # 转换分片标识为数字
-        numeric_slices = []
-        for s in slice_numbers:
-            if s.isdigit():
-                numeric_slices.append(int(s))
-            elif s.isalpha() and len(s) == 1:
-                # 字母转数字：a=1, b=2, ...
-                numeric_slices.append(ord(s.lower()) - ord('a') + 1)
-            else:
-                # 尝试提取数字部分（如CD10中的10）
-                num_match = re.search(r'(\d+)', s)
-                if num_match:
-                    numeric_slices.append(int(num_match.group(1)))
-                else:
-                    # 处理语言版本标识符（chs, cht, raw等）
-                    # 为语言版本分配固定的数字值
-                    if s.lower() == 'raw':
-                        numeric_slices.append(0)  # raw版本优先级最高
-                    elif s.lower() == 'chs':
-                        numeric_slices.append(1)  # 简体中文
-                    elif s.lower() == 'cht':
-                        numeric_slices.append(2)  # 繁体中文
-                    elif s.startswith('file'):
-                        # 文件标识符，提取数字部分
-                        file_num_match = re.search(r'file(\d+)', s.lower())
-                        if file_num_match:
-                            numeric_slices.append(int(file_num_match.group(1)) + 10)  # 从10开始
-                        else:
-                            numeric_slices.append(99)  # 默认值
-                    else:
-                        logger.debug(f"无法转换分片标识: {s}")
-                        non_slice_dup[avid] = files
-                        del dic[avid]
-        # 生成最终的分片信息
-        sorted_indices = sorted(range(len(numeric_slices)), key=lambda i: numeric_slices[i])
-        mapped_files = [files[i] for i in sorted_indices]
-        dic[avid] = mapped_files
+        else:
+            dic[avid] = group.files
 
     # 汇总输出错误提示信息
-    msg = ''
-    for avid, files in non_slice_dup.items():
-        msg += f'{avid}: \n'
-        for f in files:
-            msg += ('  ' + os.path.relpath(f, root) + '\n')
+    msg = _format_dup(root, non_slice_dup, reasons)
     if msg:
         logger.error("下列番号对应多部影片文件且不符合分片规则，已略过整理，请手动处理后重新运行脚本: \n" + msg)
     # 转换数据的组织格式
-    movies: List[Movie] = []
-    for avid, files in dic.items():
-        src = guess_av_type(avid)
-        if src != 'cid':
-            mov = Movie(avid)
-        else:
-            mov = Movie(cid=avid)
-            # 即使初步识别为cid，也存储dvdid以供误识别时退回到dvdid模式进行抓取
-            mov.dvdid = get_id(files[0])
-        mov.files = files
-        mov.data_src = src
-        logger.debug(f'影片数据源类型: {avid}: {src}')
-        movies.append(mov)
+    movies: List[Movie] = [_make_movie(avid, files) for avid, files in dic.items()]
     return movies
 
 
+def iter_movies(root: str, index: ScanIndex = None) -> Iterator[Movie]:
+    """与scan_movies相同，但是每扫描完一个文件夹就立即返回其中的影片，而不必等待整个文件夹树遍历完成
+
+    同一文件夹内的分片在该文件夹列出后即可确定，因此可以立即生成Movie。文件夹仍然是并行列出的，
+    但按先序遍历的顺序处理（一个文件夹要等到排在它前面的文件夹都列出后才会处理），因此结果是确定的，
+    影片的顺序也与scan_movies相同。与scan_movies的区别在于:
+    1. 不同文件夹中有番号相同的影片时，只返回先序遍历中第一个文件夹中的影片，其余文件夹中的影片会被略过，
+       这些番号在遍历结束后统一报错（scan_movies会略过所有这些影片）
+    2. 小于指定大小的文件只会与同一文件夹内的影片合并（scan_movies中与其他文件夹的影片番号相同的小文件
+       会导致该影片被视为跨文件夹的重复影片而略过）
+
+    Args:
+        root (str): 要扫描的文件夹
+        index (ScanIndex, optional): 扫描索引，指定时进行增量扫描
+    """
+    seen = {}           # avid: 最先找到的文件夹中的文件
+    cross_dir_dup = {}  # avid: [abspath1, abspath2...]
+    non_slice_dup = {}
+    reasons = {}
+    small_videos = {}
+    has_avid = {}
+    for _, videos in _iter_video_dirs(root, index):
+        dic, small_in_dir = {}, {}
+        _collect_videos(videos, dic, small_in_dir)
+        _merge_small_videos(dic, small_in_dir, has_avid)
+        for name, files in small_in_dir.items():
+            small_videos.setdefault(name, []).extend(files)
+        for avid, files in dic.items():
+            if avid in non_slice_dup:
+                non_slice_dup[avid].extend(files)
+                continue
+            elif avid in seen:
+                cross_dir_dup.setdefault(avid, list(seen[avid])).extend(files)
+                continue
+            seen[avid] = files
+            group = group_slices(avid, files)
+            if group.files is None:
+                non_slice_dup[avid] = files
+                reasons[avid] = group.reason
+            else:
+                yield _make_movie(avid, group.files)
+    # 在遍历结束后汇总输出提示信息
+    _report_small_videos(small_videos, has_avid)
+    msg = _format_dup(root, non_slice_dup, reasons)
+    if msg:
+        logger.error("下列番号对应多部影片文件且不符合分片规则，已略过整理，请手动处理后重新运行脚本: \n" + msg)
+    msg = _format_dup(root, cross_dir_dup)
+    if msg:
+        logger.error("下列番号在多个文件夹中都有对应的影片文件，只整理了最先找到的文件夹中的影片，请手动处理其余的文件: \n" + msg)
+
+
 def get_failed_when_scan():
     """获取扫描影片过程中无法自动识别番号的条目"""
     return failed_items
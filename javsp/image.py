@@ -1,11 +1,12 @@
 """处理本地图片的相关功能"""
 from enum import Enum
 import os
+import struct
 import logging
 from PIL import Image, ImageOps
 
 
-__all__ = ['valid_pic', 'get_pic_size', 'add_label_to_poster', 'LabelPostion']
+__all__ = ['valid_pic', 'get_pic_size', 'parse_image_size', 'add_label_to_poster', 'LabelPostion']
 
 logger = logging.getLogger(__name__)
 
@@ -50,3 +51,67 @@ def get_pic_size(pic_path):
     """获取图片文件的分辨率"""
     pic = ImageOps.exif_transpose(Image.open(pic_path))
     return pic.size
+
+
+# JPEG中携带图片尺寸的SOF标记（排除了DHT: C4, JPG: C8, DAC: CC）
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+def _jpeg_size(data: bytes):
+    pos = 2
+    length = len(data)
+    while pos + 4 <= length:
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos+1]
+        # 填充字节
+        if marker == 0xFF:
+            pos += 1
+            continue
+        # 没有长度字段的标记
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        seg_len = struct.unpack('>H', data[pos+2:pos+4])[0]
+        if marker in _JPEG_SOF:
+            if pos + 9 > length:
+                return None
+            height, width = struct.unpack('>HH', data[pos+5:pos+9])
+            return width, height
+        # 到达图像数据时还没有找到SOF
+        if marker == 0xDA:
+            return None
+        pos += 2 + seg_len
+    return None
+
+
+def _webp_size(data: bytes):
+    chunk = data[12:16]
+    if chunk == b'VP8 ' and len(data) >= 30:
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    elif chunk == b'VP8L' and len(data) >= 25:
+        bits = int.from_bytes(data[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    elif chunk == b'VP8X' and len(data) >= 30:
+        width = int.from_bytes(data[24:27], 'little') + 1
+        height = int.from_bytes(data[27:30], 'little') + 1
+        return width, height
+    return None
+
+
+def parse_image_size(data: bytes):
+    """仅根据图片文件开头的数据（JPEG的SOF、PNG的IHDR、WebP的VP8/VP8L/VP8X、GIF的逻辑屏幕描述符）解析分辨率
+
+    不需要完整的文件，也不会解码图像，数据不足或格式不支持时返回None。注意返回的是文件中存储的尺寸，不考虑EXIF中的旋转信息
+
+    Returns:
+        tuple[int, int] | None: (宽, 高)
+    """
+    if data[:2] == b'\xff\xd8':
+        return _jpeg_size(data)
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and len(data) >= 24 and data[12:16] == b'IHDR':
+        return struct.unpack('>II', data[16:24])
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return _webp_size(data)
+    if data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+        return struct.unpack('<HH', data[6:10])
+    return None
@@ -0,0 +1,141 @@
+"""记录每部影片已经完成的整理步骤，使中断后再次运行时可以从中断处继续"""
+# 整理数千部影片时，如果中途因为断网、Ctrl+C、NAS掉线等原因中断，以前只能从头开始重新抓取数据、下载封面。
+# 这里以影片文件的路径、大小和修改时间作为影片的标识，每完成一个步骤就将其结果写入数据库，
+# 再次运行时每部影片都从第一个未完成的步骤开始，已经成功的网络请求不会被重复执行。
+# 影片整理完成（文件已移动）后其记录会被删除。
+# 每条记录都附带抓取、汇总、翻译相关配置的指纹，修改了这些配置后以前的记录不再有效，打开时会被清除
+import os
+import json
+import time
+import hashlib
+import logging
+from enum import Enum
+
+from javsp.config import Cfg
+from javsp.store import SqliteStore
+from javsp.datatype import Movie, MovieInfo
+
+
+__all__ = ['Step', 'RunJournal', 'movie_key', 'config_fingerprint', 'dump_info', 'load_info']
+
+
+logger = logging.getLogger(__name__)
+
+
+class Step(str, Enum):
+    """整理影片的各个步骤（按执行顺序排列）"""
+    crawled = 'crawled'         # 已抓取各站点的数据
+    summarized = 'summarized'   # 已汇总数据
+    translated = 'translated'   # 已翻译
+    cover = 'cover'             # 已下载封面
+    poster = 'poster'           # 已生成海报
+    nfo = 'nfo'                 # 已写入NFO
+    # 移动影片文件是最后一步，完成后影片的所有记录都会被删除，因此没有对应的步骤
+
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS steps (
+    key TEXT NOT NULL,
+    step TEXT NOT NULL,
+    avid TEXT,
+    data TEXT,
+    time REAL,
+    fingerprint TEXT,
+    PRIMARY KEY (key, step)
+);
+'''
+
+
+def movie_key(movie: Movie) -> str:
+    """根据影片文件的路径、大小和修改时间生成影片的标识"""
+    items = []
+    for path in movie.files:
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+            items.append([path, st.st_size, st.st_mtime_ns])
+        except OSError:
+            items.append([path, None, None])
+    items.sort()
+    return hashlib.sha1(json.dumps(items, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def config_fingerprint() -> str:
+    """抓取、汇总、翻译相关配置的指纹，这些配置决定了各个步骤的结果"""
+    cfg = Cfg()
+    dumped = [cfg.crawler.model_dump_json(), cfg.summarizer.model_dump_json(), cfg.translator.model_dump_json()]
+    return hashlib.sha1('\n'.join(dumped).encode('utf-8')).hexdigest()
+
+
+def dump_info(info: MovieInfo) -> dict:
+    """将MovieInfo（包括汇总时附加的covers等属性）转换为可以序列化为json的字典"""
+    return dict(vars(info))
+
+
+def load_info(d: dict) -> MovieInfo:
+    """从dump_info生成的字典还原MovieInfo"""
+    info = MovieInfo(d.get('dvdid') or None, cid=None if d.get('dvdid') else d.get('cid'))
+    for k, v in d.items():
+        setattr(info, k, v)
+    return info
+
+
+class RunJournal():
+    """整理步骤的运行日志"""
+    def __init__(self, path: str, fingerprint: str = '') -> None:
+        """
+        Args:
+            path (str): 数据库文件的路径
+            fingerprint (str): 当前配置的指纹（见config_fingerprint），指纹不同的记录会被清除
+        """
+        self.store = SqliteStore(path, _SCHEMA)
+        self.fingerprint = fingerprint
+        self._keys = {}
+        cur = self.store.execute('DELETE FROM steps WHERE fingerprint IS NOT ?', (fingerprint,))
+        if cur.rowcount > 0:
+            logger.info(f'抓取/汇总/翻译的配置已修改，已清除上次运行的{cur.rowcount}条整理记录')
+
+    def key(self, movie: Movie) -> str:
+        """影片的标识（首次计算后缓存，避免文件被移动后标识发生变化）"""
+        key = self._keys.get(id(movie))
+        if key is None:
+            key = movie_key(movie)
+            self._keys[id(movie)] = key
+        return key
+
+    def record(self, movie: Movie, step: Step, data=None) -> None:
+        """记录影片完成了某一步骤，data为该步骤的结果（需要可以序列化为json）"""
+        avid = movie.dvdid or movie.cid
+        self.store.execute('INSERT OR REPLACE INTO steps (key, step, avid, data, time, fingerprint) '
+                           'VALUES (?, ?, ?, ?, ?, ?)', (self.key(movie), step.value, avid,
+                           json.dumps(data, ensure_ascii=False), time.time(), self.fingerprint))
+
+    def load(self, movie: Movie, step: Step):
+        """获取影片某一步骤的结果，步骤未完成时返回None"""
+        rows = self.store.query('SELECT data FROM steps WHERE key=? AND step=?', (self.key(movie), step.value))
+        if not rows:
+            return None
+        return json.loads(rows[0][0])
+
+    def done(self, movie: Movie, step: Step) -> bool:
+        """影片的某一步骤是否已经完成"""
+        rows = self.store.query('SELECT 1 FROM steps WHERE key=? AND step=?', (self.key(movie), step.value))
+        return bool(rows)
+
+    def steps(self, movie: Movie) -> list:
+        """影片已经完成的所有步骤"""
+        rows = self.store.query('SELECT step FROM steps WHERE key=?', (self.key(movie),))
+        done = {i[0] for i in rows}
+        return [i for i in Step if i.value in done]
+
+    def finish(self, movie: Movie) -> None:
+        """影片已整理完成，删除其所有记录"""
+        self.store.execute('DELETE FROM steps WHERE key=?', (self.key(movie),))
+        self._keys.pop(id(movie), None)
+
+    def pending_count(self) -> int:
+        """尚未整理完成的影片数量"""
+        return self.store.query('SELECT COUNT(DISTINCT key) FROM steps')[0][0]
+
+    def close(self):
+        self.store.close()
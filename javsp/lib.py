@@ -15,10 +15,12 @@ def re_escape(s: str) -> str:
     return pattern
 
 
+# 打包后的程序中资源文件位于启动时的工作目录下。记录下这个目录，使得切换工作目录后（如按需加载抓取器时）仍能找到资源文件
+_startup_dir = os.getcwd()
 def resource_path(path: str) -> str:
     """获取一个随代码打包的文件在解压后的路径"""
     if getattr(sys, "frozen", False):
-        return path
+        return os.path.join(_startup_dir, path)
     else:
         path_joined = Path(__file__).parent.parent / path
         return str(path_joined)
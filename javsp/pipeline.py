@@ -0,0 +1,123 @@
+"""按阶段流水线化地处理多部影片"""
+# 整理一部影片要依次经过抓取、下载图片、写入NFO/移动文件等步骤，这些步骤分别受限于不同的资源（站点响应、
+# 带宽、磁盘），串行处理时任一时刻只有一种资源在工作。这里将各个步骤组织为多个阶段，阶段之间通过有界队列
+# 连接，每个阶段拥有独立的工作线程，这样第N+1部影片抓取数据的同时，第N部影片可以下载图片，第N-1部影片
+# 可以写入NFO并移动文件，总耗时将趋近于最慢阶段的耗时而不是所有阶段耗时之和
+import queue
+import logging
+import threading
+from typing import Callable, Iterable, List
+
+
+__all__ = ['Stage', 'Pipeline']
+
+
+logger = logging.getLogger(__name__)
+# 用来通知工作线程退出的哨兵对象
+_STOP = object()
+
+
+class Stage():
+    """流水线中的一个阶段"""
+    def __init__(self, name: str, func: Callable, workers: int = 1) -> None:
+        """
+        Args:
+            name (str): 阶段名称，用于日志和线程命名
+            func (Callable): 处理单个条目的函数，返回值将作为下一阶段的输入；返回None或抛出异常时该条目不再向后传递
+            workers (int): 此阶段的工作线程数
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+
+
+class Pipeline():
+    """使用有界队列连接多个阶段的流水线"""
+    def __init__(self, stages: List[Stage], queue_size: int = 4,
+                 on_error: Callable = None, on_done: Callable = None, on_drop: Callable = None) -> None:
+        """
+        Args:
+            stages (List[Stage]): 按顺序执行的各个阶段
+            queue_size (int): 阶段间队列的容量，下游阻塞时上游会在队列满后等待，避免某一阶段堆积过多条目
+            on_error (Callable): 条目在某一阶段失败时的回调: on_error(stage, item, exc)
+            on_done (Callable): 条目通过所有阶段后的回调: on_done(result)
+            on_drop (Callable): 条目在某一阶段返回None（不再向后传递）时的回调: on_drop(stage, item)
+        """
+        if not stages:
+            raise ValueError('Pipeline requires at least one stage')
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.on_error = on_error
+        self.on_done = on_done
+        self.on_drop = on_drop
+
+    def run(self, items: Iterable) -> list:
+        """处理所有条目并阻塞直到完成，返回成功通过所有阶段的结果（按完成顺序）"""
+        # 第一个队列为输入队列，其后每个阶段都有一个输出队列，最后一个输出队列由当前线程消费
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads: List[List[threading.Thread]] = []
+        for i, stage in enumerate(self.stages):
+            stage_threads = []
+            for n in range(stage.workers):
+                th = threading.Thread(target=self._worker, name=f'{stage.name}-{n}',
+                                      args=(stage, queues[i], queues[i+1]), daemon=True)
+                th.start()
+                stage_threads.append(th)
+            threads.append(stage_threads)
+        feeder = threading.Thread(target=self._feed, name='pipeline-feeder',
+                                  args=(items, queues[0], len(threads[0])), daemon=True)
+        feeder.start()
+        # 每个阶段的所有工作线程都退出后，由此处向下游传递对应数量的哨兵，逐级关闭流水线
+        closer = threading.Thread(target=self._close_stages, name='pipeline-closer',
+                                  args=(threads, queues), daemon=True)
+        closer.start()
+
+        results = []
+        out = queues[-1]
+        while True:
+            # 带超时地等待，使主线程能够及时响应Ctrl+C
+            try:
+                result = out.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if result is _STOP:
+                break
+            results.append(result)
+            if self.on_done:
+                self.on_done(result)
+        return results
+
+    @staticmethod
+    def _feed(items: Iterable, in_queue: queue.Queue, consumers: int):
+        try:
+            for item in items:
+                in_queue.put(item)
+        finally:
+            for _ in range(consumers):
+                in_queue.put(_STOP)
+
+    def _close_stages(self, threads: List[List[threading.Thread]], queues: List[queue.Queue]):
+        for i, stage_threads in enumerate(threads):
+            for th in stage_threads:
+                th.join()
+            consumers = len(threads[i+1]) if i + 1 < len(threads) else 1
+            for _ in range(consumers):
+                queues[i+1].put(_STOP)
+
+    def _worker(self, stage: Stage, in_queue: queue.Queue, out_queue: queue.Queue):
+        while True:
+            item = in_queue.get()
+            if item is _STOP:
+                break
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(stage, item, e)
+                else:
+                    logger.exception(e)
+                continue
+            if result is not None:
+                out_queue.put(result)
+            elif self.on_drop:
+                self.on_drop(stage, item)
@@ -0,0 +1,259 @@
+"""影片文件的增量扫描索引"""
+# 每次运行都要遍历整个待整理文件夹、获取每个文件的大小并识别番号，对于存放在NAS上、有数万个文件的文件夹，
+# 即使自上次运行以来没有任何变化，扫描也要花费数分钟。
+# 这里将扫描结果保存在本地数据库中：每个文件夹记录其(设备号, inode, 修改时间)，每个影片文件记录其
+# (设备号, inode, 大小, 修改时间)以及识别出的番号。在文件夹中添加、删除或重命名文件都会改变文件夹的修改时间，
+# 因此再次扫描时只需要获取各个文件夹的状态：修改时间未变的文件夹直接使用索引中的文件列表，
+# 只有发生了变化的文件夹才会重新列出其内容，其中未变化的文件也不会重新识别番号。
+# 修改时间距今很近的文件夹在同一时间单位内可能还会发生变化，这样的文件夹在下次扫描时总是会重新列出
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import itertools
+from typing import Iterator, List, NamedTuple, Tuple
+
+from javsp.avid import IDRecognizer
+from javsp.config import Cfg
+from javsp.crawler_cache import crawler_version
+from javsp.store import SqliteStore
+from javsp.walker import DirListing, list_dir, parallel_walk, preorder_key
+
+
+__all__ = ['VideoFile', 'ScanIndex']
+
+
+logger = logging.getLogger(__name__)
+# 索引的格式版本，格式或扫描规则改变时需要增加
+INDEX_VERSION = 1
+# 修改时间距今小于此值（纳秒）的文件夹不记录修改时间，下次扫描时重新列出
+RACY_NS = 2 * 10**9
+
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    mtime_ns INTEGER
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    root TEXT NOT NULL,
+    dvdid TEXT NOT NULL,
+    cid TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+'''
+
+
+class VideoFile(NamedTuple):
+    """扫描到的一个影片文件"""
+    path: str       # 以扫描时传入的根文件夹开头的路径（与os.walk得到的路径形式相同）
+    size: int
+    dvdid: str
+    cid: str
+
+
+def scan_fingerprint(recognizer: IDRecognizer) -> str:
+    """影响扫描结果的配置的指纹，指纹改变时索引中的所有数据都会失效"""
+    scanner = Cfg().scanner
+    data = [INDEX_VERSION, crawler_version('javsp.avid'), list(recognizer.ignored_id_pattern),
+            sorted(recognizer.anime_prefixes), sorted(i.lower() for i in scanner.filename_extensions),
+            list(scanner.ignored_folder_name_pattern)]
+    return hashlib.sha1(json.dumps(data).encode()).hexdigest()
+
+
+class ScanIndex():
+    """影片文件的增量扫描索引"""
+    def __init__(self, path: str) -> None:
+        self.store = SqliteStore(path, _SCHEMA)
+        self.stats = {}
+
+    def scan(self, root: str, recognizer: IDRecognizer, workers: int = 0) -> List[VideoFile]:
+        """扫描文件夹内的所有影片文件（包括小于minimum_size的文件），并更新索引
+
+        返回结果的顺序为先序遍历，同一文件夹内的文件和子文件夹均按名称排序
+
+        Args:
+            root (str): 要扫描的文件夹
+            recognizer (IDRecognizer): 识别新增和变化了的文件的番号
+            workers (int): 遍历文件夹的线程数，0表示自动确定
+        """
+        per_dir = sorted((preorder_key(root, dirpath), files) for dirpath, files in self.iter_scan(root, recognizer, workers))
+        return list(itertools.chain.from_iterable(i[1] for i in per_dir))
+
+    def iter_scan(self, root: str, recognizer: IDRecognizer, workers: int = 0, ordered: bool = False) -> Iterator[Tuple[str, List[VideoFile]]]:
+        """与scan相同，但是每扫描完一个文件夹就立即返回其中的影片文件
+
+        ordered为False时按完成顺序返回，为True时按先序遍历的顺序返回（参见parallel_walk）
+
+        文件夹的状态在线程池中并行获取，数据库只在迭代此生成器的线程中访问，因此整个生成器应当在同一个线程中迭代
+
+        Yields:
+            tuple: (文件夹的显示路径, [VideoFile])
+        """
+        scanner = Cfg().scanner
+        self._extensions = {i.lower() for i in scanner.filename_extensions}
+        self._ignore_folder = re.compile('|'.join(scanner.ignored_folder_name_pattern))
+        self._minimum_size = scanner.minimum_size
+        self._recognizer = recognizer
+        self._root = root
+        self.stats = {'dirs': 0, 'listed': 0, 'files': 0, 'recognized': 0}
+        start = time.perf_counter()
+        abs_root = os.path.abspath(root)
+        conn = self.store.conn
+        # 所有更新在一个事务中完成，避免每条语句都要同步一次数据库文件。
+        # 迭代提前结束时已经完成的更新也会被提交（每个文件夹的记录都是完整的）
+        try:
+            self._check_fingerprint(conn, scan_fingerprint(recognizer))
+            # 一次性读取根文件夹下的所有记录，工作线程只读取这些数据
+            prefix = os.path.join(abs_root, '')
+            params = (abs_root, len(prefix), prefix)
+            dirs, children, file_rows = {}, {}, {}
+            for path, parent, dev, ino, mtime_ns in conn.execute(
+                    'SELECT path, parent, dev, ino, mtime_ns FROM dirs WHERE path=? OR substr(path, 1, ?)=?', params):
+                dirs[path] = (dev, ino, mtime_ns)
+                children.setdefault(parent, []).append(path)
+            for row in conn.execute('SELECT path, dir, dev, ino, size, mtime_ns, root, dvdid, cid FROM files '
+                                    'WHERE dir=? OR substr(dir, 1, ?)=?', params):
+                file_rows.setdefault(row[1], []).append(row)
+
+            def visit(path: str, display: str):
+                return self._visit(path, display, dirs, children, file_rows)
+
+            visited, failed = set(), []
+            for path, display, result in parallel_walk(abs_root, visit, workers, display=root, ordered=ordered):
+                if result is None:
+                    # 暂时无法访问（如网络共享不稳定）的文件夹仍保留在索引中，只清除其修改时间使其下次被重新列出。
+                    # 如果删除其记录，未变化的上级文件夹不会再列出它，整个子文件夹树都会一直被遗漏
+                    failed.append(path)
+                    conn.execute('UPDATE dirs SET mtime_ns=NULL WHERE path=?', (path,))
+                    continue
+                visited.add(path)
+                self.stats['dirs'] += 1
+                st, listing, small_stats = result
+                rows = file_rows.get(path, [])
+                if listing is None:
+                    files = self._load_dir(conn, display, rows, small_stats)
+                else:
+                    files = self._list_dir(conn, path, display, st, listing, rows)
+                self.stats['files'] += len(files)
+                yield display, files
+            # 已经不存在的文件夹（以及其中的子文件夹），无法访问的文件夹中的记录保持不变
+            failed_prefixes = tuple(os.path.join(i, '') for i in failed)
+            for path in set(dirs).union(file_rows).difference(visited, failed):
+                if not path.startswith(failed_prefixes):
+                    self._forget(conn, path)
+        finally:
+            conn.commit()
+        logger.debug(f"增量扫描: {self.stats['dirs']}个文件夹中有{self.stats['listed']}个发生了变化，"
+                     f"{self.stats['files']}个影片文件中重新识别了{self.stats['recognized']}个 "
+                     f"({time.perf_counter() - start:.2f}s)")
+
+    def _check_fingerprint(self, conn, fingerprint: str):
+        row = conn.execute("SELECT value FROM meta WHERE key='fingerprint'").fetchone()
+        if row is None or row[0] != fingerprint:
+            if row is not None:
+                logger.debug('扫描相关的配置已改变，清空扫描索引')
+            conn.execute('DELETE FROM dirs')
+            conn.execute('DELETE FROM files')
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)", (fingerprint,))
+
+    def _visit(self, path: str, display: str, dirs: dict, children: dict, file_rows: dict):
+        """在工作线程中获取文件夹的状态，文件夹发生了变化时列出其内容
+
+        Returns:
+            tuple: ([子文件夹 (路径, 显示路径)], 结果)。无法访问文件夹时结果为None，否则为(文件夹的状态, DirListing, 小文件的状态)，
+            文件夹未变化时DirListing为None
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return [], None
+        if dirs.get(path) == (st.st_dev, st.st_ino, st.st_mtime_ns):
+            subdirs = [(i, os.path.join(display, os.path.basename(i))) for i in sorted(children.get(path, []))]
+            # 修改文件内容不会改变文件夹的修改时间，小文件可能是尚未下载完成的影片，因此需要重新获取其大小
+            small_stats = {}
+            for row in file_rows.get(path, []):
+                if row[4] < self._minimum_size:
+                    try:
+                        small_stats[row[0]] = os.stat(row[0])
+                    except OSError:
+                        small_stats[row[0]] = None
+            return subdirs, (st, None, small_stats)
+        listing = list_dir(path, self._extensions, self._ignore_folder)
+        if listing is None:
+            return [], None
+        subdirs = [(os.path.join(path, i), os.path.join(display, i)) for i in listing.subdirs]
+        return subdirs, (st, listing, None)
+
+    def _load_dir(self, conn, display: str, rows: list, small_stats: dict) -> List[VideoFile]:
+        """文件夹未变化：直接使用索引中的文件列表"""
+        files = []
+        for fullpath, _, _, _, size, mtime_ns, root, dvdid, cid in sorted(rows):
+            display_path = os.path.join(display, os.path.basename(fullpath))
+            if root != self._root:
+                # 番号需要从文件夹名称中识别时，结果与扫描的根文件夹有关
+                dvdid, cid = self._recognizer.get_id(display_path), self._recognizer.get_cid(display_path)
+                self.stats['recognized'] += 1
+                conn.execute('UPDATE files SET root=?, dvdid=?, cid=? WHERE path=?', (self._root, dvdid, cid, fullpath))
+            if fullpath in small_stats:
+                fst = small_stats[fullpath]
+                if fst is None:
+                    continue
+                if fst.st_size != size or fst.st_mtime_ns != mtime_ns:
+                    size = fst.st_size
+                    conn.execute('UPDATE files SET size=?, mtime_ns=? WHERE path=?', (size, fst.st_mtime_ns, fullpath))
+            files.append(VideoFile(display_path, size, dvdid, cid))
+        return files
+
+    def _list_dir(self, conn, path: str, display: str, st: os.stat_result, listing: DirListing, rows: list) -> List[VideoFile]:
+        """文件夹是新的或者发生了变化：只重新识别新增和变化了的文件"""
+        self.stats['listed'] += 1
+        old_files = {i[0]: i[2:] for i in rows}
+        files, pending = [], []
+        for name, fst in listing.files:
+            fullpath = os.path.join(path, name)
+            key = (fst.st_dev, fst.st_ino, fst.st_size, fst.st_mtime_ns, self._root)
+            display_path = os.path.join(display, name)
+            old = old_files.pop(fullpath, None)
+            if old is not None and old[:5] == key:
+                files.append(VideoFile(display_path, fst.st_size, old[5], old[6]))
+            else:
+                files.append(None)
+                pending.append((len(files) - 1, fullpath, display_path, key))
+        # 批量识别新增和变化了的文件
+        recognized = self._recognizer.recognize([i[2] for i in pending])
+        for (i, fullpath, display_path, key), (dvdid, cid) in zip(pending, recognized):
+            files[i] = VideoFile(display_path, key[2], dvdid, cid)
+            conn.execute('INSERT OR REPLACE INTO files (path, dir, dev, ino, size, mtime_ns, root, dvdid, cid) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (fullpath, path, *key, dvdid, cid))
+        self.stats['recognized'] += len(pending)
+        for fullpath in old_files:
+            conn.execute('DELETE FROM files WHERE path=?', (fullpath,))
+        mtime_ns = st.st_mtime_ns if time.time_ns() - st.st_mtime_ns >= RACY_NS else None
+        conn.execute('INSERT OR REPLACE INTO dirs (path, parent, dev, ino, mtime_ns) VALUES (?, ?, ?, ?, ?)',
+                     (path, os.path.dirname(path), st.st_dev, st.st_ino, mtime_ns))
+        return files
+
+    def _forget(self, conn, path: str):
+        """从索引中删除文件夹及其中的文件"""
+        conn.execute('DELETE FROM dirs WHERE path=?', (path,))
+        conn.execute('DELETE FROM files WHERE dir=?', (path,))
+
+    def close(self):
+        self.store.close()
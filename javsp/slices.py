@@ -0,0 +1,124 @@
+"""识别同一文件夹内番号相同的多个文件的分片（或动漫的多语言版本）"""
+# 所有文件名的公共前缀之后紧跟着的就是分片标识（如'ABC-123-'之后的'1'，'ABC-123.CD'之后的'2'），
+# 因此只需要用预编译的正则表达式在公共前缀的结束位置匹配一次，而不必为每个番号都拼接和编译一组正则表达式。
+# 识别的结果包含每个文件的分片编号、语言版本以及无法识别时的原因，便于排查被略过的影片
+import os
+import re
+import logging
+from typing import List, NamedTuple
+
+
+__all__ = ['SliceInfo', 'SliceGroup', 'group_slices']
+
+
+logger = logging.getLogger(__name__)
+
+# 公共前缀之后的分片标识: CD/PART加数字、1-3位数字或者单个字母，允许分片标识前有分隔符，分片标识后有空白字符
+_SLICE = re.compile(r'[-_\s]*(?:(?:CD|PART)[-_\s]*(?P<num>\d{1,3})|(?P<digit>\d{1,3})|(?P<letter>[a-z]))\s*', re.I)
+# 文件名中是否有看起来像分片标识的部分（用于区分动漫的分片和多语言版本）
+_LOOKS_LIKE_SLICE = re.compile(r'[-_\s](?:CD[-_\s]*\d|PART[-_\s]*\d|\d{1,3}\.|[a-z]\.[a-z0-9]+$)', re.I)
+# 动漫的语言版本标记，如'.chs.'
+_LANGUAGE = re.compile(r'\.(chs|cht|简中|繁中|简体|繁体)\.', re.I)
+_LANGUAGE_TAGS = {'chs': 'chs', 'cht': 'cht', '简中': 'chs', '繁中': 'cht', '简体': 'chs', '繁体': 'cht'}
+# 语言版本的排列顺序: 原版(mkv)、简体中文、繁体中文、其他
+_LANGUAGE_ORDER = {'raw': 0, 'chs': 1, 'cht': 2, '': 3}
+_VIDEO_EXTENSIONS = {'.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.mpg', '.mpeg'}
+
+
+class SliceInfo(NamedTuple):
+    """一个文件的分片信息"""
+    path: str
+    index: int | None   # 分片编号（字母编号换算为数字: A=1, B=2...），语言版本和无法识别时为None
+    tag: str            # 文件名中的分片标识（如'1', 'A'）或语言版本（'raw', 'chs', 'cht'），没有时为''
+    postfix: str        # 分片标识之后的部分（如'.mp4'）
+
+
+class SliceGroup(NamedTuple):
+    """番号相同的一组文件的识别结果"""
+    avid: str
+    files: List[str] | None     # 按分片顺序排列的文件，不符合分片规则时为None
+    slices: List[SliceInfo]     # 每个文件的分片信息（与输入的文件顺序相同）
+    reason: str | None = None   # 不符合分片规则的原因
+
+
+def group_slices(avid: str, files: List[str]) -> SliceGroup:
+    """确定同一文件夹内番号相同的多个文件的分片顺序
+
+    分片编号必须从0/1/A开始且连续，所有分片的后缀（分片标识之后的部分）必须相同。
+    只有一个文件没有分片标识时将其视为第1个分片（如'ABC-123.mp4'和'ABC-123-2.mp4'）。
+    对于动漫影片（番号以'ANIME:'开头），不是分片的多个文件按语言版本排列
+
+    Args:
+        avid (str): 影片的番号
+        files (List[str]): 番号为avid的所有文件的路径
+    """
+    if len(files) == 1:
+        return SliceGroup(avid, list(files), [SliceInfo(files[0], None, '', '')])
+    basenames = [os.path.basename(i) for i in files]
+    is_anime = avid.startswith('ANIME:')
+    if is_anime and not any(_LOOKS_LIKE_SLICE.search(i) for i in basenames):
+        languages = [_LANGUAGE.search(i) for i in basenames]
+        if any(languages):
+            return _group_languages(avid, files, basenames)
+
+    prefix = os.path.commonprefix(basenames)
+    start = len(prefix)
+    slices = []
+    unmatched = []
+    for path, name in zip(files, basenames):
+        match = _SLICE.match(name, start)
+        if match:
+            tag = match.group('num') or match.group('digit') or match.group('letter')
+            index = int(tag) if tag.isdigit() else ord(tag.lower()) - ord('a') + 1
+            slices.append(SliceInfo(path, index, tag, name[match.end():]))
+        else:
+            unmatched.append(len(slices))
+            slices.append(SliceInfo(path, None, '', name[start:]))
+    if unmatched:
+        # 只有一个文件没有分片标识，并且没有其他文件被标记为第1个分片时，将其视为第1个分片
+        if len(unmatched) == 1 and all(i.index != 1 for i in slices):
+            i = unmatched[0]
+            slices[i] = slices[i]._replace(index=1)
+        elif is_anime:
+            return _group_languages(avid, files, basenames)
+        else:
+            names = ', '.join(basenames[i] for i in unmatched)
+            return _reject(avid, slices, f'无法识别分片标识: {names}')
+
+    postfixes = {i.postfix for i in slices}
+    if len(postfixes) != 1:
+        # 动漫影片允许不同的视频格式（如.mp4和.mkv）
+        if not (is_anime and all(os.path.splitext(i)[1].lower() in _VIDEO_EXTENSIONS for i in postfixes)):
+            return _reject(avid, slices, f'后缀不一致: {sorted(postfixes)}')
+    ordered = sorted(slices, key=lambda x: x.index)
+    indexes = [i.index for i in ordered]
+    if len(set(indexes)) != len(indexes):
+        return _reject(avid, slices, f'分片编号重复: {[i.tag for i in slices]}')
+    if indexes[0] not in (0, 1) or indexes[-1] - indexes[0] != len(indexes) - 1:
+        return _reject(avid, slices, f'分片编号应从0/1/A开始且连续: {[i.tag for i in ordered]}')
+    return SliceGroup(avid, [i.path for i in ordered], slices)
+
+
+def _group_languages(avid: str, files: List[str], basenames: List[str]) -> SliceGroup:
+    """将动漫影片的多个文件视为不同的语言版本，按原版、简体中文、繁体中文、其他的顺序排列"""
+    slices = []
+    for path, name in zip(files, basenames):
+        match = _LANGUAGE.search(name)
+        if match:
+            tag = _LANGUAGE_TAGS[match.group(1).lower()]
+        elif name.lower().endswith('.mkv'):
+            tag = 'raw'
+        else:
+            tag = ''
+        slices.append(SliceInfo(path, None, tag, os.path.splitext(name)[1]))
+    tags = [i.tag for i in slices if i.tag]
+    if len(set(tags)) != len(tags):
+        return _reject(avid, slices, f'语言版本重复: {tags}')
+    logger.debug(f"识别为动漫多语言版本（非分片）: {avid}, 文件数: {len(files)}")
+    ordered = sorted(slices, key=lambda x: _LANGUAGE_ORDER[x.tag])
+    return SliceGroup(avid, [i.path for i in ordered], slices)
+
+
+def _reject(avid: str, slices: List[SliceInfo], reason: str) -> SliceGroup:
+    logger.debug(f"无法识别分片信息: {avid}: {reason}")
+    return SliceGroup(avid, None, slices, reason)
@@ -0,0 +1,94 @@
+"""基于SQLite的本地存储（运行日志、缓存等）的公共部分"""
+# 所有数据库均使用WAL模式：读写可以并发进行，进程被中断时已提交的数据也不会丢失。
+# sqlite3的连接不能跨线程使用，这里为每个线程分别创建连接
+import os
+import sys
+import sqlite3
+import logging
+import threading
+
+from javsp.config import Cfg
+
+
+__all__ = ['cache_dir', 'user_cache_dir', 'SqliteStore']
+
+
+logger = logging.getLogger(__name__)
+
+
+_resolved_dirs = {}
+def cache_dir() -> str:
+    """获取存放本地数据库的文件夹（不存在时自动创建）
+
+    相对路径在首次调用时转换为绝对路径，之后即使切换了工作目录也始终返回同一个文件夹
+    """
+    configured = Cfg().other.cache_dir
+    path = _resolved_dirs.get(configured)
+    if path is None:
+        path = configured if configured is not None else user_cache_dir()
+        path = _resolved_dirs[configured] = os.path.abspath(path)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def user_cache_dir() -> str:
+    """当前用户的缓存文件夹（程序所在的文件夹可能没有写入权限，如安装在site-packages或Program Files中）"""
+    if sys.platform == 'win32':
+        base = os.getenv('LOCALAPPDATA') or os.path.expanduser(r'~\AppData\Local')
+        return os.path.join(base, 'JavSP', 'cache')
+    if sys.platform == 'darwin':
+        return os.path.expanduser('~/Library/Caches/JavSP')
+    base = os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'javsp')
+
+
+class SqliteStore():
+    """以WAL模式打开的SQLite数据库，每个线程使用独立的连接"""
+    def __init__(self, path: str, schema: str = '') -> None:
+        """
+        Args:
+            path (str): 数据库文件的路径，':memory:'表示使用内存数据库（仅用于测试，各线程的数据不共享）
+            schema (str): 建表语句，每次打开数据库时都会执行（应当使用 CREATE TABLE IF NOT EXISTS）
+        """
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+        self._conns = []
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            if self.schema:
+                with conn:
+                    conn.executescript(self.schema)
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        """执行一条语句并立即提交"""
+        with self.conn as conn:
+            return conn.execute(sql, params)
+
+    def query(self, sql: str, params=()) -> list:
+        """执行查询语句并返回所有结果"""
+        return self.conn.execute(sql, params).fetchall()
+
+    def close(self):
+        """关闭所有线程的连接"""
+        with self._lock:
+            for conn in self._conns:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    # 连接所属的线程已经结束
+                    pass
+            self._conns.clear()
+        self._local = threading.local()
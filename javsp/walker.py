@@ -0,0 +1,104 @@
+"""在线程池中并行遍历文件夹"""
+# os.walk在单个线程中依次列出每个文件夹，之后还要对每个文件单独调用os.path.getsize。
+# 对于SMB/NFS等网络共享，每次列出文件夹和获取文件状态都需要一次网络往返，目录层级较深时扫描要花费数分钟。
+# 这里在线程池中并行调用os.scandir，获取文件大小时直接使用DirEntry.stat()（Windows上无需额外的系统调用），
+# 在进入子文件夹之前就根据ignored_folder_name_pattern剪枝，并且每列出一个文件夹就立即交给调用方处理（如识别番号），
+# 而不必等待整个文件夹树遍历完成
+import os
+import re
+import heapq
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Tuple
+
+
+__all__ = ['DirListing', 'list_dir', 'parallel_walk', 'preorder_key', 'default_workers']
+
+
+class DirListing(NamedTuple):
+    """一个文件夹的内容"""
+    subdirs: List[str]                          # 需要继续遍历的子文件夹的名称
+    files: List[Tuple[str, os.stat_result]]     # 扩展名符合要求的文件的(名称, 状态)
+
+
+def default_workers() -> int:
+    """遍历文件夹的线程数的默认值（主要耗时在等待I/O上，因此可以比CPU核心数多一些）"""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def list_dir(path: str, extensions: Iterable[str], ignore_folder: re.Pattern) -> DirListing | None:
+    """列出文件夹中的子文件夹和指定扩展名的文件，子文件夹和文件均按名称排序。无法列出时返回None
+
+    Args:
+        path (str): 文件夹的路径
+        extensions: 要列出的文件的扩展名（小写，如'.mp4'）
+        ignore_folder (re.Pattern): 名称匹配此模式的子文件夹将被忽略
+    """
+    subdirs, files = [], []
+    try:
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda x: x.name)
+    except OSError:
+        return None
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            continue
+        if is_dir:
+            # 与os.walk相同: 不进入指向文件夹的符号链接
+            if not ignore_folder.match(entry.name) and not entry.is_symlink():
+                subdirs.append(entry.name)
+            continue
+        if os.path.splitext(entry.name)[1].lower() not in extensions:
+            continue
+        try:
+            files.append((entry.name, entry.stat()))
+        except OSError:
+            continue
+    return DirListing(subdirs, files)
+
+
+def parallel_walk(root: str, visit: Callable, workers: int = 0, display: str = None, ordered: bool = False) -> Iterator[tuple]:
+    """从root开始在线程池中并行遍历文件夹树，逐个返回每个文件夹的处理结果
+
+    Args:
+        root (str): 根文件夹
+        visit (Callable): 在工作线程中对每个文件夹调用的函数: visit(path, display) -> (子文件夹列表, 结果)，
+            子文件夹列表中的每一项为(path, display)，返回的子文件夹会继续被遍历
+        workers (int): 线程数，0表示使用default_workers()
+        display (str): 根文件夹的显示路径，默认与root相同（子文件夹的显示路径由visit决定）
+        ordered (bool): 为False时按完成顺序返回；为True时按先序遍历的顺序（与preorder_key一致）返回，
+            已完成的文件夹会等到先序遍历中排在它前面的文件夹都完成后才返回（文件夹仍然是并行处理的）
+
+    Yields:
+        tuple: (path, display, 结果)
+    """
+    workers = workers or default_workers()
+    display = root if display is None else display
+    # 已完成但还不能返回的文件夹（按先序遍历的顺序排列的堆）
+    finished = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='walker') as executor:
+        pending = {executor.submit(visit, root, display): (root, display)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, path_display = pending.pop(future)
+                subdirs, result = future.result()
+                for item in subdirs:
+                    pending[executor.submit(visit, *item)] = item
+                if not ordered:
+                    yield path, path_display, result
+                else:
+                    heapq.heappush(finished, (preorder_key(root, path), path, path_display, result))
+            if ordered:
+                # 未完成的文件夹的子文件夹在先序遍历中都排在它自己之后，因此排在所有未完成的文件夹之前的已完成文件夹可以返回
+                first_pending = min((preorder_key(root, i[0]) for i in pending.values()), default=None)
+                while finished and (first_pending is None or finished[0][0] < first_pending):
+                    _, path, path_display, result = heapq.heappop(finished)
+                    yield path, path_display, result
+
+
+def preorder_key(root: str, path: str) -> tuple:
+    """按此函数的返回值排序时，文件夹的顺序与按名称排序的先序遍历一致（父文件夹在前，子文件夹按名称排序）"""
+    rel = os.path.relpath(path, root)
+    return () if rel == os.curdir else tuple(rel.split(os.sep))
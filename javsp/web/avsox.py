@@ -5,61 +5,75 @@ from javsp.web.base import get_html
 from javsp.web.exceptions import *
 from javsp.config import Cfg, CrawlerID
 from javsp.datatype import MovieInfo
+from javsp.web.base_crawler import BaseCrawler, Field, minutes, normalize_date, tail, text_content
 
 
 logger = logging.getLogger(__name__)
 base_url = str(Cfg().network.proxy_free[CrawlerID.avsox])
 
 
-def parse_data(movie: MovieInfo):
-    """解析指定番号的影片数据"""
-    # avsox无法直接跳转到影片的网页，因此先搜索再从搜索结果中寻找目标网页
-    full_id = movie.dvdid
-    if full_id.startswith('FC2-'):
-        full_id = full_id.replace('FC2-', 'FC2-PPV-')
-    html = get_html(f'{base_url}tw/search/{full_id}')
-    ids = html.xpath("//div[@class='photo-info']/span/date[1]/text()")
-    urls = html.xpath("//a[contains(@class, 'movie-box')]/@href")
-    ids_lower = list(map(str.lower, ids))
-    if full_id.lower() in ids_lower:
-        url = urls[ids_lower.index(full_id.lower())]
-        url = url.replace('/tw/', '/cn/', 1)
-    else:
-        raise MovieNotFoundError(__name__, movie.dvdid, ids)
+class Avsox(BaseCrawler):
+    scopes = {
+        'container': "/html/body/div[@class='container']",
+        'info': "/html/body/div[@class='container']/div/div[@class='col-md-3 info']",
+    }
+    fields = {
+        # 搜索结果页面
+        '_result_ids': Field("//div[@class='photo-info']/span/date[1]/text()", many=True),
+        '_result_urls': Field("//a[contains(@class, 'movie-box')]/@href", many=True),
+        # 影片页面
+        '_title': Field("h3/text()", scope='container', required=True),
+        'cover': Field("//a[@class='bigImage']/@href", required=True),
+        '_dvdid': Field("p/span[@style]/text()", scope='info', required=True),
+        'publish_date': Field("p/span[text()='发行时间:']", tail, normalize_date, scope='info'),
+        'duration': Field("p/span[text()='长度:']", tail, minutes, scope='info'),
+        '_producer': Field("p[text()='制作商: ']/following-sibling::*[1]/a", text_content, scope='info'),
+        '_serial': Field("p[text()='系列:']/following-sibling::*[1]/a/text()", scope='info'),
+        'genre': Field("p/span[@class='genre']/a/text()", scope='info', many=True),
+        'actress': Field("//a[@class='avatar-box']/span/text()", many=True),
+    }
+    search_keys = ['_result_ids', '_result_urls']
 
-    # 提取影片信息
-    html = get_html(url)
-    container = html.xpath("/html/body/div[@class='container']")[0]
-    title = container.xpath("h3/text()")[0]
-    cover = container.xpath("//a[@class='bigImage']/@href")[0]
-    info = container.xpath("div/div[@class='col-md-3 info']")[0]
-    dvdid = info.xpath("p/span[@style]/text()")[0]
-    publish_date = info.xpath("p/span[text()='发行时间:']")[0].tail.strip()
-    duration = info.xpath("p/span[text()='长度:']")[0].tail.replace('分钟', '').strip()
-    producer, serial = None, None
-    producer_tag = info.xpath("p[text()='制作商: ']")[0].getnext().xpath("a")
-    if producer_tag:
-        producer = producer_tag[0].text_content()
-    serial_tag = info.xpath("p[text()='系列:']")
-    if serial_tag:
-        serial = serial_tag[0].getnext().xpath("a/text()")[0]
-    genre = info.xpath("p/span[@class='genre']/a/text()")
-    actress = container.xpath("//a[@class='avatar-box']/span/text()")
+    def parse_data(self, movie: MovieInfo):
+        """解析指定番号的影片数据"""
+        # avsox无法直接跳转到影片的网页，因此先搜索再从搜索结果中寻找目标网页
+        full_id = movie.dvdid
+        if full_id.startswith('FC2-'):
+            full_id = full_id.replace('FC2-', 'FC2-PPV-')
+        html = get_html(f'{base_url}tw/search/{full_id}')
+        result = self.extract(html, keys=self.search_keys)
+        ids, urls = result['_result_ids'], result['_result_urls']
+        ids_lower = list(map(str.lower, ids))
+        if full_id.lower() in ids_lower:
+            url = urls[ids_lower.index(full_id.lower())]
+            url = url.replace('/tw/', '/cn/', 1)
+        else:
+            raise MovieNotFoundError(__name__, movie.dvdid, ids)
 
-    movie.dvdid = dvdid.replace('FC2-PPV-', 'FC2-')
-    movie.url = url
-    movie.title = title.replace(dvdid, '').strip()
-    movie.cover = cover
-    movie.publish_date = publish_date
-    movie.duration = duration
-    movie.genre = genre
-    movie.actress = actress
-    if full_id.startswith('FC2-'):
-        # avsox把FC2作品的拍摄者归类到'系列'而制作商固定为'FC2-PPV'，这既不合理也与其他的站点不兼容，因此进行调整
-        movie.producer = serial
-    else:
-        movie.producer = producer
-        movie.serial = serial
+        # 提取影片信息
+        html = get_html(url)
+        data = self.extract(html, movie, [i for i in self.fields if i not in self.search_keys])
+        dvdid = data['_dvdid']
+        movie.dvdid = dvdid.replace('FC2-PPV-', 'FC2-')
+        movie.url = url
+        movie.title = data['_title'].replace(dvdid, '').strip()
+        if full_id.startswith('FC2-'):
+            # avsox把FC2作品的拍摄者归类到'系列'而制作商固定为'FC2-PPV'，这既不合理也与其他的站点不兼容，因此进行调整
+            movie.producer = data['_serial']
+        else:
+            movie.producer = data['_producer']
+            movie.serial = data['_serial']
+
+    def get_genre_norm(self, genre: list) -> list:
+        # avsox没有提供分类的id，不进行转换
+        return genre
+
+    def resolve_actress(self, actress: list) -> list:
+        return actress
+
+
+crawler = Avsox()
+parse_data = crawler.parse_data
 
 
 if __name__ == "__main__":
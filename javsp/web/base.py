@@ -1,21 +1,30 @@
 """网络请求的统一接口"""
 import os
+import re
 import sys
+import json
 import time
 import shutil
 import logging
 import requests
+import codecs
+import threading
 import contextlib
+import charset_normalizer
 import cloudscraper
 import lxml.html
 from tqdm import tqdm
 from lxml import etree
 from lxml.html.clean import Cleaner
 from requests.models import Response
+from urllib.parse import urljoin, urlsplit
 
 
 from javsp.config import Cfg
 from javsp.web.exceptions import *
+from javsp.web.throttle import throttle
+from javsp.web.httpcache import get_http_cache, cache_ttl
+from javsp.web.session import session_get, session_post, session_head
 
 
 __all__ = ['Request', 'get_html', 'post_html', 'request_get', 'resp2html', 'is_connectable', 'download', 'get_resp_text', 'read_proxy']
@@ -48,9 +57,9 @@ class Request():
         self.timeout = Cfg().network.timeout.total_seconds()
         if not use_scraper:
             self.scraper = None
-            self.__get = requests.get
-            self.__post = requests.post
-            self.__head = requests.head
+            self.__get = session_get
+            self.__post = session_post
+            self.__head = session_head
         else:
             self.scraper = cloudscraper.create_scraper()
             self.__get = self._scraper_monitor(self.scraper.get)
@@ -65,22 +74,30 @@ class Request():
             except Exception as e:
                 logger.debug(f"无法通过CloudFlare检测: '{e}', 尝试退回常规的requests请求")
                 if func == self.scraper.get:
-                    return requests.get(*args, **kw)
+                    return session_get(*args, **kw)
                 else:
-                    return requests.post(*args, **kw)
+                    return session_post(*args, **kw)
         return wrapper
 
     def get(self, url, delay_raise=False):
-        r = self.__get(url,
-                      headers=self.headers,
-                      proxies=self.proxies,
-                      cookies=self.cookies,
-                      timeout=self.timeout)
+        def fetch(extra_headers):
+            throttle(url)
+            return self.__get(url,
+                              headers={**self.headers, **extra_headers},
+                              proxies=self.proxies,
+                              cookies=self.cookies,
+                              timeout=self.timeout)
+        cache = get_http_cache()
+        if cache:
+            r = cache.get(url, self.headers, self.cookies, fetch, cache_ttl())
+        else:
+            r = fetch({})
         if not delay_raise:
             r.raise_for_status()
         return r
 
     def post(self, url, data, delay_raise=False):
+        throttle(url)
         r = self.__post(url,
                       data=data,
                       headers=self.headers,
@@ -92,6 +109,7 @@ class Request():
         return r
 
     def head(self, url, delay_raise=True):
+        throttle(url)
         r = self.__head(url,
                       headers=self.headers,
                       proxies=self.proxies,
@@ -118,8 +136,14 @@ def request_get(url, cookies={}, timeout=None, delay_raise=False):
     """获取指定url的原始请求"""
     if timeout is None:
         timeout = Cfg().network.timeout.seconds
-    
-    r = requests.get(url, headers=headers, proxies=read_proxy(), cookies=cookies, timeout=timeout)
+    def fetch(extra_headers):
+        throttle(url)
+        return session_get(url, headers={**headers, **extra_headers}, proxies=read_proxy(), cookies=cookies, timeout=timeout)
+    cache = get_http_cache()
+    if cache:
+        r = cache.get(url, headers, cookies, fetch, cache_ttl())
+    else:
+        r = fetch({})
     if not delay_raise:
         if r.status_code == 403 and b'>Just a moment...<' in r.content:
             raise SiteBlocked(f"403 Forbidden: 无法通过CloudFlare检测: {url}")
@@ -132,27 +156,109 @@ def request_post(url, data, cookies={}, timeout=None, delay_raise=False):
     """向指定url发送post请求"""
     if timeout is None:
         timeout = Cfg().network.timeout.seconds
-    r = requests.post(url, data=data, headers=headers, proxies=read_proxy(), cookies=cookies, timeout=timeout)
+    throttle(url)
+    r = session_post(url, data=data, headers=headers, proxies=read_proxy(), cookies=cookies, timeout=timeout)
     if not delay_raise:
         r.raise_for_status()
     return r
 
 
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([a-zA-Z0-9_-]+)""", flags=re.I)
+_HEADER_CHARSET = re.compile(r'charset=["\']?([a-zA-Z0-9_-]+)', flags=re.I)
+# 各个主机上一次检测到的网页编码，避免对同一站点的每个网页都进行耗时的编码检测
+_host_charsets = {}
+
+def detect_encoding(resp: Response) -> str:
+    """确定Response的编码：响应头中声明的编码 > 网页<meta>中声明的编码 > 该主机之前检测到的编码 > 对网页开头部分进行检测"""
+    match = _HEADER_CHARSET.search(resp.headers.get('Content-Type', ''))
+    if match:
+        return match.group(1).lower()
+    match = _META_CHARSET.search(resp.content[:4096])
+    if match:
+        return match.group(1).decode('ascii').lower()
+    host = urlsplit(resp.url or '').hostname
+    encoding = _host_charsets.get(host)
+    if encoding is None:
+        # requests的apparent_encoding会检测整个网页，这里只检测开头的一部分
+        detected = charset_normalizer.from_bytes(resp.content[:32 * 1024]).best()
+        encoding = detected.encoding if detected else 'utf-8'
+        _host_charsets[host] = encoding
+    return encoding
+
+
 def get_resp_text(resp: Response, encoding=None):
     """提取Response的文本"""
     if encoding:
         resp.encoding = encoding
     else:
-        resp.encoding = resp.apparent_encoding
+        resp.encoding = detect_encoding(resp)
     return resp.text
 
 
+# lxml的解析器不应被多个线程同时使用，因此每个线程分别创建
+_parsers = threading.local()
+def _get_parser(encoding: str) -> lxml.html.HTMLParser | None:
+    """获取指定编码的解析器，libxml2不支持该编码时返回None"""
+    cache = getattr(_parsers, 'cache', None)
+    if cache is None:
+        cache = _parsers.cache = {}
+    if encoding not in cache:
+        try:
+            # Python的编码名称(如utf_8, euc_jp)需要转换为libxml2能识别的形式
+            name = codecs.lookup(encoding).name.replace('_', '-')
+            cache[encoding] = lxml.html.HTMLParser(encoding=name)
+        except LookupError:
+            cache[encoding] = None
+    return cache[encoding]
+
+
+# 需要转换为绝对地址的属性，即抓取器实际会读取的链接属性
+LINK_ATTRS = ('href', 'src', 'action', 'data-src', 'data-original', 'data-lazy', 'data-poster')
+_LINK_XPATH = etree.XPath('|'.join(f'//@{i}' for i in LINK_ATTRS))
+_HAS_SCHEME = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*:')
+
+def make_links_absolute(html, base_url: str):
+    """将LINK_ATTRS中的链接转换为绝对地址
+
+    lxml自带的make_links_absolute会检查所有可能包含链接的属性，还要解析style中的CSS，开销远大于解析网页本身。
+    这里只处理抓取器会读取的属性，已经带有协议头的链接（如http:, ed2k:, javascript:）保持不变
+    """
+    base_tags = html.xpath('//base[@href]')
+    if base_tags:
+        base_url = urljoin(base_url, base_tags[0].get('href').strip())
+        for tag in base_tags:
+            tag.drop_tag()
+    for value in _LINK_XPATH(html):
+        link = value.strip()
+        if _HAS_SCHEME.match(link):
+            continue
+        try:
+            new_link = urljoin(base_url, link)
+        except ValueError:
+            continue
+        value.getparent().set(value.attrname, new_link)
+
+
+def parse_html(content: bytes, encoding: str, base_url: str = None):
+    """使用指定的编码直接解析网页的原始数据，并将链接转换为绝对地址"""
+    parser = _get_parser(encoding)
+    if parser is not None:
+        html = lxml.html.fromstring(content, parser=parser)
+    else:
+        try:
+            text = content.decode(encoding, errors='replace')
+        except LookupError:
+            text = content.decode('utf-8', errors='replace')
+        html = lxml.html.fromstring(text)
+    if base_url:
+        make_links_absolute(html, base_url)
+    return html
+
+
 def get_html(url, encoding='utf-8'):
     """使用get方法访问指定网页并返回经lxml解析后的document"""
     resp = request_get(url)
-    text = get_resp_text(resp, encoding=encoding)
-    html = lxml.html.fromstring(text)
-    html.make_links_absolute(url, resolve_base_href=True)
+    html = parse_html(resp.content, encoding or detect_encoding(resp), url)
     # 清理功能仅应在需要的时候用来调试网页（如prestige），否则可能反过来影响调试（如JavBus）
     # html = cleaner.clean_html(html)
     if hasattr(sys, 'javsp_debug_mode'):
@@ -162,9 +268,7 @@ def get_html(url, encoding='utf-8'):
 
 def resp2html(resp, encoding='utf-8') -> lxml.html.HtmlComment:
     """将request返回的response转换为经lxml解析后的document"""
-    text = get_resp_text(resp, encoding=encoding)
-    html = lxml.html.fromstring(text)
-    html.make_links_absolute(resp.url, resolve_base_href=True)
+    html = parse_html(resp.content, encoding or detect_encoding(resp), resp.url)
     # html = cleaner.clean_html(html)
     if hasattr(sys, 'javsp_debug_mode'):
         lxml.html.open_in_browser(html, encoding=encoding)  # for develop and debug
@@ -174,16 +278,8 @@ def resp2html(resp, encoding='utf-8') -> lxml.html.HtmlComment:
 def post_html(url, data, encoding='utf-8', cookies={}):
     """使用post方法访问指定网页并返回经lxml解析后的document"""
     resp = request_post(url, data, cookies=cookies)
-    text = get_resp_text(resp, encoding=encoding)
-    html = lxml.html.fromstring(text)
-    # jav321提供ed2k形式的资源链接，其中的非ASCII字符可能导致转换失败，因此要先进行处理
-    ed2k_tags = html.xpath("//a[starts-with(@href,'ed2k://')]")
-    for tag in ed2k_tags:
-        tag.attrib['ed2k'], tag.attrib['href'] = tag.attrib['href'], ''
-    html.make_links_absolute(url, resolve_base_href=True)
-    for tag in ed2k_tags:
-        tag.attrib['href'] = tag.attrib['ed2k']
-        tag.attrib.pop('ed2k')
+    # jav321提供ed2k形式的资源链接，make_links_absolute会跳过这些带有协议头的链接，不需要再单独处理
+    html = parse_html(resp.content, encoding or detect_encoding(resp), url)
     # html = cleaner.clean_html(html)
     # lxml.html.open_in_browser(html, encoding=encoding)  # for develop and debug
     return html
@@ -201,36 +297,125 @@ def dump_xpath_node(node, filename=None):
 def is_connectable(url, timeout=3):
     """测试与指定url的连接"""
     try:
-        r = requests.get(url, headers=headers, timeout=timeout)
+        r = session_get(url, headers=headers, timeout=timeout)
         return True
     except requests.exceptions.RequestException as e:
         logger.debug(f"Not connectable: {url}\n" + repr(e))
         return False
 
 
-def urlretrieve(url, filename=None, reporthook=None, headers=None):
-    if "arzon" in url:
-        headers["Referer"] = "https://www.arzon.jp/"
-    """使用requests实现urlretrieve"""
-    # https://blog.csdn.net/qq_38282706/article/details/80253447
-    with contextlib.closing(requests.get(url, headers=headers,
-                                         proxies=read_proxy(), stream=True)) as r:
-        header = r.headers
-        with open(filename, 'wb+') as fp:
-            bs = 1024
-            size = -1
-            blocknum = 0
-            if "content-length" in header:
-                size = int(header["Content-Length"])    # 文件总大小（理论值）
-            if reporthook:                              # 写入前运行一次回调函数
-                reporthook(blocknum, bs, size)
-            for chunk in r.iter_content(chunk_size=1024):
-                if chunk:
-                    fp.write(chunk)
-                    fp.flush()
-                    blocknum += 1
-                    if reporthook:
-                        reporthook(blocknum, bs, size)  # 每写入一次运行一次回调函数
+def _chunk_size(total: int) -> int:
+    """根据文件大小选择每次读取的块大小（64 KiB ~ 1 MiB）"""
+    if total <= 0:
+        return 256 * 1024
+    return min(max(total // 64, 64 * 1024), 1024 * 1024)
+
+
+def _parse_content_range(value: str):
+    """解析'bytes 100-199/1000'形式的Content-Range，返回(起始位置, 文件总大小)"""
+    try:
+        unit, spec = value.split(' ', 1)
+        span, total = spec.split('/', 1)
+        start = int(span.split('-', 1)[0])
+        total = -1 if total == '*' else int(total)
+        return start, total
+    except ValueError:
+        return None, -1
+
+
+def _load_part_info(part_file: str) -> dict:
+    """读取与未完成的下载对应的信息（下载地址和用于If-Range的验证信息）"""
+    try:
+        with open(part_file + '.json', 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _discard_part(part_file: str):
+    for path in (part_file, part_file + '.json'):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def urlretrieve(url, filename, reporthook=None, headers=None, progress_interval=0.2):
+    """使用requests下载文件
+
+    数据先写入'filename.part'，下载完成后再原子性地重命名为filename。'filename.part.json'中记录了下载地址和
+    服务器返回的ETag/Last-Modified，只有地址相同时才会通过Range请求从断点继续（并通过If-Range确认文件没有变化），
+    避免将不同地址的数据拼接到一起（多个候选封面可能使用同一个保存路径）。
+
+    Args:
+        reporthook: 进度回调函数，以(已下载字节数, 1, 文件总大小)的形式调用，总大小未知时为-1
+        headers: 请求头，不会被修改
+        progress_interval: 两次调用进度回调函数的最小间隔（秒）
+
+    Returns:
+        dict: 下载统计 {'total': 本次下载的字节数, 'elapsed': 耗时（秒）, 'rate': 平均速度（字节/秒）}
+    """
+    req_headers = dict(headers or {})
+    part_file = filename + '.part'
+    resume_pos = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+    if resume_pos:
+        part_info = _load_part_info(part_file)
+        if part_info.get('url') == url:
+            req_headers['Range'] = f'bytes={resume_pos}-'
+            validator = part_info.get('etag') or part_info.get('last_modified')
+            if validator:
+                req_headers['If-Range'] = validator
+        else:
+            _discard_part(part_file)
+            resume_pos = 0
+    start_time = time.perf_counter()
+    throttle(url)
+    with contextlib.closing(session_get(url, headers=req_headers, proxies=read_proxy(), stream=True,
+                                        timeout=Cfg().network.timeout.total_seconds())) as r:
+        if r.status_code == 416 and resume_pos:
+            # 断点位置无效（例如服务器上的文件已经变化），丢弃已下载的部分重新下载
+            _discard_part(part_file)
+            return urlretrieve(url, filename, reporthook, headers, progress_interval)
+        r.raise_for_status()
+        total = int(r.headers.get('Content-Length', -1))
+        mode = 'wb'
+        done = 0
+        if r.status_code == 206:
+            start, full_size = _parse_content_range(r.headers.get('Content-Range', ''))
+            if start != resume_pos:
+                # 返回的范围与断点不一致，无法拼接，丢弃已下载的部分后不带Range重新请求
+                _discard_part(part_file)
+                if resume_pos:
+                    return urlretrieve(url, filename, reporthook, headers, progress_interval)
+                raise requests.exceptions.ChunkedEncodingError(f"服务器返回的内容不是从头开始的: {url}")
+            total = full_size
+            if resume_pos:
+                mode = 'ab'
+                done = resume_pos
+                logger.debug(f"从断点继续下载({resume_pos}字节): {url}")
+        if not done:
+            part_info = {'url': url, 'etag': r.headers.get('ETag'), 'last_modified': r.headers.get('Last-Modified')}
+            with open(part_file + '.json', 'wt', encoding='utf-8') as f:
+                json.dump(part_info, f)
+        received = 0
+        last_report = 0.0
+        with open(part_file, mode) as fp:
+            if reporthook:
+                reporthook(done, 1, total)
+            for chunk in r.iter_content(chunk_size=_chunk_size(total)):
+                fp.write(chunk)
+                done += len(chunk)
+                received += len(chunk)
+                now = time.perf_counter()
+                if reporthook and now - last_report >= progress_interval:
+                    reporthook(done, 1, total)
+                    last_report = now
+        if total >= 0 and done < total:
+            raise requests.exceptions.ChunkedEncodingError(f"下载不完整({done}/{total}字节): {url}")
+        if reporthook:
+            reporthook(done, 1, total)
+    os.replace(part_file, filename)
+    _discard_part(part_file)
+    elapsed = time.perf_counter() - start_time
+    return {'total': done, 'elapsed': elapsed, 'rate': received / elapsed if elapsed > 0 else 0}
 
 
 def download(url, output_path, desc=None):
@@ -246,12 +431,13 @@ def download(url, output_path, desc=None):
     if not desc:
         desc = url.split('/')[-1]
     referrer = headers.copy()
-    referrer['referer'] = url[:url.find('/', 8)+1]  # 提取base_url部分
+    if 'arzon' in url:
+        referrer['Referer'] = 'https://www.arzon.jp/'
+    else:
+        referrer['Referer'] = url[:url.find('/', 8)+1]  # 提取base_url部分
     with DownloadProgressBar(unit='B', unit_scale=True,
                              miniters=1, desc=desc, leave=False) as t:
-        urlretrieve(url, filename=output_path, reporthook=t.update_to, headers=referrer)
-        info = {k: t.format_dict[k] for k in ('total', 'elapsed', 'rate')}
-        return info
+        return urlretrieve(url, output_path, reporthook=t.update_to, headers=referrer)
 
 
 def open_in_chrome(url, new=0, autoraise=True):
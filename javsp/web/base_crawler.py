@@ -1,58 +1,257 @@
 """统一的爬虫接口定义"""
+# 抓取器可以通过fields声明MovieInfo的各个字段对应的XPath选择器和后处理函数，由提取引擎统一完成提取:
+# 选择器在类创建后首次使用时编译一次（使用XPathRegistry，因此每个字段的解析耗时都会被记录），
+# 提取时每个作用域（如信息面板）的节点只查找一次，之后依次在作用域节点上对所有字段求值
+import re
 import abc
-from typing import Optional
+from typing import Callable, Dict, Iterable, Optional
+
+from javsp.lib import strftime_to_minutes
 from javsp.datatype import MovieInfo
+from javsp.web.xpath import XPathRegistry
+
+
+__all__ = ['Field', 'Extractor', 'BaseCrawler', 'strip', 'text', 'text_content', 'tail', 'next_text',
+           'attr', 'replace', 'split_id', 'normalize_date', 'minutes']
+
+
+# 后处理函数：输入选择器匹配到的一个结果，返回处理后的值，返回None表示丢弃该结果
+def strip(value):
+    return value.strip() if value is not None else None
+
+
+def text(node):
+    """节点自身的文本"""
+    return node.text
+
+
+def text_content(node):
+    """节点及其所有子节点的文本"""
+    return node.text_content()
+
+
+def tail(node):
+    """节点之后紧跟的文本"""
+    return node.tail
+
+
+def next_text(node):
+    """节点的下一个兄弟节点的文本"""
+    sibling = node.getnext()
+    return sibling.text if sibling is not None else None
+
+
+def attr(name: str) -> Callable:
+    """节点的属性值"""
+    return lambda node: node.get(name)
+
+
+def replace(old: str, new: str = '') -> Callable:
+    return lambda value: value.replace(old, new) if value is not None else None
+
+
+def split_id(sep: str = '/', index: int = -1) -> Callable:
+    """从链接中拆分出分类等的id，例如'https://www.javbus.com/genre/4f' -> '4f'"""
+    return lambda value: value.split(sep)[index] if value else None
+
+
+_DATE_PATTERN = re.compile(r'(\d{4})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})')
+def normalize_date(value):
+    """将各种格式的日期统一为YYYY-MM-DD，无效的日期（如0000-00-00）返回None"""
+    if not value:
+        return None
+    match = _DATE_PATTERN.search(value)
+    if not match:
+        return None
+    year, month, day = map(int, match.groups())
+    if not (year and month and day):
+        return None
+    return f'{year:04d}-{month:02d}-{day:02d}'
+
+
+def minutes(value):
+    """将'120分鐘'、'120'、'02:00:00'等形式的时长转换为分钟数的字符串，时长为0或无法识别时返回None"""
+    if not value:
+        return None
+    value = value.strip()
+    if re.fullmatch(r'\d+(:\d+){1,2}', value):
+        mins = strftime_to_minutes(value)
+    else:
+        match = re.search(r'\d+', value)
+        if not match:
+            return None
+        mins = int(match.group())
+    return str(mins) if mins else None
+
+
+class Field():
+    """声明一个字段的提取方式"""
+    def __init__(self, path: str, *processors: Callable, scope: str = None, many=False,
+                 required=False, default=None, variables: Dict[str, str] = None) -> None:
+        """
+        Args:
+            path (str): XPath选择器，可以包含$name形式的变量
+            processors: 依次对每个匹配结果调用的后处理函数
+            scope (str): 在哪个作用域节点上求值，为None时在整个文档上求值
+            many (bool): 为True时返回所有结果组成的列表，否则只返回第一个有效的结果
+            required (bool): 没有提取到有效结果时是否抛出异常
+            default: 没有提取到有效结果时的值
+            variables (dict): 选择器中的变量的值
+        """
+        self.path = path
+        self.processors = processors
+        self.scope = scope
+        self.many = many
+        self.required = required
+        self.default = default
+        self.variables = variables or {}
+
+    def process(self, value):
+        for func in self.processors:
+            if value is None:
+                break
+            value = func(value)
+        return value
+
+
+class Extractor():
+    """将一组字段声明编译为XPath表达式，并从网页中提取这些字段"""
+    def __init__(self, name: str, fields: Dict[str, Field], scopes: Dict[str, str] = None,
+                 exprs: Dict[str, str] = None, namespaces: Dict[str, str] = None) -> None:
+        """
+        Args:
+            name (str): 名称（抓取器名称），用于区分各个字段的耗时统计
+            fields (dict): {字段名: Field}
+            scopes (dict): {作用域名: XPath选择器}，选择器的第一个匹配结果作为该作用域的节点
+            exprs (dict): {名称: XPath表达式}，其他需要在抓取器中直接使用的表达式，可以通过xp.名称访问
+            namespaces (dict): 选择器中用到的命名空间前缀
+        """
+        self.name = name.split('.')[-1]
+        self.fields = fields
+        self.xp = XPathRegistry(name, exprs, namespaces=namespaces)
+        self._scopes = {}
+        for key, path in (scopes or {}).items():
+            self._scopes[key] = self.xp.add(f'scope:{key}', path)
+        self._exprs = {}
+        for key, field in fields.items():
+            if field.scope is not None and field.scope not in self._scopes:
+                raise ValueError(f"字段'{self.name}.{key}'使用了未定义的作用域: '{field.scope}'")
+            self._exprs[key] = self.xp.add(key, field.path)
+
+    def extract(self, html, keys: Iterable[str] = None) -> dict:
+        """从html中提取字段，keys为None时提取所有字段
+
+        Returns:
+            dict: {字段名: 值}，没有提取到有效结果的字段的值为其default
+        """
+        keys = self.fields.keys() if keys is None else keys
+        nodes = {None: html}
+        values = {}
+        for key in keys:
+            field = self.fields[key]
+            if field.scope not in nodes:
+                found = self._scopes[field.scope](html)
+                nodes[field.scope] = found[0] if found else None
+            node = nodes[field.scope]
+            results = self._exprs[key](node, **field.variables) if node is not None else []
+            if field.many:
+                value = [i for i in map(field.process, results) if i is not None]
+                valid = bool(value)
+            else:
+                value = next((i for i in map(field.process, results) if i is not None), None)
+                valid = value is not None
+            if not valid:
+                if field.required:
+                    raise ValueError(f"{self.name}: 未能从网页中提取到'{key}'，网页布局可能已经改变")
+                value = field.default if not field.many or field.default is not None else []
+            values[key] = value
+        return values
 
 
 class BaseCrawler(abc.ABC):
-    """爬虫基类，定义统一的接口"""
-    
+    """爬虫基类，定义统一的接口
+
+    子类可以通过以下类属性声明字段的提取方式，然后在parse_data中调用extract()完成提取:
+        fields: {字段名: Field}，字段名与MovieInfo的属性同名时，提取结果会直接更新到MovieInfo中，
+                以'_'开头的字段仅用于子类的后续处理
+        scopes: {作用域名: XPath选择器}
+        exprs: {名称: XPath表达式}，不适合声明为字段、需要在抓取器中直接使用的表达式（如搜索结果的处理），通过self.xp访问
+        namespaces: 选择器中用到的命名空间前缀
+    """
+    fields: Dict[str, Field] = {}
+    scopes: Dict[str, str] = {}
+    exprs: Dict[str, str] = {}
+    namespaces: Optional[Dict[str, str]] = None
+
     def __init__(self):
         self.name = self.__class__.__name__.lower()
-    
+
+    @classmethod
+    def extractor(cls) -> Extractor:
+        """获取此抓取器的提取引擎（每个子类只编译一次）"""
+        extractor = cls.__dict__.get('_extractor')
+        if extractor is None:
+            extractor = Extractor(cls.__module__, cls.fields, cls.scopes, cls.exprs, cls.namespaces)
+            cls._extractor = extractor
+        return extractor
+
+    @property
+    def xp(self) -> XPathRegistry:
+        """字段和exprs中的表达式所在的XPathRegistry"""
+        return self.extractor().xp
+
+    def extract(self, html, movie: MovieInfo = None, keys: Iterable[str] = None) -> dict:
+        """提取声明的字段，如果指定了movie，则将与MovieInfo属性同名的字段的有效结果更新到movie中"""
+        values = self.extractor().extract(html, keys)
+        if movie is not None:
+            for key, value in values.items():
+                if not key.startswith('_') and value is not None and hasattr(movie, key):
+                    setattr(movie, key, value)
+        return values
+
     @abc.abstractmethod
     def parse_data(self, info: MovieInfo) -> None:
         """解析数据并填充到 MovieInfo 对象中
-        
+
         Args:
             info: MovieInfo 对象，用于存储解析结果
         """
         pass
-    
+
     @abc.abstractmethod
     def get_genre_norm(self, genre: list) -> list:
         """获取统一后的影片分类标签
-        
+
         Args:
             genre: 原始分类标签列表
-            
+
         Returns:
             统一后的分类标签列表
         """
         pass
-    
+
     @abc.abstractmethod
     def resolve_actress(self, actress: list) -> list:
         """解析女优名称，处理别名和标准化
-        
+
         Args:
             actress: 原始女优名称列表
-            
+
         Returns:
             标准化后的女优名称列表
         """
         pass
-    
+
     def get_movie_info(self, dvdid: str, cid: Optional[str] = None) -> MovieInfo:
         """获取影片信息的便捷方法
-        
+
         Args:
             dvdid: DVD ID
             cid: DMM Content ID（可选）
-            
+
         Returns:
             解析后的 MovieInfo 对象
         """
         info = MovieInfo(dvdid, cid=cid)
         self.parse_data(info)
-        return info
\ No newline at end of file
+        return info
@@ -0,0 +1,98 @@
+"""按抓取器熔断持续失败的站点"""
+# 站点封锁了当前IP（SiteBlocked）、cookies全部失效（CredentialError）或者持续超时的时候，以前每部影片仍然会
+# 去请求这个站点，每次都要等待retry×timeout并输出同样的错误。这里为每个抓取器维护一个熔断器:
+# - closed: 正常状态，连续的网络错误达到阈值时进入open状态；站点封锁、凭据错误会立即进入open状态
+#   （权限错误SitePermissionError只针对个别影片，站点本身是正常的，按成功处理）
+# - open: 冷却期内跳过该抓取器；冷却期结束后进入half-open状态
+# - half-open: 只放行一个探测请求，成功则恢复closed状态，失败则再次进入open状态
+import time
+import logging
+import threading
+
+from javsp.config import Cfg
+
+
+__all__ = ['CircuitBreaker', 'get_breaker']
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker():
+    """单个站点的熔断器"""
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name: str, failure_threshold: int, cooldown: float) -> None:
+        """
+        Args:
+            name (str): 熔断器的名称（抓取器名称），用于日志
+            failure_threshold (int): 连续多少次网络错误后熔断
+            cooldown (float): 熔断后经过多少秒再尝试探测
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = 0.0
+        self._probe_started = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """是否允许向站点发起请求（half-open状态下仅允许一个探测请求）"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                if now - self._opened_at < self.cooldown:
+                    return False
+                self.state = self.HALF_OPEN
+                logger.debug(f"{self.name}: 冷却期结束，尝试探测站点")
+            # 探测请求可能没有任何结果就中止了（例如抓取器内部的异常），此时等待一个冷却期后再次探测
+            if self._probe_started is not None and now - self._probe_started < self.cooldown:
+                return False
+            self._probe_started = now
+            return True
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+
+    def record_success(self) -> None:
+        """站点正常响应（包括站点上没有影片的情况）"""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"{self.name}: 站点已恢复")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_started = None
+
+    def record_failure(self, trip=False) -> None:
+        """站点请求失败，trip为True时立即熔断"""
+        with self._lock:
+            self.failures += 1
+            if trip or self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                    logger.warning(f"{self.name}: 站点暂时不可用，将在{self.cooldown:.0f}秒内跳过此抓取器")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_started = None
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+def get_breaker(name: str) -> CircuitBreaker:
+    """获取抓取器的熔断器"""
+    name = name.split('.')[-1]
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            cfg = Cfg().crawler.circuit_breaker
+            breaker = CircuitBreaker(name, cfg.failure_threshold, cfg.cooldown.total_seconds())
+            _breakers[name] = breaker
+        return breaker
@@ -11,6 +11,7 @@ from javsp.web.base import Request, resp2html
 from javsp.web.exceptions import *
 from javsp.config import Cfg
 from javsp.datatype import MovieInfo
+from javsp.web.xpath import XPathRegistry
 
 
 logger = logging.getLogger(__name__)
@@ -19,6 +20,29 @@ base_url = 'https://www.dmm.co.jp'
 request = Request()
 request.cookies = {'age_check_done': '1'}
 request.headers['Accept-Language'] = 'ja,en-US;q=0.9'
+# 注意: 浏览器在渲染时会自动加上了'tbody'字段，但是原始html网页中并没有，因此xpath解析时还是要按原始网页的来
+xp = XPathRegistry(__name__, {
+    'search_result': "//ul[@id='list']/li/div/p/a/@href",
+    'container': "//table[@class='mg-b12']/tr/td",
+    # 以下表达式在container节点上求值: 信息表格中以$label为标题的一行的内容
+    'field_text': ".//td[text()=$label]/following-sibling::td/text()",
+    'field_link': ".//td[text()=$label]/following-sibling::td/a/text()",
+    'field_img': ".//td[text()=$label]/following-sibling::td/img/@src",
+    'videoa_title': "//div[@class='hreview']/h1/text()",
+    'videoa_cover': "//div[@id='sample-video']/a/@href",
+    'videoa_actress': "//span[@id='performer']/a/text()",
+    # fanza会把促销信息也写进genre……因此要根据tag指向的链接类型进行筛选（在container节点上求值）
+    'videoa_genre': ".//td[text()='ジャンル：']/following-sibling::td/a[contains(@href,'?keyword=') or contains(@href,'article=keyword')]",
+    'videoa_plot': "//div[contains(@class, 'mg-b20 lh4')]/text()",
+    'videoa_preview_pics': "//a[@name='sample-image']/img/@src",
+    'videoa_score': "//p[@class='d-review__average']/strong/text()",
+    'player_script': "//script[contains(text(),'getElementById(\"dmmplayer\")')]/text()",
+    'anime_title': "//h1[@id='title']/text()",
+    'anime_cover': "//img[@name='package-image']/@src",
+    'anime_genre': ".//td[text()='ジャンル：']/following-sibling::td/a[contains(@href,'article=keyword')]",
+    'anime_plot': "//div[@class='mg-b20 lh4']/p",
+    'anime_preview_pics': "//a[@name='sample-image']/img/@data-lazy",
+})
 
 
 _PRODUCT_PRIORITY = {'digital': 10, 'mono': 5, 'monthly': 2, 'rental': 1}
@@ -37,7 +61,7 @@ def get_urls_of_cid(cid: str) -> Tuple[str, str]:
         raise MovieNotFoundError(__name__, cid)
     r.raise_for_status()
     html = resp2html_wrapper(r)
-    result = html.xpath("//ul[@id='list']/li/div/p/a/@href")
+    result = xp.search_result(html)
     parsed_result = {}
     for url in result:
         items = url.split('/')
@@ -67,6 +91,14 @@ def resp2html_wrapper(resp):
     return html
 
 
+def get_container(html):
+    """获取影片信息表格所在的节点，页面布局不符合预期时抛出异常"""
+    container = xp.container(html)
+    if not container:
+        raise WebsiteError(f'{__name__}: 页面布局不符合预期，未找到影片信息表格')
+    return container[0]
+
+
 def parse_data(movie: MovieInfo):
     """解析指定番号的影片数据"""
     default_url = f'{base_url}/digital/videoa/-/detail/=/cid={movie.cid}/'
@@ -99,50 +131,48 @@ def parse_data(movie: MovieInfo):
 
 def parse_videoa_page(movie: MovieInfo, html):
     """解析AV影片的页面布局"""
-    title = html.xpath("//div[@class='hreview']/h1/text()")[0]
-    # 注意: 浏览器在渲染时会自动加上了'tbody'字段，但是原始html网页中并没有，因此xpath解析时还是要按原始网页的来
-    container = html.xpath("//table[@class='mg-b12']/tr/td")[0]
-    cover = container.xpath("//div[@id='sample-video']/a/@href")[0]
+    title = xp.videoa_title(html)[0]
+    container = get_container(html)
+    cover = xp.videoa_cover(html)[0]
     # 采用'配信開始日'作为发布日期: https://www.zhihu.com/question/57513172/answer/153219083
-    date_tag = container.xpath("//td[text()='配信開始日：']/following-sibling::td/text()")
+    date_tag = xp.field_text(container, label='配信開始日：')
     if date_tag:
         movie.publish_date = date_tag[0].strip().replace('/', '-')
-    duration_str = container.xpath("//td[text()='収録時間：']/following-sibling::td/text()")[0].strip()
+    duration_str = xp.field_text(container, label='収録時間：')[0].strip()
     match = re.search(r'\d+', duration_str)
     if match:
         movie.duration = match.group(0)
     # 女优、导演、系列：字段不存在时，匹配将得到空列表。暂未发现有名字不显示在a标签中的情况
-    actress = container.xpath("//span[@id='performer']/a/text()")
-    director_tag = container.xpath("//td[text()='監督：']/following-sibling::td/a/text()")
+    actress = xp.videoa_actress(html)
+    director_tag = xp.field_link(container, label='監督：')
     if director_tag:
         movie.director = director_tag[0].strip()
-    serial_tag = container.xpath("//td[text()='シリーズ：']/following-sibling::td/a/text()")
+    serial_tag = xp.field_link(container, label='シリーズ：')
     if serial_tag:
         movie.serial = serial_tag[0].strip()
-    producer_tag = container.xpath("//td[text()='メーカー：']/following-sibling::td/a/text()")
+    producer_tag = xp.field_link(container, label='メーカー：')
     if producer_tag:
         movie.producer = producer_tag[0].strip()
     # label: 大意是某个系列策划用同样的番号，例如ABS打头的番号label是'ABSOLUTELY PERFECT'，暂时用不到
-    # label_tag = container.xpath("//td[text()='レーベル：']/following-sibling::td/a/text()")
+    # label_tag = xp.field_link(container, label='レーベル：')
     # if label_tag:
     #     label = label_tag[0].strip()
-    # fanza会把促销信息也写进genre……因此要根据tag指向的链接类型进行筛选
-    genre_tags = container.xpath("//td[text()='ジャンル：']/following-sibling::td/a[contains(@href,'?keyword=') or contains(@href,'article=keyword')]")
+    genre_tags = xp.videoa_genre(container)
     genre, genre_id = [], []
     for tag in genre_tags:
         genre.append(tag.text.strip())
         genre_id.append(tag.get('href').split('=')[-1].strip('/'))
-    cid = container.xpath("//td[text()='品番：']/following-sibling::td/text()")[0].strip()
-    plot = container.xpath("//div[contains(@class, 'mg-b20 lh4')]/text()")[0].strip()
-    preview_pics = container.xpath("//a[@name='sample-image']/img/@src")
-    score_tag = container.xpath("//p[@class='d-review__average']/strong/text()")
+    cid = xp.field_text(container, label='品番：')[0].strip()
+    plot = xp.videoa_plot(html)[0].strip()
+    preview_pics = xp.videoa_preview_pics(html)
+    score_tag = xp.videoa_score(html)
     if score_tag:
         match = re.search(r'\d+', score_tag[0].strip())
         if match:
             score = float(match.group()) * 2
             movie.score = f'{score:.2f}'
     else:
-        score_img = container.xpath("//td[text()='平均評価：']/following-sibling::td/img/@src")[0]
+        score_img = xp.field_img(container, label='平均評価：')[0]
         movie.score = int(score_img.split('/')[-1].split('.')[0]) # 00, 05 ... 50
     
     if Cfg().crawler.hardworking:
@@ -150,7 +180,7 @@ def parse_videoa_page(movie: MovieInfo, html):
         video_url = f'{base_url}/service/digitalapi/-/html5_player/=/cid={movie.cid}'
         html2 = request.get_html(video_url)
         # 目前用到js脚本的地方不多，所以不使用专门的js求值模块，先用正则提取文本然后用json解析数据
-        script = html2.xpath("//script[contains(text(),'getElementById(\"dmmplayer\")')]/text()")[0].strip()
+        script = xp.player_script(html2)[0].strip()
         match = re.search(r'\{.*\}', script)
         # 主要是为了捕捉json.loads的异常，但是也借助try-except判断是否正则表达式是否匹配
         try:
@@ -175,29 +205,29 @@ def parse_videoa_page(movie: MovieInfo, html):
 
 def parse_anime_page(movie: MovieInfo, html):
     """解析动画影片的页面布局"""
-    title = html.xpath("//h1[@id='title']/text()")[0]
-    container = html.xpath("//table[@class='mg-b12']/tr/td")[0]
-    cover = container.xpath("//img[@name='package-image']/@src")[0]
-    date_str = container.xpath("//td[text()='発売日：']/following-sibling::td/text()")[0].strip()
+    title = xp.anime_title(html)[0]
+    container = get_container(html)
+    cover = xp.anime_cover(html)[0]
+    date_str = xp.field_text(container, label='発売日：')[0].strip()
     publish_date = date_str.replace('/', '-')
-    duration_tag = container.xpath("//td[text()='収録時間：']/following-sibling::td/text()")
+    duration_tag = xp.field_text(container, label='収録時間：')
     if duration_tag:
         movie.duration = duration_tag[0].strip().replace('分', '')
-    serial_tag = container.xpath("//td[text()='シリーズ：']/following-sibling::td/a/text()")
+    serial_tag = xp.field_link(container, label='シリーズ：')
     if serial_tag:
         movie.serial = serial_tag[0].strip()
-    producer_tag = container.xpath("//td[text()='メーカー：']/following-sibling::td/a/text()")
+    producer_tag = xp.field_link(container, label='メーカー：')
     if producer_tag:
         movie.producer = producer_tag[0].strip()
-    genre_tags = container.xpath("//td[text()='ジャンル：']/following-sibling::td/a[contains(@href,'article=keyword')]")
+    genre_tags = xp.anime_genre(container)
     genre, genre_id = [], []
     for tag in genre_tags:
         genre.append(tag.text.strip())
         genre_id.append(tag.get('href').split('=')[-1].strip('/'))
-    cid = container.xpath("//td[text()='品番：']/following-sibling::td/text()")[0].strip()
-    plot = container.xpath("//div[@class='mg-b20 lh4']/p")[0].text_content().strip()
-    preview_pics = container.xpath("//a[@name='sample-image']/img/@data-lazy")
-    score_img = container.xpath("//td[text()='平均評価：']/following-sibling::td/img/@src")[0]
+    cid = xp.field_text(container, label='品番：')[0].strip()
+    plot = xp.anime_plot(html)[0].text_content().strip()
+    preview_pics = xp.anime_preview_pics(html)
+    score_img = xp.field_img(container, label='平均評価：')[0]
     score = int(score_img.split('/')[-1].split('.')[0]) # 00, 05 ... 50
 
     movie.cid = cid
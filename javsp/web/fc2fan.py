@@ -4,10 +4,10 @@ import os
 import re
 import logging
 import lxml.html
-import requests
 
 
 from javsp.web.base import resp2html
+from javsp.web.session import session_get
 from javsp.web.exceptions import *
 from javsp.config import Cfg
 from javsp.datatype import MovieInfo
@@ -27,7 +27,7 @@ def parse_data(movie: MovieInfo):
         html = lxml.html.parse(html_file)
     else:
         url = f"https://fc2club.top/html/{movie.dvdid}.html"
-        r = requests.get(url)
+        r = session_get(url)
         if r.status_code == 404:
             raise MovieNotFoundError(__name__, movie.dvdid)
         elif r.text == '':
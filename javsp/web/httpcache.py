@@ -0,0 +1,236 @@
+"""网页请求的本地磁盘缓存"""
+# 重复整理同一批影片，或者在后续步骤失败后重试时，各个抓取器会再次请求完全相同的网页。
+# 这里将GET请求的响应压缩后保存到SQLite数据库中（以URL和影响响应内容的请求头作为键）：
+# - 在有效期（可以按抓取器分别设置）内直接使用缓存
+# - 过期后如果有ETag/Last-Modified，则发送条件请求进行验证，服务器返回304时继续使用缓存
+# - 缓存总大小超出限制时，按最近访问时间淘汰最久未使用的条目
+# SQLite的WAL模式保证了多线程/多进程同时读写缓存的安全性
+import os
+import json
+import time
+import zlib
+import hashlib
+import logging
+import threading
+from typing import Callable
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+from javsp.config import Cfg
+from javsp.store import SqliteStore, cache_dir
+from javsp.web.throttle import current_crawler
+
+
+__all__ = ['HttpCache', 'get_http_cache', 'close_http_cache', 'cache_ttl']
+
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+'''
+
+# 这些请求头会影响服务器返回的内容，需要作为缓存键的一部分
+_VARY_HEADERS = ('accept-language', 'cookie', 'authorization')
+# 不需要保存到缓存中的响应头
+_SKIP_HEADERS = ('set-cookie', 'content-encoding', 'content-length', 'transfer-encoding', 'connection')
+
+
+def _make_key(url: str, headers: dict, cookies: dict) -> str:
+    lower = {k.lower(): v for k, v in (headers or {}).items()}
+    vary = [(k, lower[k]) for k in _VARY_HEADERS if k in lower]
+    items = [url, vary, sorted((cookies or {}).items())]
+    return hashlib.sha1(json.dumps(items, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+
+def _build_response(url: str, status: int, headers: dict, body: bytes) -> Response:
+    """用缓存的数据构造Response"""
+    r = Response()
+    r.status_code = status
+    r.url = url
+    r.headers = CaseInsensitiveDict(headers)
+    r._content = body
+    r.reason = 'OK'
+    r.from_cache = True
+    return r
+
+
+def cache_ttl() -> float:
+    """当前线程所属抓取器的缓存有效期（秒）"""
+    cfg = Cfg().network.http_cache
+    crawler = current_crawler()
+    if crawler:
+        name = crawler.split('.')[-1]
+        ttl = {k.value: v for k, v in cfg.crawler.items()}.get(name)
+        if ttl is not None:
+            return ttl.total_seconds()
+    return cfg.default_ttl.total_seconds()
+
+
+# 每写入多少次后重新从数据库读取缓存的总大小
+_RESYNC_PUTS = 100
+
+class HttpCache():
+    """保存GET请求响应的磁盘缓存"""
+    def __init__(self, path: str, max_size: int) -> None:
+        self.store = SqliteStore(path, _SCHEMA)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # 缓存总大小的估计值，只用来判断是否需要淘汰: 首次需要时从数据库读取，之后随本进程的写入和淘汰更新，
+        # 每写入_RESYNC_PUTS次重新读取一次，以反映其他进程的写入和淘汰
+        self._total = None
+        self._puts = 0
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def get(self, url: str, headers: dict, cookies: dict, fetch: Callable[[dict], Response], ttl: float) -> Response:
+        """获取url的响应，必要时调用fetch发起实际的请求
+
+        Args:
+            headers, cookies: 请求使用的请求头和cookies（影响缓存键）
+            fetch: 发起请求的函数，参数为需要额外添加的请求头（用于条件请求）
+            ttl: 缓存的有效期（秒），不大于0时不使用缓存
+        """
+        if ttl <= 0:
+            return fetch({})
+        key = _make_key(url, headers, cookies)
+        rows = self.store.query('SELECT url, status, headers, body, stored FROM responses WHERE key=?', (key,))
+        now = time.time()
+        if rows:
+            final_url, status, resp_headers, body, stored = rows[0]
+            resp_headers = json.loads(resp_headers)
+            if now - stored < ttl:
+                self._touch(key, now)
+                with self._lock:
+                    self.hits += 1
+                logger.debug(f"使用缓存: {url}")
+                return _build_response(final_url, status, resp_headers, zlib.decompress(body))
+            # 缓存已过期，尝试进行条件请求
+            conditional = {}
+            lower = {k.lower(): v for k, v in resp_headers.items()}
+            if 'etag' in lower:
+                conditional['If-None-Match'] = lower['etag']
+            if 'last-modified' in lower:
+                conditional['If-Modified-Since'] = lower['last-modified']
+            if conditional:
+                r = fetch(conditional)
+                if r.status_code == 304:
+                    self.store.execute('UPDATE responses SET stored=?, accessed=? WHERE key=?', (now, now, key))
+                    with self._lock:
+                        self.revalidated += 1
+                    logger.debug(f"缓存验证有效: {url}")
+                    return _build_response(final_url, status, resp_headers, zlib.decompress(body))
+                self.put(key, r)
+                return r
+        r = fetch({})
+        with self._lock:
+            self.misses += 1
+        self.put(key, r)
+        return r
+
+    def put(self, key: str, r: Response) -> None:
+        """保存响应（仅保存状态码为200、没有经过重定向且允许缓存的响应）"""
+        if r.status_code != 200:
+            return
+        # 抓取器会根据重定向历史和最终的URL判断是否跳转到了登录/付费页面，缓存中无法还原这些信息
+        if r.history:
+            return
+        cache_control = r.headers.get('Cache-Control', '').lower()
+        if 'no-store' in cache_control:
+            return
+        resp_headers = {k: v for k, v in r.headers.items() if k.lower() not in _SKIP_HEADERS}
+        body = zlib.compress(r.content)
+        now = time.time()
+        old = self.store.query('SELECT size FROM responses WHERE key=?', (key,))
+        self.store.execute('INSERT OR REPLACE INTO responses (key, url, status, headers, body, size, stored, accessed)'
+                           ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                           (key, r.url, r.status_code, json.dumps(resp_headers), body, len(body), now, now))
+        self._add_size(len(body) - (old[0][0] if old else 0))
+        with self._lock:
+            self._puts += 1
+            if self._puts % _RESYNC_PUTS == 0:
+                self._total = None
+        self.evict()
+
+    def _touch(self, key: str, now: float):
+        self.store.execute('UPDATE responses SET accessed=? WHERE key=?', (now, key))
+
+    def size(self) -> int:
+        """缓存的总大小（压缩后的字节数）"""
+        with self._lock:
+            if self._total is None:
+                self._total = self.store.query('SELECT COALESCE(SUM(size), 0) FROM responses')[0][0]
+            return self._total
+
+    def _add_size(self, delta: int):
+        with self._lock:
+            if self._total is not None:
+                self._total += delta
+
+    def evict(self) -> int:
+        """总大小超出限制时，淘汰最久未访问的条目直至总大小降至限制的90%，返回淘汰的条目数"""
+        if self.size() <= self.max_size:
+            return 0
+        target = self.max_size * 0.9
+        removed = []
+        freed = 0
+        # 在写事务中重新统计总大小，其他进程可能同时写入或淘汰了缓存，不能依赖本进程的估计值
+        with self.store.conn as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total > self.max_size:
+                for key, size in conn.execute('SELECT key, size FROM responses ORDER BY accessed'):
+                    if total - freed <= target:
+                        break
+                    removed.append((key,))
+                    freed += size
+                conn.executemany('DELETE FROM responses WHERE key=?', removed)
+        with self._lock:
+            self._total = total - freed
+        if removed:
+            logger.debug(f"清理了{len(removed)}个缓存条目")
+        return len(removed)
+
+    def clear(self):
+        self.store.execute('DELETE FROM responses')
+        with self._lock:
+            self._total = 0
+
+    def close(self):
+        self.store.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+def get_http_cache() -> HttpCache | None:
+    """获取全局的网页缓存，未启用缓存时返回None"""
+    global _cache
+    cfg = Cfg().network.http_cache
+    if not cfg.enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache(os.path.join(cache_dir(), 'http.db'), cfg.max_size)
+        return _cache
+
+
+def close_http_cache():
+    """关闭全局的网页缓存（会在关闭时将WAL日志写回数据库文件）"""
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
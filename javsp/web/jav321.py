@@ -53,8 +53,11 @@ def parse_data(movie: MovieInfo):
     # 仅部分影片有评分且评分只能粗略到星级而没有分数，要通过星级的图片来判断，如'/img/35.gif'表示3.5星
     score_tag = info.xpath("//b[text()='平均評価']/following-sibling::img/@data-original")
     if score_tag:
-        score = int(score_tag[0][5:7])/5   # /10*2
-        movie.score = str(score)
+        # 链接已被转换为绝对地址，从文件名中提取星级
+        match = re.search(r'(\d+)\.gif$', score_tag[0])
+        if match:
+            score = int(match.group(1))/5   # /10*2
+            movie.score = str(score)
     serial_tag = info.xpath("a[contains(@href,'/series/')]/text()")
     if serial_tag:
         movie.serial = serial_tag[0]
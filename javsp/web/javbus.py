@@ -7,6 +7,7 @@ from javsp.web.exceptions import *
 from javsp.func import *
 from javsp.config import Cfg, CrawlerID
 from javsp.datatype import MovieInfo, GenreMap
+from javsp.web.base_crawler import BaseCrawler, Field, minutes, next_text, normalize_date, strip, tail
 
 
 logger = logging.getLogger(__name__)
@@ -18,87 +19,87 @@ else:
     base_url = str(Cfg().network.proxy_free[CrawlerID.javbus])
 
 
-def parse_data(movie: MovieInfo):
-    """从网页抓取并解析指定番号的数据
-    Args:
-        movie (MovieInfo): 要解析的影片信息，解析后的信息直接更新到此变量内
-    """
-    url = f'{base_url}/{movie.dvdid}'
-    resp = request_get(url, delay_raise=True)
-    # 疑似JavBus检测到类似爬虫的行为时会要求登录，不过发现目前不需要登录也可以从重定向前的网页中提取信息
-    if resp.history and resp.history[0].status_code == 302:
-        html = resp2html(resp.history[0])
-    else:
-        html = resp2html(resp)
-    # 引入登录验证后状态码不再准确，因此还要额外通过检测标题来确认是否发生了404
-    page_title = html.xpath('/html/head/title/text()')
-    if page_title and page_title[0].startswith('404 Page Not Found!'):
-        raise MovieNotFoundError(__name__, movie.dvdid)
-
-    container = html.xpath("//div[@class='container']")[0]
-    title = container.xpath("h3/text()")[0]
-    cover = container.xpath("//a[@class='bigImage']/img/@src")[0]
-    preview_pics = container.xpath("//div[@id='sample-waterfall']/a/@href")
-    info = container.xpath("//div[@class='col-md-3 info']")[0]
-    dvdid = info.xpath("p/span[text()='識別碼:']")[0].getnext().text
-    publish_date = info.xpath("p/span[text()='發行日期:']")[0].tail.strip()
-    duration = info.xpath("p/span[text()='長度:']")[0].tail.replace('分鐘', '').strip()
-    director_tag = info.xpath("p/span[text()='導演:']")
-    if director_tag:    # xpath没有匹配时将得到空列表
-        movie.director = director_tag[0].getnext().text.strip()
-    producer_tag = info.xpath("p/span[text()='製作商:']")
-    if producer_tag:
-        text = producer_tag[0].getnext().text
-        if text:
-            movie.producer = text.strip()
-    publisher_tag = info.xpath("p/span[text()='發行商:']")
-    if publisher_tag:
-        movie.publisher = publisher_tag[0].getnext().text.strip()
-    serial_tag = info.xpath("p/span[text()='系列:']")
-    if serial_tag:
-        movie.serial = serial_tag[0].getnext().text
-    # genre, genre_id
-    genre_tags = info.xpath("//span[@class='genre']/label/a")
-    genre, genre_id = [], []
-    for tag in genre_tags:
-        tag_url = tag.get('href')
-        pre_id = tag_url.split('/')[-1]
-        genre.append(tag.text)
-        if 'uncensored' in tag_url:
-            movie.uncensored = True
-            genre_id.append('uncensored-' + pre_id)
+class JavBus(BaseCrawler):
+    scopes = {
+        'container': "//div[@class='container']",
+        'info': "//div[@class='col-md-3 info']",
+    }
+    fields = {
+        'title': Field("h3/text()", scope='container', required=True),
+        'cover': Field("//a[@class='bigImage']/img/@src", required=True),
+        'preview_pics': Field("//div[@id='sample-waterfall']/a/@href", many=True),
+        'dvdid': Field("p/span[text()=$label]", next_text, strip, scope='info', required=True, variables={'label': '識別碼:'}),
+        # 丢弃无效的发布日期(0000-00-00)
+        'publish_date': Field("p/span[text()=$label]", tail, normalize_date, scope='info', variables={'label': '發行日期:'}),
+        'duration': Field("p/span[text()=$label]", tail, minutes, scope='info', variables={'label': '長度:'}),
+        'director': Field("p/span[text()=$label]", next_text, strip, scope='info', variables={'label': '導演:'}),
+        'producer': Field("p/span[text()=$label]", next_text, strip, scope='info', variables={'label': '製作商:'}),
+        'publisher': Field("p/span[text()=$label]", next_text, strip, scope='info', variables={'label': '發行商:'}),
+        'serial': Field("p/span[text()=$label]", next_text, scope='info', variables={'label': '系列:'}),
+        # 分类的名称和链接从同一个节点中提取，确保两者一一对应
+        '_genre_tags': Field("//span[@class='genre']/label/a", many=True),
+        # JavBus的磁力链接是依赖js脚本加载的，无法通过静态网页来解析
+        'actress': Field("//a[@class='avatar-box']/div/img/@title", many=True),
+        '_actress_imgs': Field("//a[@class='avatar-box']/div/img", many=True),
+        '_page_title': Field("/html/head/title/text()"),
+    }
+
+    def parse_data(self, movie: MovieInfo):
+        """从网页抓取并解析指定番号的数据
+        Args:
+            movie (MovieInfo): 要解析的影片信息，解析后的信息直接更新到此变量内
+        """
+        avid = movie.dvdid
+        url = f'{base_url}/{avid}'
+        resp = request_get(url, delay_raise=True)
+        # 疑似JavBus检测到类似爬虫的行为时会要求登录，不过发现目前不需要登录也可以从重定向前的网页中提取信息
+        if resp.history and resp.history[0].status_code == 302:
+            html = resp2html(resp.history[0])
         else:
-            movie.uncensored = False
-            genre_id.append(pre_id)
-    # JavBus的磁力链接是依赖js脚本加载的，无法通过静态网页来解析
-    # actress, actress_pics
-    actress, actress_pics = [], {}
-    actress_tags = html.xpath("//a[@class='avatar-box']/div/img")
-    for tag in actress_tags:
-        name = tag.get('title')
-        pic_url = tag.get('src')
-        actress.append(name)
-        if not pic_url.endswith('nowprinting.gif'):     # 略过默认的头像
-            actress_pics[name] = pic_url
-    # 整理数据并更新movie的相应属性
-    movie.url = f'{permanent_url}/{movie.dvdid}'
-    movie.dvdid = dvdid
-    movie.title = title.replace(dvdid, '').strip()
-    movie.cover = cover
-    movie.preview_pics = preview_pics
-    if publish_date != '0000-00-00':    # 丢弃无效的发布日期
-        movie.publish_date = publish_date
-    movie.duration = duration if int(duration) else None
-    movie.genre = genre
-    movie.genre_id = genre_id
-    movie.actress = actress
-    movie.actress_pics = actress_pics
+            html = resp2html(resp)
+        # 引入登录验证后状态码不再准确，因此还要额外通过检测标题来确认是否发生了404
+        page_title = self.extract(html, keys=['_page_title'])['_page_title']
+        if page_title and page_title.startswith('404 Page Not Found!'):
+            raise MovieNotFoundError(__name__, avid)
+
+        keys = [i for i in self.fields if i != '_page_title']
+        data = self.extract(html, movie, keys)
+        # genre_id: 有码和无码影片的分类id可能相同，因此为无码影片的分类id加上前缀
+        genre, genre_id = [], []
+        for tag in data['_genre_tags']:
+            tag_url = tag.get('href')
+            if not (tag.text and tag_url):
+                continue
+            pre_id = tag_url.split('/')[-1]
+            movie.uncensored = 'uncensored' in tag_url
+            genre.append(tag.text)
+            genre_id.append('uncensored-' + pre_id if movie.uncensored else pre_id)
+        movie.genre = genre
+        movie.genre_id = genre_id
+        actress_pics = {}
+        for tag in data['_actress_imgs']:
+            pic_url = tag.get('src')
+            if not pic_url.endswith('nowprinting.gif'):     # 略过默认的头像
+                actress_pics[tag.get('title')] = pic_url
+        movie.actress_pics = actress_pics
+        movie.url = f'{permanent_url}/{avid}'
+        movie.title = data['title'].replace(movie.dvdid, '').strip()
+
+    def get_genre_norm(self, genre_id: list) -> list:
+        return genre_map.map(genre_id)
+
+    def resolve_actress(self, actress: list) -> list:
+        return actress
+
+
+crawler = JavBus()
+parse_data = crawler.parse_data
 
 
 def parse_clean_data(movie: MovieInfo):
     """解析指定番号的影片数据并进行清洗"""
     parse_data(movie)
-    movie.genre_norm = genre_map.map(movie.genre_id)
+    movie.genre_norm = crawler.get_genre_norm(movie.genre_id)
     movie.genre_id = None   # 没有别的地方需要再用到，清空genre id（暗示已经完成转换）
 
 
@@ -0,0 +1,159 @@
+"""并发探测封面候选地址，只下载最合适的一张"""
+# 以前download_cover依次尝试每个高清封面和普通封面地址，每个地址还要重试多次，失败的地址往往要耗费大量时间。
+# 这里先并发地用Range请求获取每个候选地址的前几KiB数据，从文件头中解析出图片分辨率（不需要下载完整的图片），
+# 根据是否可用、内容类型、文件大小和图片分辨率对候选地址排序，
+# 之后只需要完整下载排名最靠前的一张图片
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Collection, List
+
+import requests
+
+from javsp.config import Cfg
+from javsp.image import parse_image_size
+from javsp.web.base import headers, read_proxy
+from javsp.web.session import session_get
+from javsp.web.throttle import throttle
+
+
+__all__ = ['ProbeResult', 'probe_image', 'rank_covers']
+
+
+logger = logging.getLogger(__name__)
+# 探测时先读取的数据量，绝大多数图片的分辨率信息都位于文件开头的几KiB之内
+PROBE_BYTES = 16 * 1024
+# 带有较大EXIF数据的JPEG的SOF可能较靠后，此时最多再读取到这个位置
+PROBE_MAX_BYTES = 128 * 1024
+
+
+class ProbeResult():
+    """候选图片地址的探测结果"""
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.ok = False             # 地址是否可用
+        self.status = None          # HTTP状态码
+        self.content_type = ''
+        self.size = -1              # 文件大小（字节），未知时为-1
+        self.width = 0              # 图片分辨率，未知时为0
+        self.height = 0
+        self.elapsed = 0.0
+
+    @property
+    def area(self) -> int:
+        return self.width * self.height
+
+    def __repr__(self) -> str:
+        return (f"ProbeResult('{self.url}', ok={self.ok}, status={self.status}, size={self.size}, "
+                f"{self.width}x{self.height}, {self.elapsed:.2f}s)")
+
+
+def _referer(url: str) -> dict:
+    req_headers = headers.copy()
+    if 'arzon' in url:
+        req_headers['Referer'] = 'https://www.arzon.jp/'
+    else:
+        req_headers['Referer'] = url[:url.find('/', 8)+1]
+    return req_headers
+
+
+def _fetch_range(url: str, req_headers: dict, start: int, end: int, result: ProbeResult) -> bytes | None:
+    """请求[start, end]范围的数据，并根据响应更新result的状态码、内容类型和文件大小"""
+    req_headers = dict(req_headers, Range=f'bytes={start}-{end}')
+    throttle(url)
+    r = session_get(url, headers=req_headers, proxies=read_proxy(), stream=True,
+                    timeout=Cfg().network.timeout.total_seconds())
+    with r:
+        result.status = r.status_code
+        if r.status_code not in (200, 206):
+            return None
+        result.content_type = r.headers.get('Content-Type', '').lower()
+        if r.status_code == 206 and '/' in r.headers.get('Content-Range', ''):
+            total = r.headers['Content-Range'].rsplit('/', 1)[1]
+            result.size = int(total) if total.isdigit() else -1
+        else:
+            result.size = int(r.headers.get('Content-Length', -1))
+        if r.status_code == 206:
+            return r.content
+        # 服务器不支持Range请求时，读取到所需的数据量后即断开连接
+        data = b''
+        for chunk in r.iter_content(chunk_size=4096):
+            data += chunk
+            if len(data) > end:
+                break
+        return data[start:end+1]
+
+
+def probe_image(url: str) -> ProbeResult:
+    """请求图片开头的少量数据，检查地址是否可用，并从文件头中解析文件大小、分辨率"""
+    result = ProbeResult(url)
+    if not url.startswith('http'):
+        # 本地文件（fc2fan的本地镜像）总是视为可用
+        result.ok = True
+        return result
+    req_headers = _referer(url)
+    start = time.perf_counter()
+    try:
+        data = _fetch_range(url, req_headers, 0, PROBE_BYTES - 1, result)
+        if data is None:
+            return result
+        dimension = parse_image_size(data)
+        if dimension is None and data[:2] == b'\xff\xd8' and len(data) == PROBE_BYTES:
+            more = _fetch_range(url, req_headers, PROBE_BYTES, PROBE_MAX_BYTES - 1, result)
+            if more:
+                dimension = parse_image_size(data + more)
+        if dimension:
+            result.width, result.height = dimension
+        # 能从文件头识别出图片时不论内容类型如何都视为可用（有的服务器返回binary/octet-stream等类型）；
+        # 部分站点的图片不存在时会返回200状态码的网页，这类响应既无法识别为图片，内容类型也不是图片
+        binary = result.content_type.startswith('image/') or result.content_type.endswith('octet-stream')
+        result.ok = dimension is not None or (bool(data) and binary)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.debug(f"探测图片失败: {url}: {e!r}")
+    finally:
+        result.elapsed = time.perf_counter() - start
+    return result
+
+
+def rank_covers(big_covers: List[str], covers: List[str], fallback: Collection[str] = ()) -> List[ProbeResult]:
+    """并发探测所有候选封面，返回按优先级排序的所有候选封面（探测失败的不会被丢弃）
+
+    探测失败的封面（超时、服务器不支持Range请求等）排在所有可用的封面之后，按原有的顺序作为最后的备选。
+    高清封面排在普通封面之前，分辨率不高于普通封面的“高清封面”排在所有普通封面之后。
+    同一类封面中，fallback中的封面（如javdb的带水印封面）总是排在其他封面之后；其余封面中，横版图片排在竖版图片之前，
+    分辨率明显更高（面积大于同组最高分辨率的80%）的排在前面，分辨率相近时保持原有的顺序（即汇总数据时确定的站点优先级）
+    """
+    candidates = []
+    for tier, urls in enumerate((big_covers, covers)):
+        for index, url in enumerate(urls):
+            if url not in [i[2] for i in candidates]:
+                candidates.append((tier, index, url))
+    if not candidates:
+        return []
+    with ThreadPoolExecutor(max_workers=min(8, len(candidates)), thread_name_prefix='probe') as executor:
+        results = list(executor.map(probe_image, [i[2] for i in candidates]))
+    for result in results:
+        logger.debug(result)
+    # 分辨率不高于普通封面的“高清封面”实际上并不是高清封面，将其排在所有普通封面之后
+    normal_area = max([r.area for (tier, _, _), r in zip(candidates, results) if r.ok and tier == 1], default=0)
+    groups = []
+    for (tier, _, url), result in zip(candidates, results):
+        if tier == 0 and result.area and result.area <= normal_area:
+            logger.debug(f"高清封面的分辨率不高于普通封面: {result.url}")
+            tier = 2
+        groups.append((tier, url in fallback))
+    max_area = {}
+    for group, result in zip(groups, results):
+        if result.ok:
+            max_area[group] = max(max_area.get(group, 0), result.area)
+    ranked = []
+    for group, (tier, index, _), result in zip(groups, candidates, results):
+        if not result.ok:
+            ranked.append(((True, tier, group[1], index), result))
+            continue
+        # 封面应当是横版的图片，竖版的图片（通常是海报）只作为备选
+        portrait = result.height > result.width
+        small = result.area < max_area[group] * 0.8
+        ranked.append(((False, *group, portrait, small, index), result))
+    ranked.sort(key=lambda x: x[0])
+    return [i[1] for i in ranked]
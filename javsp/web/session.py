@@ -0,0 +1,118 @@
+"""按主机复用HTTP连接的Session池"""
+# requests.get/post每次调用都会创建新的Session，请求结束后连接随之关闭，因此每个请求都要重新进行TCP和TLS握手，
+# 在高延迟的代理线路上这部分开销非常可观。这里为每个主机维护一个长期存在的Session（连接池大小与并发数相匹配），
+# 各个线程共享这些Session来复用keep-alive连接。
+# 为了保持与requests.get相同的行为，Session不会保存响应中的cookies，所有cookies仍然由调用方显式传入，
+# 只有同一个请求的重定向链内才会携带此前响应中设置的cookies
+import logging
+import threading
+import http.cookiejar
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from javsp.config import Cfg
+
+
+__all__ = ['get_session', 'session_get', 'session_post', 'session_head', 'session_stats', 'log_session_stats']
+
+
+logger = logging.getLogger(__name__)
+
+
+class _RejectAllPolicy(http.cookiejar.DefaultCookiePolicy):
+    """拒绝向Session保存任何cookie（Session在线程间共享，不能让一个请求的cookies影响其他请求）
+
+    这个策略只作用于Session.cookies：requests为每个请求单独创建一个cookie jar（使用默认策略），
+    重定向响应中的Set-Cookie会保存在这个jar中并随后续跳转一起发送，因此重定向链内的cookie仍然有效
+    """
+    def set_ok(self, cookie, request):
+        return False
+
+
+def _pool_size() -> int:
+    """每个主机的连接池大小"""
+    size = Cfg().network.connections_per_host
+    if not size:
+        # 同一主机的并发请求数：同时抓取的影片数加上同时下载图片的影片数（剧照可能并发下载）
+        pipeline = Cfg().pipeline
+        size = max(4, pipeline.crawl_workers + pipeline.image_workers * 4)
+    return size
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+def get_session(url: str) -> requests.Session:
+    """获取url所在主机对应的Session"""
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc.lower())
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            session.cookies.set_policy(_RejectAllPolicy())
+            size = _pool_size()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[key] = session
+        return session
+
+
+def session_get(url, **kwargs) -> requests.Response:
+    """与requests.get相同，但会复用连接"""
+    return get_session(url).get(url, **kwargs)
+
+
+def session_post(url, data=None, json=None, **kwargs) -> requests.Response:
+    """与requests.post相同，但会复用连接"""
+    return get_session(url).post(url, data=data, json=json, **kwargs)
+
+
+def session_head(url, **kwargs) -> requests.Response:
+    """与requests.head相同，但会复用连接"""
+    return get_session(url).head(url, **kwargs)
+
+
+def _iter_pools(adapter: HTTPAdapter):
+    managers = [adapter.poolmanager] + list(adapter.proxy_manager.values())
+    for manager in managers:
+        pools = manager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                yield pool
+
+
+def session_stats() -> dict:
+    """各个主机的连接统计
+
+    Returns:
+        dict: {主机: {'requests': 请求数, 'connections': 新建的连接数, 'reuse_ratio': 连接复用率, 'idle': 空闲的连接数}}
+    """
+    with _sessions_lock:
+        sessions = list(_sessions.items())
+    stats = {}
+    for (_, host), session in sessions:
+        item = stats.setdefault(host, {'requests': 0, 'connections': 0, 'idle': 0})
+        for adapter in set(session.adapters.values()):
+            for pool in _iter_pools(adapter):
+                item['requests'] += pool.num_requests
+                item['connections'] += pool.num_connections
+                # 连接池队列中的None表示尚未创建的连接
+                item['idle'] += sum(1 for conn in list(pool.pool.queue) if conn is not None and conn.sock is not None)
+    for item in stats.values():
+        if item['requests']:
+            item['reuse_ratio'] = 1 - item['connections'] / item['requests']
+        else:
+            item['reuse_ratio'] = 0.0
+    return stats
+
+
+def log_session_stats(level=logging.DEBUG):
+    """将连接统计写入日志"""
+    for host, item in sorted(session_stats().items()):
+        if item['requests']:
+            logger.log(level, f"{host}: {item['requests']} requests, {item['connections']} connections, "
+                              f"reuse {item['reuse_ratio']:.0%}, {item['idle']} idle")
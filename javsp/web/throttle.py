@@ -0,0 +1,104 @@
+"""按站点/按主机对网络请求进行限速"""
+# 以前的做法是每整理完一部影片就全局sleep一段时间，这会让所有站点一起等待，即使只有个别站点需要放慢速度。
+# 这里为每个需要限速的抓取器和主机分别维护一个令牌桶，所有网络请求在发出前都要先取得令牌：
+# 对限速宽松的站点（如fanza, fc2）不做任何等待，而javdb, javlib等站点仍然保持请求间隔
+import time
+import logging
+import threading
+import contextlib
+from urllib.parse import urlsplit
+
+from javsp.config import Cfg
+
+
+__all__ = ['TokenBucket', 'throttle', 'crawler_context', 'current_crawler']
+
+
+logger = logging.getLogger(__name__)
+_local = threading.local()
+
+
+class TokenBucket():
+    """线程安全的令牌桶"""
+    def __init__(self, interval: float, burst: int = 1) -> None:
+        """
+        Args:
+            interval (float): 生成一个令牌所需的秒数，即稳定状态下两次请求的最小间隔
+            burst (int): 令牌桶的容量，即空闲后最多允许连续发出的请求数
+        """
+        self.interval = interval
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """预订一个令牌，返回需要等待的秒数（预订后令牌数可能为负，后来者将排在其后等待）"""
+        with self._lock:
+            now = time.monotonic()
+            if self.interval > 0:
+                self._tokens = min(self.burst, self._tokens + (now - self._last) / self.interval)
+            else:
+                self._tokens = self.burst
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens * self.interval
+
+    def acquire(self) -> float:
+        """阻塞直到取得令牌，返回实际等待的秒数"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+@contextlib.contextmanager
+def crawler_context(name: str):
+    """标记当前线程正在为指定的抓取器发起请求，使请求按该抓取器的限速规则进行"""
+    previous = getattr(_local, 'crawler', None)
+    _local.crawler = name
+    try:
+        yield
+    finally:
+        _local.crawler = previous
+
+
+def current_crawler() -> str | None:
+    """获取当前线程所属的抓取器名称"""
+    return getattr(_local, 'crawler', None)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+def _get_bucket(key, interval: float, burst: int) -> TokenBucket:
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(interval, burst)
+            _buckets[key] = bucket
+        return bucket
+
+
+def throttle(url: str) -> float:
+    """在向url发起请求前调用，按配置的限速规则等待，返回总的等待秒数"""
+    cfg = Cfg().network.rate_limit
+    waited = 0.0
+    # 抓取器的限速针对该抓取器发出的所有请求（无论请求的是哪个域名）
+    crawler = current_crawler()
+    if crawler:
+        name = crawler.split('.')[-1]
+        interval = {k.value: v for k, v in cfg.crawler.items()}.get(name)
+        if interval is not None:
+            waited += _get_bucket(('crawler', name), interval.total_seconds(), cfg.burst).acquire()
+    # 主机的限速针对发往该主机的所有请求（包括下载封面、剧照等图片）
+    host = urlsplit(url).hostname or ''
+    interval = cfg.host.get(host)
+    if interval is None and cfg.default_interval.total_seconds() > 0:
+        interval = cfg.default_interval
+    if interval is not None:
+        waited += _get_bucket(('host', host), interval.total_seconds(), cfg.burst).acquire()
+    if waited > 0:
+        logger.debug(f"限速等待 {waited:.2f}s: {url}")
+    return waited
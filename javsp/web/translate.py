@@ -16,6 +16,7 @@ __all__ = ['translate', 'translate_movie_info']
 from javsp.config import BaiduTranslateEngine, BingTranslateEngine, Cfg, ClaudeTranslateEngine, GoogleTranslateEngine, OpenAITranslateEngine, TranslateEngine
 from javsp.datatype import MovieInfo
 from javsp.web.base import read_proxy
+from javsp.web.session import session_get, session_post
 
 
 logger = logging.getLogger(__name__)
@@ -162,7 +163,7 @@ def baidu_translate(texts, app_id, api_key, to='zh'):
     wait = 1.0 - (now - last_access)
     if wait > 0:
         time.sleep(wait)
-    r = requests.post(api_url, params=payload, headers=headers)
+    r = session_post(api_url, params=payload, headers=headers)
     result = r.json()
     baidu_translate._last_access = time.perf_counter()
     return result
@@ -179,7 +180,7 @@ def bing_translate(texts, api_key, to='zh-Hans'):
         'X-ClientTraceId': str(uuid.uuid4())
     }
     body = [{'text': texts}]
-    r = requests.post(api_url, params=params, headers=headers, json=body)
+    r = session_post(api_url, params=params, headers=headers, json=body)
     result = r.json()
     return result
 
@@ -203,13 +204,13 @@ def google_trans(texts, to='zh_CN'):
         # 重试机制
         for retry in range(3):  # 最多重试3次
             try:
-                r = requests.get(url, proxies=proxies, timeout=30)
+                r = session_get(url, proxies=proxies, timeout=30)
                 
                 # 处理 429 状态码（请求过多）
                 while r.status_code == 429:
                     logger.warning(f"HTTP {r.status_code}: {r.reason}: Google翻译请求超限，将等待{_google_trans_wait}秒后重试")
                     time.sleep(_google_trans_wait)
-                    r = requests.get(url, proxies=proxies, timeout=30)
+                    r = session_get(url, proxies=proxies, timeout=30)
                     if r.status_code == 429:
                         _google_trans_wait += random.randint(60, 90)
                 
@@ -255,7 +256,7 @@ def claude_translate(texts, api_key, to="zh_CN"):
         "max_tokens": 1024,
         "messages": [{"role": "user", "content": texts}],
     }
-    r = requests.post(api_url, headers=headers, json=data)
+    r = session_post(api_url, headers=headers, json=data)
     if r.status_code == 200:
         result = r.json().get("content", [{}])[0].get("text", "").strip()
     else:
@@ -287,7 +288,7 @@ def openai_translate(texts, url: Url, api_key: str, model: str, to="zh_CN"):
          "temperature": 0,
          "max_tokens": 1024,
     }
-    r = requests.post(api_url, headers=headers, json=data)
+    r = session_post(api_url, headers=headers, json=data)
     if r.status_code == 200:
         if 'error' in r.json():
             result = {
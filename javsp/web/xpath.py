@@ -0,0 +1,124 @@
+"""预编译的XPath表达式注册表"""
+# 抓取器以前在每次解析网页时都用字符串调用html.xpath()，lxml每次都要重新编译表达式，javbus、javdb、fanza
+# 解析一个网页就要编译15~30个表达式。这里让每个抓取器在模块加载时一次性声明用到的表达式并编译为etree.XPath，
+# 支持命名空间和XPath变量（例如"p/span[text()=$label]"可以替代多个只有文本不同的表达式），
+# 同时记录每个表达式的调用次数和耗时，便于找出耗时最多的表达式。
+# 表达式在调用时传入的节点上求值：以'//'开头的表达式总是会查找整个文档，只需要查找某个节点内部时应当使用'.//'
+import time
+import logging
+import threading
+from typing import Dict, List
+
+from lxml import etree
+
+
+__all__ = ['XPathExpr', 'XPathRegistry', 'xpath_stats', 'log_xpath_stats']
+
+
+logger = logging.getLogger(__name__)
+_stats_lock = threading.Lock()
+
+
+class XPathExpr():
+    """一个预编译的XPath表达式"""
+    def __init__(self, registry: str, key: str, path: str, namespaces: Dict[str, str] = None, smart_strings=False) -> None:
+        """
+        Args:
+            registry (str): 所属注册表的名称（抓取器名称）
+            key (str): 表达式的名称
+            path (str): XPath表达式，可以包含$name形式的变量
+            namespaces (dict): 表达式中用到的命名空间前缀
+            smart_strings (bool): 文本结果是否保留对所属节点的引用（需要对结果调用getparent()时才需要开启）
+        """
+        self.registry = registry
+        self.key = key
+        self.path = path
+        self._xpath = etree.XPath(path, namespaces=namespaces, smart_strings=smart_strings)
+        self.calls = 0
+        self.elapsed = 0.0
+
+    def __call__(self, node, **variables) -> list:
+        """在node上对表达式求值，variables为表达式中的变量的值"""
+        start = time.perf_counter()
+        try:
+            return self._xpath(node, **variables)
+        finally:
+            elapsed = time.perf_counter() - start
+            with _stats_lock:
+                self.calls += 1
+                self.elapsed += elapsed
+
+    def first(self, node, default=None, **variables):
+        """返回第一个匹配的结果，没有匹配时返回default"""
+        result = self(node, **variables)
+        if isinstance(result, list):
+            return result[0] if result else default
+        # 表达式的结果也可能是数字、字符串或布尔值
+        return result
+
+    def __repr__(self) -> str:
+        return f"XPathExpr('{self.registry}.{self.key}', {self.path!r})"
+
+
+_registries: Dict[str, 'XPathRegistry'] = {}
+class XPathRegistry():
+    """一个抓取器用到的所有XPath表达式，表达式可以通过属性访问，例如xp.title(html)"""
+    def __init__(self, name: str, exprs: Dict[str, str] = None, namespaces: Dict[str, str] = None) -> None:
+        """
+        Args:
+            name (str): 注册表的名称，通常为抓取器模块的__name__
+            exprs (dict): {名称: XPath表达式}
+            namespaces (dict): 所有表达式共用的命名空间前缀
+        """
+        self.name = name.split('.')[-1]
+        self.namespaces = namespaces
+        self._exprs: Dict[str, XPathExpr] = {}
+        for key, path in (exprs or {}).items():
+            self.add(key, path)
+        _registries[self.name] = self
+
+    def add(self, key: str, path: str, namespaces: Dict[str, str] = None, smart_strings=False) -> XPathExpr:
+        """编译并注册一个表达式（表达式有语法错误时会在这里立即抛出异常）"""
+        if key in self._exprs or hasattr(type(self), key):
+            raise ValueError(f"重复的XPath表达式名称: {self.name}.{key}")
+        expr = XPathExpr(self.name, key, path, namespaces or self.namespaces, smart_strings)
+        self._exprs[key] = expr
+        return expr
+
+    def __getattr__(self, key: str) -> XPathExpr:
+        try:
+            return self.__dict__['_exprs'][key]
+        except KeyError:
+            raise AttributeError(f"未定义的XPath表达式: {self.name}.{key}") from None
+
+    def __getitem__(self, key: str) -> XPathExpr:
+        return self._exprs[key]
+
+    def __iter__(self):
+        return iter(self._exprs.values())
+
+    def __len__(self) -> int:
+        return len(self._exprs)
+
+
+def xpath_stats() -> List[dict]:
+    """所有被调用过的表达式的统计，按总耗时降序排列
+
+    Returns:
+        list: [{'name': '抓取器.表达式名称', 'path': 表达式, 'calls': 调用次数, 'elapsed': 总耗时(秒), 'mean': 平均耗时(秒)}]
+    """
+    stats = []
+    for registry in list(_registries.values()):
+        for expr in registry:
+            if expr.calls:
+                stats.append({'name': f'{registry.name}.{expr.key}', 'path': expr.path, 'calls': expr.calls,
+                              'elapsed': expr.elapsed, 'mean': expr.elapsed / expr.calls})
+    stats.sort(key=lambda x: x['elapsed'], reverse=True)
+    return stats
+
+
+def log_xpath_stats(top=10, level=logging.DEBUG):
+    """将耗时最多的表达式写入日志"""
+    for item in xpath_stats()[:top]:
+        logger.log(level, f"{item['name']}: {item['calls']} calls, {item['elapsed']*1000:.1f} ms total, "
+                          f"{item['mean']*1000:.3f} ms/call: {item['path']}")
@@ -7,6 +7,10 @@ base = None
 
 proj_root = os.path.abspath(os.path.dirname(__file__))
 
+# 预编译data文件夹中的数据文件，随程序一起打包以加快启动速度
+from javsp.datafiles import build as build_data
+build_data(f'{proj_root}/data')
+
 
 include_files: List[Tuple[str, str]] = [
     (f'{proj_root}/config.yml', 'config.yml'),
@@ -0,0 +1,76 @@
+"""测量番号识别（get_id、get_cid、guess_av_type）每个文件路径的CPU耗时
+
+用法:
+    python tools/bench_avid.py [-r 重复次数] [测试数据文件]
+
+未指定测试数据时使用unittest/testdata_avid.txt（每行的第一列为文件名）。分别测量:
+    无缓存: cache_size=0的识别器，即每次都完整匹配
+    首次识别: 清空缓存后识别一遍（同一目录内的分片等重复的文件名仍可以命中缓存）
+    重复识别: 缓存已命中后再识别一遍（对应同一个番号多次调用guess_av_type的情况）
+"""
+import os
+import sys
+import time
+import argparse
+
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.avid import IDRecognizer, get_recognizer
+
+
+def load_paths(path):
+    with open(path, 'rt', encoding='utf-8') as f:
+        return [line.rstrip('\r\n').split('\t')[0] for line in f if line.strip()]
+
+
+def run(recognizer: IDRecognizer, paths):
+    """返回get_id、get_cid、guess_av_type各自的总耗时"""
+    t_id = t_cid = t_type = 0.0
+    for path in paths:
+        start = time.process_time()
+        dvdid = recognizer.get_id(path)
+        t1 = time.process_time()
+        cid = recognizer.get_cid(path)
+        t2 = time.process_time()
+        recognizer.guess_av_type(cid or dvdid)
+        t3 = time.process_time()
+        t_id += t1 - start
+        t_cid += t2 - t1
+        t_type += t3 - t2
+    return t_id, t_cid, t_type
+
+
+def bench(recognizer: IDRecognizer, paths, repeat, clear):
+    best = None
+    for _ in range(repeat):
+        if clear:
+            recognizer.cache_clear()
+        result = run(recognizer, paths)
+        if best is None or sum(result) < sum(best):
+            best = result
+    return best
+
+
+if __name__ == "__main__":
+    default_data = os.path.abspath(os.path.join(os.path.dirname(__file__), '../unittest/testdata_avid.txt'))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('data', nargs='?', default=default_data)
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    paths = load_paths(args.data)
+    configured = get_recognizer()
+    uncached = IDRecognizer(configured.ignored_id_pattern, configured.anime_prefixes, cache_size=0)
+    start = time.process_time()
+    IDRecognizer(configured.ignored_id_pattern, configured.anime_prefixes)
+    build_time = time.process_time() - start
+    print(f'{len(paths)}个文件路径（{os.path.basename(args.data)}），创建识别器耗时 {build_time*1e6:.0f} µs')
+    print(f"{'':8}  {'get_id':>10}  {'get_cid':>10}  {'av_type':>10}  {'合计':>10}  (µs/路径)")
+    results = [('无缓存', bench(uncached, paths, args.repeat, True)),
+               ('首次识别', bench(configured, paths, args.repeat, True)),
+               ('重复识别', bench(configured, paths, args.repeat, False))]
+    baseline = sum(results[0][1])
+    for name, times in results:
+        per_path = [i * 1e6 / len(paths) for i in times]
+        speedup = baseline / sum(times) if sum(times) else float('inf')
+        print(f"{name:8}  {per_path[0]:10.2f}  {per_path[1]:10.2f}  {per_path[2]:10.2f}  {sum(per_path):10.2f}  ({speedup:.1f}x)")
@@ -0,0 +1,114 @@
+"""对比网页解码、解析的旧实现与新实现的CPU耗时
+
+用法:
+    python tools/bench_html.py [网页文件或文件夹 ...]
+
+未指定网页时，使用网页缓存（cache/http.db）中保存的网页；缓存为空时使用生成的测试网页
+"""
+import os
+import sys
+import time
+import zlib
+import sqlite3
+import argparse
+
+import lxml.html
+from requests.models import Response
+
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.web.base import detect_encoding, parse_html, _host_charsets
+
+
+def load_files(paths):
+    pages = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = [os.path.join(path, i) for i in sorted(os.listdir(path)) if i.endswith(('.html', '.htm'))]
+        else:
+            files = [path]
+        for file in files:
+            with open(file, 'rb') as f:
+                pages.append(('https://example.com/' + os.path.basename(file), f.read(), {}))
+    return pages
+
+
+def load_http_cache(limit=200):
+    path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../cache/http.db'))
+    if not os.path.exists(path):
+        return []
+    import json
+    conn = sqlite3.connect(path)
+    rows = conn.execute('SELECT url, headers, body FROM responses ORDER BY accessed DESC LIMIT ?', (limit,)).fetchall()
+    conn.close()
+    pages = []
+    for url, headers, body in rows:
+        headers = json.loads(headers)
+        if 'html' in headers.get('Content-Type', headers.get('content-type', 'text/html')):
+            pages.append((url, zlib.decompress(body), headers))
+    return pages
+
+
+def synthetic_pages(count=20):
+    rows = ''.join(f'<tr><td><a href="/movie/ABC-{i:03d}">タイトル{i}</a></td>'
+                   f'<td><img src="/pics/{i}.jpg" style="background:url(/bg/{i}.png)"></td></tr>' for i in range(1500))
+    page = f'<html><head><title>test</title></head><body><table>{rows}</table></body></html>'.encode('utf-8')
+    return [(f'https://example.com/page{i}', page, {'Content-Type': 'text/html'}) for i in range(count)]
+
+
+def make_resp(url, content, headers):
+    r = Response()
+    r.url = url
+    r._content = content
+    r.headers.update(headers)
+    r.status_code = 200
+    return r
+
+
+def legacy(resp: Response):
+    """旧的实现：检测整个网页的编码、解码为str后解析，再对所有链接调用lxml的make_links_absolute"""
+    resp.encoding = resp.apparent_encoding
+    html = lxml.html.fromstring(resp.text)
+    html.make_links_absolute(resp.url, resolve_base_href=True)
+    return html
+
+
+def current(resp: Response):
+    """新的实现"""
+    return parse_html(resp.content, detect_encoding(resp), resp.url)
+
+
+def bench(func, pages, repeat):
+    best, errors = float('inf'), 0
+    for _ in range(repeat):
+        _host_charsets.clear()
+        resps = [make_resp(*page) for page in pages]
+        errors = 0
+        start = time.process_time()
+        for resp in resps:
+            try:
+                func(resp)
+            except Exception:
+                # 旧实现在遇到含有非ASCII字符的ed2k链接等情况时会出错
+                errors += 1
+        best = min(best, time.process_time() - start)
+    return best, errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*')
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+    if args.paths:
+        pages, source = load_files(args.paths), '指定的文件'
+    else:
+        pages, source = load_http_cache(), '网页缓存'
+        if not pages:
+            pages, source = synthetic_pages(), '生成的测试网页'
+    total_size = sum(len(i[1]) for i in pages)
+    print(f'{len(pages)}个网页（{source}），共{total_size/1024:.0f} KiB')
+    old, old_errors = bench(legacy, pages, args.repeat)
+    new, new_errors = bench(current, pages, args.repeat)
+    print(f'旧实现: {old*1000/len(pages):.2f} ms/页, {old_errors}个网页出错')
+    print(f'新实现: {new*1000/len(pages):.2f} ms/页 ({old/new:.1f}x), {new_errors}个网页出错')
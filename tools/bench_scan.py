@@ -0,0 +1,157 @@
+"""对比扫描影片文件夹的旧实现（os.walk + os.path.getsize，单线程）与并行遍历、增量扫描索引的耗时
+
+用法:
+    python tools/bench_scan.py [-n 文件数] [--latency 毫秒] [--root 文件夹]
+
+未指定--root时在临时文件夹中生成由稀疏文件组成的测试文件夹树（默认10万个文件）。
+--latency为每次列出文件夹和获取文件状态增加的延迟，用于模拟SMB/NFS等网络共享上的网络往返
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.avid import get_recognizer
+from javsp.config import Cfg
+from javsp.file import walk_videos
+from javsp.scan_index import ScanIndex
+from javsp.walker import default_workers
+
+
+def touch_file_size(path: str, size_bytes: int):
+    with open(path, 'wb') as f:
+        f.seek(size_bytes - 1)
+        f.write(b'\0')
+
+
+def make_tree(root: str, count: int, per_dir=50, fanout=20):
+    """生成包含count个影片文件的文件夹树：每个文件夹中有per_dir个影片和一些其他文件"""
+    dirs = (count + per_dir - 1) // per_dir
+    created = 0
+    for i in range(dirs):
+        folder = os.path.join(root, f'P{i // fanout:03d}', f'ABC-{i:05d}')
+        os.makedirs(folder, exist_ok=True)
+        for j in range(min(per_dir, count - created)):
+            touch_file_size(os.path.join(folder, f'XYZ-{i % 1000:03d}{j:02d}-{j}.mp4'), 300 * 2**20)
+            created += 1
+        with open(os.path.join(folder, 'readme.txt'), 'w') as f:
+            f.write('readme')
+
+
+class _SlowScandir():
+    def __init__(self, it, latency) -> None:
+        self._it = it
+        self._latency = latency
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self._it.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return _SlowEntry(next(self._it), self._latency)
+
+    def close(self):
+        self._it.close()
+
+
+class _SlowEntry():
+    def __init__(self, entry, latency) -> None:
+        self._entry = entry
+        self._latency = latency
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def stat(self, *, follow_symlinks=True):
+        time.sleep(self._latency)
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+
+def add_latency(latency: float):
+    """为os.scandir和os.stat增加延迟（秒）"""
+    scandir, stat = os.scandir, os.stat
+
+    def slow_scandir(path='.'):
+        time.sleep(latency)
+        return _SlowScandir(scandir(path), latency)
+
+    def slow_stat(path, *args, **kwargs):
+        time.sleep(latency)
+        return stat(path, *args, **kwargs)
+
+    os.scandir, os.stat = slow_scandir, slow_stat
+
+
+def legacy(root, recognizer):
+    """旧的实现：os.walk遍历，对每个文件单独调用os.path.getsize"""
+    import re
+    result = []
+    ignore = re.compile('|'.join(Cfg().scanner.ignored_folder_name_pattern))
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in dirnames.copy():
+            if ignore.match(name):
+                dirnames.remove(name)
+        for file in filenames:
+            if os.path.splitext(file)[1].lower() in Cfg().scanner.filename_extensions:
+                fullpath = os.path.join(dirpath, file)
+                size = os.path.getsize(fullpath)
+                result.append((fullpath, size, recognizer.get_id(fullpath), recognizer.get_cid(fullpath)))
+    return result
+
+
+def timed(func, root):
+    """func(root, recognizer)，每次运行前清空番号识别的缓存"""
+    recognizer = get_recognizer()
+    recognizer.cache_clear()
+    start = time.perf_counter()
+    result = func(root, recognizer)
+    return time.perf_counter() - start, len(result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--files', type=int, default=100000)
+    parser.add_argument('--latency', type=float, default=0, help='每次文件系统调用增加的延迟（毫秒）')
+    parser.add_argument('--root', help='使用已有的文件夹而不是生成测试文件夹')
+    parser.add_argument('-w', '--workers', type=int, default=0)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='javsp_bench_')
+    try:
+        if args.root:
+            root = args.root
+        else:
+            root = os.path.join(tmp, 'movies')
+            start = time.perf_counter()
+            make_tree(root, args.files)
+            print(f'生成测试文件夹: {args.files}个文件 ({time.perf_counter() - start:.1f}s)')
+            # 避免文件夹被视为刚刚修改过
+            past = time.time() - 3600
+            for dirpath, _, _ in os.walk(root):
+                os.utime(dirpath, (past, past))
+        if args.latency:
+            add_latency(args.latency / 1000)
+        workers = args.workers or default_workers()
+        index = ScanIndex(os.path.join(tmp, 'scan.db'))
+        results = [
+            ('os.walk + getsize (旧实现)', timed(legacy, root)),
+            ('并行遍历 (1线程)', timed(lambda root, r: walk_videos(root, r, 1), root)),
+            (f'并行遍历 ({workers}线程)', timed(lambda root, r: walk_videos(root, r, workers), root)),
+            ('扫描索引: 首次扫描', timed(lambda root, r: index.scan(root, r, workers), root)),
+            ('扫描索引: 无变化时', timed(lambda root, r: index.scan(root, r, workers), root)),
+        ]
+        index.close()
+        baseline = results[0][1][0]
+        for name, (elapsed, count) in results:
+            print(f'{name:24} {elapsed:8.2f}s  {count}个影片  ({baseline / elapsed:.1f}x)')
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
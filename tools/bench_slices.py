@@ -0,0 +1,69 @@
+"""测量识别分片（group_slices）的耗时
+
+用法:
+    python tools/bench_slices.py [-n 文件数] [-r 重复次数]
+
+生成一个包含n个影片文件的文件夹（只生成文件名，不创建文件）: 大部分番号只有一个文件，其余为2-4个以不同的方式
+命名的分片，另外还有一些不符合分片规则的重复文件。分别测量:
+    整个文件夹: 与scan_movies相同，对文件夹内的每个番号调用一次group_slices
+    单个番号的大量分片: 一个番号有999个分片
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.slices import group_slices
+
+
+STYLES = ['{avid}-{i}.mp4', '{avid}.CD{i}.mp4', '{avid}-{c}.mp4', '{avid} - Part{i}.mkv', '{avid}_{i:02d}.mp4']
+
+
+def make_dir(count: int, seed=0):
+    """返回{番号: [文件路径]}，所有文件位于同一个文件夹"""
+    rand = random.Random(seed)
+    folder = os.path.join('movies', 'folder')
+    dic = {}
+    n = 0
+    while n < count:
+        avid = f'{rand.choice(["ABC", "DEFG", "HJK"])}-{len(dic):05d}'
+        parts = rand.choice([1] * 6 + [2, 3, 4])
+        if parts == 1:
+            names = [f'{avid}.mp4']
+        elif rand.random() < 0.1:
+            names = [f'{avid}.mp4', f'{avid}-C.mp4']    # 不符合分片规则
+        else:
+            style = rand.choice(STYLES)
+            names = [style.format(avid=avid, i=i + 1, c=chr(ord('A') + i)) for i in range(parts)]
+            rand.shuffle(names)
+        dic[avid] = [os.path.join(folder, i) for i in names]
+        n += len(names)
+    return dic
+
+
+def run(dic: dict):
+    start = time.process_time()
+    accepted = sum(group_slices(avid, files).files is not None for avid, files in dic.items())
+    return time.process_time() - start, accepted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--files', type=int, default=5000)
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.DEBUG)
+
+    cases = [
+        (f'整个文件夹 ({args.files}个文件)', make_dir(args.files)),
+        ('单个番号的大量分片 (999个文件)', {'ABC-123': [f'ABC-123-{i}.mp4' for i in range(999, 0, -1)]}),
+    ]
+    for name, dic in cases:
+        files = sum(len(i) for i in dic.values())
+        elapsed, accepted = min(run(dic) for _ in range(args.repeat))
+        print(f'{name:28} {elapsed * 1000:8.2f}ms  {elapsed / files * 1e6:6.2f}us/文件  '
+              f'{accepted}/{len(dic)}个番号符合分片规则')
@@ -83,6 +83,14 @@ network:
   retry: {cfg['Network']['retry']}
   # https://en.wikipedia.org/wiki/ISO_8601#Durations
   timeout: PT{cfg['Network']['timeout']}S
+  # 请求限速：同一抓取器/主机的两次请求之间的最小间隔，不同站点之间互不影响（未列出的站点不限速）
+  rate_limit:
+    default_interval: PT0S
+    burst: 1
+    crawler:
+      javdb: PT{cfg['Crawler']['sleep_after_scraping']}S
+      javlib: PT{cfg['Crawler']['sleep_after_scraping']}S
+    host: {{}}
 
 ################################
 crawler:
@@ -102,9 +110,6 @@ crawler:
   respect_site_avid: {yes_to_true(cfg['Crawler']['respect_site_avid'])}
   # fc2fan已关站。如果你有镜像，请设置本地镜像文件夹的路径，此文件夹内要有类似'FC2-12345.html'的网页文件
   fc2fan_local_path: '{cfg['Crawler']['fc2fan_local_path']}'
-  # 刮削一部电影后的等待时间（设置为0禁用此功能）
-  # https://en.wikipedia.org/wiki/ISO_8601#Durations
-  sleep_after_scraping: PT{cfg['Crawler']['sleep_after_scraping']}S
   # 是否使用javdb的封面（fallback/yes/no, 默认fallback: 如果能从别的站点获得封面则不用javdb的以避免水印）
   use_javdb_cover: {use_javdb_cover(cfg['Crawler']['ignore_javdb_cover'])}
   # 是否统一女优艺名。启用时会尝试将女优的多个艺名统一成一个
@@ -190,8 +195,6 @@ summarizer:
   extra_fanarts:
     # 是否下载剧照？
     enabled: {yes_to_true(cfg['Picture']['use_extra_fanarts'])}
-    # 间隔的两次封面爬取请求之间应该间隔多久
-    scrap_interval: PT{cfg['Picture']['extra_fanarts_scrap_interval']}S
 
 ################################
 translator:
@@ -1,7 +1,10 @@
 import os
 import re
-import pytest
+import threading
 from glob import glob
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
 
 
 data_dir = os.path.join(os.path.dirname(__file__), 'data')
@@ -24,6 +27,43 @@ def pytest_runtest_logreport(report):
         report.nodeid = re.sub(r'^.*::test_crawler', '', report.nodeid)
 
 
+class _RouteHandler(BaseHTTPRequestHandler):
+    """将请求交给服务器的route函数处理: route(handler) -> (状态码, {响应头}, 响应体)"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        status, headers, body = self.server.route(self)
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def serve():
+    """启动本地HTTP服务器: serve(route)返回服务器的地址，测试结束后自动关闭
+
+    route(handler)根据请求（handler.path, handler.headers）返回(状态码, {响应头}, 响应体)，Content-Length会自动添加
+    """
+    servers = []
+
+    def start(route) -> str:
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), _RouteHandler)
+        httpd.route = route
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        return f'http://127.0.0.1:{httpd.server_port}'
+    yield start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+
 @pytest.fixture
 def crawler(request):
     return request.config.getoption("--only")
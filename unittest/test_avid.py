@@ -6,7 +6,7 @@ from shutil import rmtree
 
 file_dir = os.path.dirname(__file__)
 sys.path.insert(0, os.path.abspath(os.path.join(file_dir, '..')))
-from javsp.avid import get_id, get_cid
+from javsp.avid import get_id, get_cid, guess_av_type, IDRecognizer, recognize
 
 
 @pytest.fixture
@@ -109,3 +109,30 @@ def test_by_folder_name2(prepare_files):
 @pytest.mark.parametrize('files', [('ABC-123/CDF-456.mp4',)])
 def test_by_folder_name3(prepare_files):
     assert 'CDF-456' == get_id('ABC-123/CDF-456.mp4')
+
+
+def test_guess_av_type():
+    assert 'fc2' == guess_av_type('FC2-123456')
+    assert 'getchu' == guess_av_type('GETCHU-1234')
+    assert 'cid' == guess_av_type('h_001abc00001')
+    assert 'anime' == guess_av_type('ANIME:タイトル')
+    assert 'western' == guess_av_type('WESTERN:rkprime.25.11.18.zoey')
+    assert 'normal' == guess_av_type('ABC-123')
+
+
+def test_recognizer():
+    recognizer = IDRecognizer([r'[24][Kk]'], anime_prefixes=['zzx'])
+    assert recognizer.is_anime_id('OFJE-001') and recognizer.is_anime_id('ZZX-01')
+    assert not recognizer.is_anime_id('ABC-123')
+    assert '' == recognizer.get_id('4K')
+    # 识别结果按文件名缓存，与所在的文件夹无关
+    assert 'ABC-123' == recognizer.get_id('a/ABC-123.mp4') == recognizer.get_id('b/ABC-123.mp4')
+    assert recognizer._match_stem.cache_info().hits >= 1
+    recognizer.cache_clear()
+    assert recognizer._match_stem.cache_info().currsize == 0
+
+
+def test_recognize():
+    paths = ['FC2-PPV-123456.mp4', 'ab012st.mp4', 'Yuukiy.mp4']
+    assert recognize(paths) == [('FC2-123456', ''), ('AB-012', 'ab012st'), ('', '')]
+    assert recognize(paths) == [(get_id(i), get_cid(i)) for i in paths]
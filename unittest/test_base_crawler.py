@@ -0,0 +1,195 @@
+import os
+import sys
+
+import lxml.html
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.datatype import MovieInfo
+from javsp.web.base_crawler import *
+from javsp.web.xpath import xpath_stats
+
+
+def test_processors():
+    assert normalize_date('2021/3/5') == '2021-03-05'
+    assert normalize_date('2021年03月05日') == '2021-03-05'
+    assert normalize_date('0000-00-00') is None
+    assert normalize_date('unknown') is None
+    assert minutes(' 120分鐘') == '120'
+    assert minutes('01:59:40') == '120'
+    assert minutes('0') is None
+    assert split_id()('https://www.javbus.com/genre/4f') == '4f'
+    assert replace('[javdb.com]')('magnet:?xt=1[javdb.com]') == 'magnet:?xt=1'
+
+
+class Sample(BaseCrawler):
+    scopes = {'info': "//div[@class='info']", 'missing': "//div[@id='missing']"}
+    fields = {
+        'title': Field("//h3/text()", strip, required=True),
+        'publish_date': Field("p/span[text()=$label]", tail, normalize_date, scope='info', variables={'label': '日期:'}),
+        'duration': Field("p/span[text()=$label]", tail, minutes, scope='info', variables={'label': '長度:'}),
+        'director': Field("p/span[text()=$label]", next_text, strip, scope='info', variables={'label': '導演:'}),
+        'genre': Field("p[@class='genre']/a", text, many=True, scope='info'),
+        'genre_id': Field("p[@class='genre']/a/@href", split_id(), many=True, scope='info'),
+        'serial': Field("p", scope='missing'),
+        '_extra': Field("//div[@class='extra']/text()", default='none'),
+    }
+    exprs = {'links': "//a/@href"}
+
+    def parse_data(self, movie):
+        pass
+
+    def get_genre_norm(self, genre):
+        return genre
+
+    def resolve_actress(self, actress):
+        return actress
+
+
+PAGE = '''<html><body><h3> ABC-123 タイトル </h3>
+<div class="info">
+  <p><span>日期:</span> 2020/01/02</p>
+  <p><span>長度:</span> 120分鐘</p>
+  <p><span>導演:</span> <a href="/director/1"> 監督A </a></p>
+  <p class="genre"><a href="/genre/1">g1</a><a href="/genre/2">g2</a></p>
+</div></body></html>'''
+
+
+def test_extract():
+    crawler = Sample()
+    html = lxml.html.fromstring(PAGE)
+    movie = MovieInfo('ABC-123')
+    data = crawler.extract(html, movie)
+    assert movie.title == 'ABC-123 タイトル'
+    assert movie.publish_date == '2020-01-02'
+    assert movie.duration == '120'
+    assert movie.director == '監督A'
+    assert movie.genre == ['g1', 'g2']
+    assert movie.genre_id == ['1', '2']
+    # 作用域不存在时字段使用默认值
+    assert movie.serial is None and data['serial'] is None
+    # 以'_'开头的字段不会更新到movie中
+    assert data['_extra'] == 'none' and not hasattr(movie, '_extra')
+    assert crawler.extract(html, keys=['duration']) == {'duration': '120'}
+    assert crawler.xp.links(html)[0] == '/director/1'
+    assert Sample.extractor() is Sample.extractor()
+    stats = {i['name'] for i in xpath_stats()}
+    assert {'test_base_crawler.title', 'test_base_crawler.scope:info'} <= stats
+
+
+def test_required():
+    html = lxml.html.fromstring('<html><body><p>404</p></body></html>')
+    with pytest.raises(ValueError):
+        Sample().extract(html, MovieInfo('ABC-123'))
+
+
+JAVBUS_PAGE = '''<html><head><title>ABC-123 タイトル - JavBus</title></head><body>
+<div class="container">
+<h3>ABC-123 タイトル</h3>
+<div class="row movie">
+  <div class="col-md-9 screencap"><a class="bigImage" href="/pics/cover/1_b.jpg"><img src="/pics/cover/1_b.jpg"></a></div>
+  <div class="col-md-3 info">
+    <p><span class="header">識別碼:</span> <span style="color:#CC0000;">ABC-123</span></p>
+    <p><span class="header">發行日期:</span> 2020-01-02</p>
+    <p><span class="header">長度:</span> 120分鐘</p>
+    <p><span class="header">製作商:</span> <a href="/studio/1">メーカー</a></p>
+    <p><span class="header">系列:</span> <a href="/series/1">シリーズ</a></p>
+    <p><span class="genre"><label><input type="checkbox"><a href="/genre/zz"></a></label></span>
+    <p><span class="genre"><label><input type="checkbox"><a href="/genre/4f">ハイビジョン</a></label></span>
+       <span class="genre"><label><input type="checkbox"><a href="/genre/2x">単体作品</a></label></span></p>
+  </div>
+</div>
+<div id="star-div"><a class="avatar-box" href="/star/1"><div class="photo-frame"><img src="/pics/actress/1_a.jpg" title="女優A"></div></a>
+<a class="avatar-box" href="/star/2"><div class="photo-frame"><img src="/imgs/actress/nowprinting.gif" title="女優B"></div></a></div>
+<div id="sample-waterfall"><a class="sample-box" href="/pics/sample/1.jpg"></a><a class="sample-box" href="/pics/sample/2.jpg"></a></div>
+</div></body></html>'''
+
+
+def test_javbus(monkeypatch):
+    from javsp.web import javbus
+    from javsp.web.base import parse_html
+
+    class Resp:
+        history = []
+    monkeypatch.setattr(javbus, 'request_get', lambda url, delay_raise=False: Resp())
+    monkeypatch.setattr(javbus, 'resp2html', lambda resp: parse_html(JAVBUS_PAGE.encode(), 'utf-8', 'https://www.javbus.com/ABC-123'))
+    movie = MovieInfo('ABC-123')
+    javbus.parse_data(movie)
+    assert movie.dvdid == 'ABC-123'
+    assert movie.title == 'タイトル'
+    assert movie.url == 'https://www.javbus.com/ABC-123'
+    assert movie.cover == 'https://www.javbus.com/pics/cover/1_b.jpg'
+    assert movie.preview_pics == ['https://www.javbus.com/pics/sample/1.jpg', 'https://www.javbus.com/pics/sample/2.jpg']
+    assert movie.publish_date == '2020-01-02'
+    assert movie.duration == '120'
+    assert movie.producer == 'メーカー'
+    assert movie.serial == 'シリーズ'
+    assert movie.director is None and movie.publisher is None
+    assert movie.genre == ['ハイビジョン', '単体作品']
+    assert movie.genre_id == ['4f', '2x']
+    assert movie.uncensored is False
+    assert movie.actress == ['女優A', '女優B']
+    assert movie.actress_pics == {'女優A': 'https://www.javbus.com/pics/actress/1_a.jpg'}
+
+    monkeypatch.setattr(javbus, 'resp2html', lambda resp: lxml.html.fromstring('<html><head><title>404 Page Not Found! - JavBus</title></head></html>'))
+    with pytest.raises(javbus.MovieNotFoundError):
+        javbus.parse_data(MovieInfo('ABC-999'))
+
+
+JAV321_PAGE = '''<html><body>
+<ul class="dropdown-menu"><li><a href="/video/abc00123">x</a></li></ul>
+<div class="panel-heading"><h3>タイトル</h3></div>
+<div class="col-md-9"><b>品番</b>: ABC-123<br><b>配信開始日</b>: 2020-01-02<br><b>収録時間</b>: 120 minutes<br>
+<b>平均評価</b>: <img data-original="/img/35.gif"><br>
+<a href="/genre/4025/1">ジャンル</a></div>
+</body></html>'''
+
+
+def test_jav321_score(monkeypatch):
+    from javsp.web import jav321
+    from javsp.web.base import parse_html
+
+    monkeypatch.setattr(jav321, 'post_html', lambda url, data: parse_html(JAV321_PAGE.encode(), 'utf-8', 'https://www.jav321.com/search'))
+    movie = MovieInfo('ABC-123')
+    jav321.parse_data(movie)
+    assert movie.score == '7.0'
+    assert movie.genre_id == ['4025']
+    assert movie.url == 'https://www.jav321.com/video/abc00123'
+
+
+FANZA_PAGE = '''<html><body>
+<div class="hreview"><h1>タイトル</h1></div>
+<table class="mg-b12"><tr><td>
+  <div id="sample-video"><a href="https://pics.dmm.co.jp/abc00123pl.jpg"></a></div>
+  <table class="mg-b20">
+    <tr><td class="nw">配信開始日：</td><td>2020/01/02</td></tr>
+    <tr><td class="nw">収録時間：</td><td>120分</td></tr>
+    <tr><td class="nw">メーカー：</td><td><a href="/maker/1">メーカー</a></td></tr>
+    <tr><td class="nw">ジャンル：</td><td><a href="/list/?keyword=4025/">単体作品</a><a href="/campaign/">セール</a></td></tr>
+    <tr><td class="nw">品番：</td><td>abc00123</td></tr>
+  </table>
+</td></tr></table>
+<table><tr><td>品番：</td><td>wrong</td></tr></table>
+<div class="mg-b20 lh4">あらすじ</div>
+<p class="d-review__average"><strong>4</strong></p>
+</body></html>'''
+
+
+def test_fanza_fields_from_container(monkeypatch):
+    from javsp.web import fanza
+    from javsp.web.base import parse_html
+
+    player = '<script>document.getElementById("dmmplayer"); var args = {"src": "//cc3001.dmm.co.jp/a.mp4"};</script>'
+    monkeypatch.setattr(fanza.request, 'get_html', lambda url: lxml.html.fromstring(player))
+    movie = MovieInfo(cid='abc00123')
+    fanza.parse_videoa_page(movie, parse_html(FANZA_PAGE.encode(), 'utf-8', 'https://www.dmm.co.jp/'))
+    assert movie.cid == 'abc00123'
+    assert movie.publish_date == '2020-01-02'
+    assert movie.duration == '120'
+    assert movie.producer == 'メーカー'
+    assert movie.genre == ['単体作品'] and movie.genre_id == ['4025']
+    assert movie.score == '8.00'
+
+    html = parse_html(b'<html><body><div class="hreview"><h1>t</h1></div></body></html>', 'utf-8', 'https://www.dmm.co.jp/')
+    with pytest.raises(fanza.WebsiteError, match='未找到影片信息表格'):
+        fanza.parse_videoa_page(MovieInfo(cid='abc00123'), html)
@@ -0,0 +1,85 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.blobstore import BlobStore
+
+
+def test_fetch_after_add(tmp_path):
+    store = BlobStore(str(tmp_path / 'store'))
+    first = tmp_path / 'movie1' / 'fanart.jpg'
+    first.parent.mkdir()
+    first.write_bytes(b'jpeg-bytes')
+    url = 'https://example.com/cover.jpg'
+    assert store.fetch(url, str(tmp_path / 'x.jpg')) is None
+    store.add(url, str(first))
+
+    second = tmp_path / 'movie2' / 'fanart.jpg'
+    second.parent.mkdir()
+    info = store.fetch(url, str(second))
+    assert info['total'] == len(b'jpeg-bytes')
+    assert second.read_bytes() == b'jpeg-bytes'
+    # 同一文件系统上使用硬链接，不占用额外空间
+    assert os.path.samefile(first, second)
+
+
+def test_same_content_from_different_urls_is_deduplicated(tmp_path):
+    store = BlobStore(str(tmp_path / 'store'))
+    a = tmp_path / 'a.jpg'
+    b = tmp_path / 'b.jpg'
+    a.write_bytes(b'same')
+    b.write_bytes(b'same')
+    assert store.add('https://a.com/1.jpg', str(a)) == store.add('https://b.com/2.jpg', str(b))
+    assert os.path.samefile(a, b)
+
+
+def test_missing_blob_is_ignored(tmp_path):
+    store = BlobStore(str(tmp_path / 'store'))
+    a = tmp_path / 'a.jpg'
+    a.write_bytes(b'data')
+    digest = store.add('https://a.com/1.jpg', str(a))
+    os.remove(store.blob_path(digest))
+    assert store.fetch('https://a.com/1.jpg', str(tmp_path / 'c.jpg')) is None
+
+
+def test_editable_copy_does_not_share_blob(tmp_path):
+    store = BlobStore(str(tmp_path / 'store'))
+    url = 'https://example.com/cover.jpg'
+    first = tmp_path / 'fanart1.jpg'
+    first.write_bytes(b'original')
+    digest = store.add(url, str(first), hardlink=False)
+    second = tmp_path / 'fanart2.jpg'
+    store.fetch(url, str(second), hardlink=False)
+    assert not os.path.samefile(first, store.blob_path(digest))
+    assert not os.path.samefile(second, store.blob_path(digest))
+    # 就地修改（如添加水印）不影响存储中的图片
+    with open(first, 'r+b') as f:
+        f.write(b'modified')
+    with open(second, 'r+b') as f:
+        f.write(b'modified')
+    assert open(store.blob_path(digest), 'rb').read() == b'original'
+
+
+def test_concurrent_add_of_same_content(tmp_path):
+    import threading
+    store = BlobStore(str(tmp_path / 'store'))
+    paths = []
+    for i in range(8):
+        path = tmp_path / f'{i}.jpg'
+        path.write_bytes(b'same' * 1000)
+        paths.append(str(path))
+    errors = []
+
+    def add(i, path):
+        try:
+            store.add(f'https://example.com/{i}.jpg', path, hardlink=False)
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=add, args=(i, p)) for i, p in enumerate(paths)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    assert not errors
+    blob_dir = os.path.dirname(store.blob_path(store.add('https://example.com/x.jpg', paths[0])))
+    assert [i for i in os.listdir(blob_dir) if i.endswith('.tmp')] == []
@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.web.breaker import CircuitBreaker
+
+
+def test_trips_after_threshold():
+    breaker = CircuitBreaker('javdb', failure_threshold=3, cooldown=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open and not breaker.allow()
+
+
+def test_success_resets_failures():
+    breaker = CircuitBreaker('javdb', failure_threshold=2, cooldown=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_probe():
+    breaker = CircuitBreaker('javdb', failure_threshold=5, cooldown=0.05)
+    breaker.record_failure(trip=True)
+    assert not breaker.allow()
+    time.sleep(0.06)
+    # 冷却期结束后只放行一个探测请求
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    # 探测失败时重新熔断
+    breaker.record_failure()
+    assert breaker.is_open
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
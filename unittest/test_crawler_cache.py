@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.crawler_cache import CrawlerCache, crawler_version
+from javsp.datatype import MovieInfo
+
+
+def test_save_and_load(tmp_path):
+    cache = CrawlerCache(str(tmp_path / 'crawler.db'))
+    info = MovieInfo('ABC-123')
+    info.title = '标题'
+    info.actress = ['女优']
+    info.success = True
+    cache.save('javbus', 'ABC-123', 'v1', info)
+    data = cache.load('javbus', 'ABC-123', 'v1', ttl=60)
+    assert data['title'] == '标题' and data['actress'] == ['女优']
+    assert 'success' not in data
+    assert cache.load('javdb', 'ABC-123', 'v1', ttl=60) is None
+
+
+def test_version_and_ttl_invalidate(tmp_path):
+    cache = CrawlerCache(str(tmp_path / 'crawler.db'))
+    cache.save('javbus', 'ABC-123', 'v1', MovieInfo('ABC-123'))
+    assert cache.load('javbus', 'ABC-123', 'v2', ttl=60) is None
+    assert cache.load('javbus', 'ABC-123', 'v1', ttl=0) is None
+
+
+def test_not_found(tmp_path):
+    cache = CrawlerCache(str(tmp_path / 'crawler.db'))
+    cache.save_not_found('avsox', 'ABC-123', 'v1')
+    assert cache.is_not_found('avsox', 'ABC-123', 'v1', ttl=60)
+    assert cache.load('avsox', 'ABC-123', 'v1', ttl=60) is None
+    assert not cache.is_not_found('avsox', 'ABC-123', 'v2', ttl=60)
+    assert not cache.is_not_found('avsox', 'ABC-123', 'v1', ttl=0)
+    # 之后抓取成功时覆盖不存在的记录
+    cache.save('avsox', 'ABC-123', 'v1', MovieInfo('ABC-123'))
+    assert not cache.is_not_found('avsox', 'ABC-123', 'v1', ttl=60)
+
+
+def test_crawler_version_follows_source():
+    import javsp.web.javbus
+    version = crawler_version('javsp.web.javbus')
+    assert version and version == crawler_version('javsp.web.javbus')
+
+
+def test_crawler_version_follows_shared_data(monkeypatch):
+    import javsp.web.javbus
+    from javsp import crawler_cache
+    monkeypatch.setattr(crawler_cache, '_versions', {})
+    monkeypatch.setattr(crawler_cache, '_shared_version', None)
+    version = crawler_version('javsp.web.javbus')
+    # genre映射表等数据文件更新后，已缓存的解析结果失效
+    monkeypatch.setattr(crawler_cache, '_versions', {})
+    monkeypatch.setattr(crawler_cache, '_shared_version', None)
+    monkeypatch.setattr(crawler_cache, 'data_digest', lambda: 'changed')
+    assert crawler_version('javsp.web.javbus') != version
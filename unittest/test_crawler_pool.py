@@ -0,0 +1,31 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.crawler_pool import CrawlerPool
+from javsp.web.throttle import current_crawler
+
+
+def test_jobs_run_in_crawler_context():
+    pool = CrawlerPool(2)
+    try:
+        futures = [pool.submit(name, current_crawler) for name in ('javbus', 'javdb', 'javbus')]
+        assert [f.result() for f in futures] == ['javbus', 'javdb', 'javbus']
+        stats = pool.stats()
+        assert stats['javbus'].submitted == 2 and stats['javbus'].finished == 2
+        assert stats['javdb'].finished == 1
+    finally:
+        pool.shutdown()
+
+
+def test_threads_are_reused():
+    pool = CrawlerPool(2)
+    try:
+        names = set()
+        for _ in range(5):
+            futures = [pool.submit('javbus', lambda: threading.current_thread().name) for _ in range(2)]
+            names.update(f.result() for f in futures)
+        assert len(names) <= 2
+    finally:
+        pool.shutdown()
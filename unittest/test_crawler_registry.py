@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.crawler_registry import CrawlerRegistry
+
+
+class Selection(dict):
+    def items(self):
+        return list(super().items())
+
+
+def test_lazy_load():
+    # 使用尚未被其他测试导入的抓取器
+    for name in ('javsp.web.gyutto', 'javsp.web.dl_getchu'):
+        sys.modules.pop(name, None)
+    registry = CrawlerRegistry(Selection(getchu=['dl_getchu'], gyutto=['gyutto'], anime=['gyutto', 'not_exist']))
+    assert sorted(registry.crawlers) == ['dl_getchu', 'gyutto']
+    assert registry.get('not_exist') is None
+    assert registry.get('gyutto').data_src == ['gyutto', 'anime']
+    assert [i.name for i in registry.for_data_src('anime')] == ['gyutto']
+    # 创建注册表时不会导入抓取器
+    assert 'javsp.web.gyutto' not in sys.modules
+    assert registry.loaded() == []
+
+    mod = registry.load('gyutto')
+    assert mod is sys.modules['javsp.web.gyutto']
+    assert registry.get('gyutto').parse_data is mod.parse_data
+    assert registry.loaded() == ['gyutto']
+    assert 'javsp.web.dl_getchu' not in sys.modules
+    assert registry.load('not_exist') is None
+
+
+def test_load_error(monkeypatch):
+    registry = CrawlerRegistry(Selection(normal=['javbus']))
+    info = registry.get('javbus')
+    info.module_name = 'javsp.web._missing_crawler'
+    assert info.load() is None
+    assert isinstance(info.error, ModuleNotFoundError)
+    # 失败后不会反复尝试导入
+    assert info.load() is None
+    assert not info.loaded
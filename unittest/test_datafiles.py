@@ -0,0 +1,58 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp import datafiles
+from javsp.datafiles import BUNDLE_NAME, _load, build
+
+
+def make_data_dir(tmp_path):
+    (tmp_path / 'genre_test.csv').write_text('id,url,translate\n1,u1,一\n2,u2,\n', encoding='utf-8-sig')
+    alias = {'田中レモン': ['田中檸檬', '田中レモン', '楓カレン']}
+    (tmp_path / 'actress_alias.json').write_text(json.dumps(alias, ensure_ascii=False), encoding='utf-8')
+    (tmp_path / 'anime_ids.csv').write_text('# 注释\nglod,动漫番号\nHUNTB\n\n', encoding='utf-8')
+    return tmp_path
+
+
+def test_build_and_load(tmp_path):
+    data_dir = make_data_dir(tmp_path)
+    output = build(str(data_dir))
+    assert output == str(data_dir / BUNDLE_NAME)
+    bundle = _load(str(data_dir))
+    assert bundle.genre == {'genre_test.csv': {'1': '一', '2': ''}}
+    assert bundle.actress_index['楓カレン'] == '田中レモン'
+    assert bundle.anime_ids == ['GLOD', 'HUNTB']
+
+
+def test_invalidation(tmp_path, monkeypatch):
+    data_dir = make_data_dir(tmp_path)
+    build(str(data_dir))
+    compiled = []
+    original = datafiles._compile
+    monkeypatch.setattr(datafiles, '_compile', lambda sources: compiled.append(1) or original(sources))
+    _load(str(data_dir))
+    assert compiled == []
+    # 仅修改时间改变而内容不变时，通过哈希值确认数据仍然有效
+    csv_file = data_dir / 'genre_test.csv'
+    os.utime(csv_file, (1, 1))
+    _load(str(data_dir))
+    assert compiled == []
+    # 内容改变后重新编译
+    csv_file.write_text('id,url,translate\n1,u1,壱\n', encoding='utf-8-sig')
+    assert _load(str(data_dir)).genre['genre_test.csv'] == {'1': '壱'}
+    assert len(compiled) == 1
+    _load(str(data_dir))
+    assert len(compiled) == 1
+    # 新增的源文件也会触发重新编译
+    (data_dir / 'genre_new.csv').write_text('id,translate\nx,y\n', encoding='utf-8-sig')
+    assert _load(str(data_dir)).genre['genre_new.csv'] == {'x': 'y'}
+    # 损坏的文件
+    (data_dir / BUNDLE_NAME).write_bytes(b'garbage')
+    assert _load(str(data_dir)).anime_ids == ['GLOD', 'HUNTB']
+
+
+def test_genre_map():
+    from javsp.datatype import GenreMap
+    genre_map = GenreMap('data/genre_javbus.csv')
+    assert genre_map == datafiles.read_genre_csv(datafiles.resource_path('data/genre_javbus.csv'))
@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.web.base import urlretrieve
+
+
+DATA = os.urandom(300 * 1024)
+# 服务器收到的每个请求的Range和If-Range请求头
+ranges = []
+if_ranges = []
+
+
+def route(request):
+    if request.path == '/missing':
+        return 404, {}, b''
+    rng = request.headers.get('Range')
+    ranges.append(rng)
+    if_ranges.append(request.headers.get('If-Range'))
+    headers = {'ETag': '"v1"'}
+    if rng and request.path == '/badrange':
+        # 忽略请求的断点，总是返回从第10个字节开始的内容
+        headers['Content-Range'] = f'bytes 10-{len(DATA)-1}/{len(DATA)}'
+        return 206, headers, DATA[10:]
+    elif rng:
+        start = int(rng.split('=')[1].split('-')[0])
+        headers['Content-Range'] = f'bytes {start}-{len(DATA)-1}/{len(DATA)}'
+        return 206, headers, DATA[start:]
+    return 200, headers, DATA
+
+
+@pytest.fixture
+def server(serve):
+    ranges.clear()
+    if_ranges.clear()
+    return serve(route)
+
+
+def test_download_to_file(server, tmp_path):
+    target = str(tmp_path / 'cover.jpg')
+    reports = []
+    info = urlretrieve(f'{server}/cover.jpg', target, reporthook=lambda b, bs, size: reports.append((b, size)))
+    with open(target, 'rb') as f:
+        assert f.read() == DATA
+    assert not os.path.exists(target + '.part')
+    assert info['total'] == len(DATA)
+    assert reports[-1] == (len(DATA), len(DATA))
+    # 进度回调有频率限制，不会每个数据块都调用
+    assert len(reports) < 10
+
+
+def write_part(target, url, size):
+    with open(target + '.part', 'wb') as f:
+        f.write(DATA[:size])
+    with open(target + '.part.json', 'wt') as f:
+        json.dump({'url': url, 'etag': '"v1"', 'last_modified': None}, f)
+
+
+def test_resume_partial_file(server, tmp_path):
+    target = str(tmp_path / 'cover.jpg')
+    write_part(target, f'{server}/cover.jpg', 1000)
+    urlretrieve(f'{server}/cover.jpg', target)
+    assert ranges == ['bytes=1000-']
+    assert if_ranges == ['"v1"']
+    with open(target, 'rb') as f:
+        assert f.read() == DATA
+    assert not os.path.exists(target + '.part.json')
+
+
+def test_partial_file_of_other_url_is_discarded(server, tmp_path):
+    target = str(tmp_path / 'cover.jpg')
+    write_part(target, f'{server}/other.jpg', 1000)
+    urlretrieve(f'{server}/cover.jpg', target)
+    assert ranges == [None]
+    with open(target, 'rb') as f:
+        assert f.read() == DATA
+
+
+def test_mismatched_content_range_restarts(server, tmp_path):
+    target = str(tmp_path / 'cover.jpg')
+    write_part(target, f'{server}/badrange', 1000)
+    urlretrieve(f'{server}/badrange', target)
+    assert ranges == ['bytes=1000-', None]
+    with open(target, 'rb') as f:
+        assert f.read() == DATA
+
+
+def test_http_error_keeps_target_untouched(server, tmp_path):
+    import requests
+    target = str(tmp_path / 'cover.jpg')
+    with pytest.raises(requests.exceptions.HTTPError):
+        urlretrieve(f'{server}/missing', target)
+    assert not os.path.exists(target)
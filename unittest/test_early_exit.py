@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.__main__ import job_result, missing_keys, wait_jobs, wait_sufficient
+from javsp.crawler_pool import CrawlerPool
+from javsp.datatype import MovieInfo
+
+
+def make_info(**fields):
+    info = MovieInfo('ABC-123')
+    for k, v in fields.items():
+        setattr(info, k, v)
+    return info
+
+
+def job(info, delay=0):
+    """模拟抓取任务: 等待delay秒后返回抓取结果"""
+    def func():
+        time.sleep(delay)
+        return info
+    return func
+
+
+def test_missing_keys_follows_priority():
+    high = make_info(title='t', cover='c')
+    low = make_info(actress=['a'], uncensored=False)
+    assert missing_keys([high], ['title', 'cover', 'actress']) == {'actress'}
+    assert missing_keys([high, low], ['title', 'cover', 'actress', 'uncensored']) == set()
+
+
+def test_slow_low_priority_crawler_is_dropped():
+    with ThreadPoolExecutor(2) as executor:
+        futures = {
+            'fast': executor.submit(job(make_info(title='t', cover='c'))),
+            'slow': executor.submit(job(make_info(title='t2'), 1)),
+        }
+        start = time.monotonic()
+        result = wait_sufficient(futures, ['title', 'cover'], timeout=5)
+        assert time.monotonic() - start < 0.5
+    assert result == ['fast']
+
+
+def test_wait_for_all_when_fields_missing():
+    with ThreadPoolExecutor(2) as executor:
+        futures = {
+            'fast': executor.submit(job(make_info(title='t'))),
+            'slow': executor.submit(job(make_info(cover='c'), 0.2)),
+        }
+        result = wait_sufficient(futures, ['title', 'cover'], timeout=5)
+    assert result == ['fast', 'slow']
+
+
+def test_failed_crawler_does_not_count():
+    with ThreadPoolExecutor(2) as executor:
+        futures = {
+            'failed': executor.submit(job(None)),
+            'slow': executor.submit(job(make_info(title='t', cover='c'), 0.2)),
+        }
+        result = wait_sufficient(futures, ['title', 'cover'], timeout=5)
+    assert result == ['failed', 'slow']
+    assert job_result(futures['failed']) is None
+
+
+def test_wait_for_required_crawler():
+    with ThreadPoolExecutor(3) as executor:
+        futures = {
+            'fast': executor.submit(job(make_info(title='t', cover='c'))),
+            'slow': executor.submit(job(make_info(title='t2'), 1)),
+            'javdb': executor.submit(job(make_info(genre=['g']), 0.2)),
+        }
+        start = time.monotonic()
+        result = wait_sufficient(futures, ['title', 'cover'], timeout=5, required=['javdb'])
+        elapsed = time.monotonic() - start
+    # 等待javdb完成，但不等待其他低优先级的抓取器
+    assert 0.2 <= elapsed < 0.8
+    assert result == ['fast', 'javdb']
+
+
+def test_timeout_starts_when_job_runs():
+    # 线程池只有一个线程，第二个任务要排队等待第一个任务完成，排队的时间不计入超时
+    pool = CrawlerPool(1)
+    try:
+        futures = {
+            'first': pool.submit('first', job(make_info(title='t'), 0.3)),
+            'second': pool.submit('second', job(make_info(cover='c'), 0.3)),
+        }
+        assert futures['second'].job.started is None
+        wait_jobs(futures, timeout=0.5)
+        assert job_result(futures['first']) is not None
+        assert job_result(futures['second']) is not None
+    finally:
+        pool.shutdown()
@@ -0,0 +1,40 @@
+import io
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.__main__ import download_extrafanarts
+from javsp.datatype import Movie, MovieInfo
+
+
+def make_png():
+    buf = io.BytesIO()
+    Image.new('RGB', (40, 30), 'red').save(buf, format='PNG')
+    return buf.getvalue()
+
+
+PNG = make_png()
+
+
+def route(request):
+    if request.path.startswith('/missing'):
+        return 404, {}, b''
+    return 200, {}, PNG
+
+
+@pytest.fixture
+def server(serve):
+    return serve(route)
+
+
+def test_failed_still_does_not_fail_others(server, tmp_path):
+    movie = Movie('ABC-123')
+    movie.save_dir = str(tmp_path)
+    movie.info = MovieInfo('ABC-123')
+    movie.info.preview_pics = [f'{server}/{i}.png' for i in range(6)] + [f'{server}/missing.png']
+    assert download_extrafanarts(movie) == 6
+    names = sorted(os.listdir(tmp_path / 'extrafanart'))
+    assert names == [f'{i}.png' for i in range(6)]
@@ -7,7 +7,7 @@ from shutil import rmtree
 
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from javsp.file import scan_movies
+from javsp.file import scan_movies, iter_movies
 
 
 tmp_folder = 'TMP_' + ''.join(random.choices(string.ascii_uppercase, k=6))
@@ -226,3 +226,27 @@ def test_scan_movies__n_video_with_ad(prepare_files):
     assert len(movies) == 2
     assert movies[0].dvdid == 'ABC-123' and movies[1].dvdid == 'DEF-456'
     assert all(len(i.files) == 1 for i in movies)
+
+
+# 边扫描边返回影片：没有跨文件夹的重复番号时，结果（包括顺序）与scan_movies相同
+@pytest.mark.parametrize('files', [{'ABC-123/ABC-123-1.mp4': DEFAULT_SIZE, 'ABC-123/ABC-123-2.mp4': 1024,
+                                    'DEF-456/movie.mp4': DEFAULT_SIZE, 'sub/GHI-789.mp4': DEFAULT_SIZE,
+                                    'sub/sub2/JKL-012.CD1.mp4': DEFAULT_SIZE, 'sub/sub2/JKL-012.CD2.mp4': DEFAULT_SIZE}])
+def test_iter_movies(prepare_files):
+    expected = [(i.dvdid, i.files) for i in scan_movies(tmp_folder)]
+    movies = [(i.dvdid, i.files) for i in iter_movies(tmp_folder)]
+    assert movies == expected
+    assert len(movies) == 4
+    assert [os.path.basename(i) for i in movies[0][1]] == ['ABC-123-1.mp4', 'ABC-123-2.mp4']
+
+
+# 边扫描边返回影片：不同文件夹中有相同番号时只返回先序遍历中第一个文件夹中的影片。
+# 这与scan_movies（略过所有这些影片）不同，因此scanner.streaming默认关闭，启用时的区别在config.yml中有说明
+@pytest.mark.parametrize('files', [('A/ABC-123.mp4', 'B/ABC-123.mp4', 'B/C/ABC-123.mp4', 'C/DEF-456-1.mp4', 'C/DEF-456-2.mp4')])
+def test_iter_movies__cross_dir_duplicate(prepare_files):
+    assert [i.dvdid for i in scan_movies(tmp_folder)] == ['DEF-456']
+    for _ in range(5):
+        movies = list(iter_movies(tmp_folder))
+        assert [i.dvdid for i in movies] == ['ABC-123', 'DEF-456']
+        assert movies[0].files == [os.path.join(tmp_folder, 'A', 'ABC-123.mp4')]
+        assert len(movies[1].files) == 2
@@ -0,0 +1,72 @@
+import os
+import sys
+
+from requests.models import Response
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.web.base import detect_encoding, parse_html, _host_charsets
+
+
+def make_resp(url, content, content_type='text/html'):
+    r = Response()
+    r.url = url
+    r._content = content
+    r.headers['Content-Type'] = content_type
+    r.status_code = 200
+    return r
+
+
+def test_links_absolute():
+    page = b'''<html><body>
+<a id="rel" href="../movie/ABC-123">x</a>
+<a id="root" href="/search?q=1">x</a>
+<a id="proto" href="//img.example.net/a.jpg">x</a>
+<a id="ed2k" href="ed2k://|file|\xe6\x97\xa5\xe6\x9c\xac.mp4|123|ABCDEF|/">x</a>
+<a id="js" href="javascript:void(0)">x</a>
+<img id="lazy" data-src="pics/1.jpg" src="/blank.gif">
+<form id="form" action="post.php"></form>
+</body></html>'''
+    html = parse_html(page, 'utf-8', 'https://example.com/list/page.html')
+    get = lambda id, attr='href': html.get_element_by_id(id).get(attr)
+    assert get('rel') == 'https://example.com/movie/ABC-123'
+    assert get('root') == 'https://example.com/search?q=1'
+    assert get('proto') == 'https://img.example.net/a.jpg'
+    assert get('ed2k') == 'ed2k://|file|日本.mp4|123|ABCDEF|/'
+    assert get('js') == 'javascript:void(0)'
+    assert get('lazy', 'data-src') == 'https://example.com/list/pics/1.jpg'
+    assert get('lazy', 'src') == 'https://example.com/blank.gif'
+    assert get('form', 'action') == 'https://example.com/list/post.php'
+
+
+def test_base_href():
+    page = b'<html><head><base href="https://cdn.example.org/v2/"></head><body><a id="a" href="img/1.jpg">x</a></body></html>'
+    html = parse_html(page, 'utf-8', 'https://example.com/')
+    assert html.get_element_by_id('a').get('href') == 'https://cdn.example.org/v2/img/1.jpg'
+    assert not html.xpath('//base')
+
+
+def test_parse_encodings():
+    text = '<html><body><p>日本語のタイトル</p></body></html>'
+    for encoding in ['utf-8', 'utf_8', 'euc_jp', 'shift_jis', 'cp932', 'gbk']:
+        html = parse_html(text.encode(encoding), encoding)
+        assert html.xpath('//p/text()') == ['日本語のタイトル']
+    # 无法识别的编码名称按utf-8处理
+    html = parse_html(text.encode('utf-8'), 'x-unknown-charset')
+    assert html.xpath('//p/text()') == ['日本語のタイトル']
+
+
+def test_detect_encoding():
+    _host_charsets.clear()
+    body = '<html><body>' + 'これは日本語のテキストです。' * 50 + '</body></html>'
+    r = make_resp('https://a.example.com/1', body.encode('euc_jp'), 'text/html; charset=EUC-JP')
+    assert detect_encoding(r) == 'euc-jp'
+    meta = '<html><head><meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS"></head>'
+    r = make_resp('https://a.example.com/2', (meta + body).encode('shift_jis'))
+    assert detect_encoding(r) == 'shift_jis'
+    # 没有声明编码时进行检测，并记住该主机的编码
+    r = make_resp('https://b.example.com/1', body.encode('utf-8'))
+    encoding = detect_encoding(r)
+    assert r.content.decode(encoding) == body
+    assert _host_charsets['b.example.com'] == encoding
+    html = parse_html(r.content, encoding)
+    assert 'これは日本語' in html.text_content()
@@ -0,0 +1,111 @@
+import os
+import sys
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.web.httpcache import HttpCache
+
+
+class FakeServer():
+    def __init__(self, body=b'<html>ok</html>', etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.requests = []
+
+    def fetch(self, url):
+        def func(extra_headers):
+            self.requests.append(extra_headers)
+            r = Response()
+            r.url = url
+            if extra_headers.get('If-None-Match') == self.etag:
+                r.status_code = 304
+                r._content = b''
+            else:
+                r.status_code = 200
+                r._content = self.body
+            r.headers = CaseInsensitiveDict({'ETag': self.etag, 'Content-Type': 'text/html'})
+            return r
+        return func
+
+
+def test_fresh_entry_is_served_from_cache(tmp_path):
+    cache = HttpCache(str(tmp_path / 'http.db'), 1024 * 1024)
+    server = FakeServer()
+    url = 'https://example.com/a'
+    r1 = cache.get(url, {}, {}, server.fetch(url), ttl=60)
+    r2 = cache.get(url, {}, {}, server.fetch(url), ttl=60)
+    assert r1.content == r2.content == server.body
+    assert getattr(r2, 'from_cache', False)
+    assert len(server.requests) == 1
+    # 不同的cookies对应不同的缓存条目
+    cache.get(url, {}, {'over18': '1'}, server.fetch(url), ttl=60)
+    assert len(server.requests) == 2
+
+
+def test_stale_entry_is_revalidated(tmp_path):
+    cache = HttpCache(str(tmp_path / 'http.db'), 1024 * 1024)
+    server = FakeServer()
+    url = 'https://example.com/a'
+    cache.get(url, {}, {}, server.fetch(url), ttl=60)
+    cache.store.execute('UPDATE responses SET stored=0')
+    r = cache.get(url, {}, {}, server.fetch(url), ttl=60)
+    assert server.requests[-1] == {'If-None-Match': '"v1"'}
+    assert r.status_code == 200 and r.content == server.body
+    assert cache.revalidated == 1
+
+
+def test_lru_eviction(tmp_path):
+    cache = HttpCache(str(tmp_path / 'http.db'), 4096)
+    server = FakeServer(body=os.urandom(1500))
+    for i in range(5):
+        url = f'https://example.com/{i}'
+        cache.get(url, {}, {}, server.fetch(url), ttl=60)
+    assert cache.size() <= 4096
+    urls = [i[0] for i in cache.store.query('SELECT url FROM responses')]
+    assert 'https://example.com/4' in urls and 'https://example.com/0' not in urls
+
+
+def test_redirected_response_is_not_cached(tmp_path):
+    cache = HttpCache(str(tmp_path / 'http.db'), 1024 * 1024)
+    server = FakeServer()
+    url = 'https://example.com/v/ABC-123'
+
+    def fetch(extra_headers):
+        r = server.fetch('https://example.com/login')(extra_headers)
+        redirect = Response()
+        redirect.status_code = 302
+        r.history = [redirect]
+        return r
+    cache.get(url, {}, {}, fetch, ttl=60)
+    r = cache.get(url, {}, {}, fetch, ttl=60)
+    assert len(server.requests) == 2
+    assert r.history and r.url == 'https://example.com/login'
+    assert cache.size() == 0
+
+
+def test_running_size(tmp_path):
+    cache = HttpCache(str(tmp_path / 'http.db'), 1024 * 1024)
+    for key, n in [('a', 1000), ('b', 2000), ('a', 3000)]:
+        r = FakeServer(body=os.urandom(n)).fetch('https://example.com/' + key)({})
+        cache.put(key, r)
+    expected = cache.store.query('SELECT SUM(size) FROM responses')[0][0]
+    assert cache.size() == expected
+    # 重新打开时从数据库中读取
+    assert HttpCache(str(tmp_path / 'http.db'), 1024 * 1024).size() == expected
+
+
+def test_eviction_counts_other_processes(tmp_path):
+    db = str(tmp_path / 'http.db')
+    other = HttpCache(db, 1024 * 1024)
+    cache = HttpCache(db, 4096)
+    assert cache.size() == 0
+    # 另一个进程写入的条目不会反映在本进程的计数中，淘汰时需要以数据库为准
+    for i in range(4):
+        other.put(f'other{i}', FakeServer(body=os.urandom(2000)).fetch(f'https://example.com/o{i}')({}))
+    for i in range(3):
+        cache.put(f'own{i}', FakeServer(body=os.urandom(2000)).fetch(f'https://example.com/c{i}')({}))
+    actual = cache.store.query('SELECT SUM(size) FROM responses')[0][0]
+    assert actual <= 4096
+    assert cache.size() == actual
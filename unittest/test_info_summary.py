@@ -0,0 +1,54 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import javsp.__main__ as main
+from javsp.datatype import Movie, MovieInfo
+
+
+def make_info(genre, cover):
+    info = MovieInfo('ABC-123')
+    info.title = 'タイトル'
+    info.genre = genre
+    info.cover = cover
+    return info
+
+
+class FakeRegistry():
+    """只提供javbus和javdb两个抓取器，抓取结果为预先设置的数据"""
+    def __init__(self, data: dict) -> None:
+        self.data = data
+
+    def get(self, name):
+        if name not in self.data:
+            return None
+        def parse_data(info):
+            for k, v in vars(self.data[name]).items():
+                setattr(info, k, v)
+        return SimpleNamespace(load=lambda: True, parse_data=parse_data, self_retry=True)
+
+
+def test_crawler_names_are_kept(monkeypatch):
+    data = {'javbus': make_info(['a'], 'https://javbus/1.jpg'), 'javdb': make_info(['b'], 'https://javdb/1.jpg')}
+    monkeypatch.setattr(main, 'crawler_registry', FakeRegistry(data))
+    movie = Movie('ABC-123')
+    all_info = main.parallel_crawler(movie)
+    assert set(all_info) == {'javbus', 'javdb'}
+
+
+def test_javdb_genre_and_cover_policy():
+    movie = Movie('ABC-123')
+    all_info = {'javbus': make_info(['a'], 'https://javbus/1.jpg'), 'javdb': make_info(['b'], 'https://javdb/1.jpg')}
+    assert main.info_summary(movie, all_info)
+    # 总是采用javdb的genre
+    assert movie.info.genre == ['b']
+    # use_javdb_cover: fallback，javdb的封面排在最后
+    assert movie.info.covers == ['https://javbus/1.jpg', 'https://javdb/1.jpg']
+    assert movie.info.fallback_covers == ['https://javdb/1.jpg']
+    assert movie.info.cover == 'https://javbus/1.jpg'
+
+    movie = Movie('ABC-123')
+    all_info = {'javdb': make_info(['b'], 'https://javdb/1.jpg'), 'javbus': make_info(['a'], 'https://javbus/1.jpg')}
+    assert main.info_summary(movie, all_info)
+    assert movie.info.covers == ['https://javbus/1.jpg', 'https://javdb/1.jpg']
@@ -0,0 +1,84 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.journal import RunJournal, Step, config_fingerprint, dump_info, load_info
+from javsp.datatype import Movie, MovieInfo
+
+
+def make_movie(tmp_path, name='ABC-123.mp4'):
+    path = tmp_path / name
+    if not path.exists():
+        path.write_bytes(b'0' * 16)
+    movie = Movie('ABC-123')
+    movie.files = [str(path)]
+    return movie
+
+
+def test_record_and_resume(tmp_path):
+    db = str(tmp_path / 'journal.db')
+    movie = make_movie(tmp_path)
+    info = MovieInfo('ABC-123')
+    info.title = '标题'
+    info.covers = ['http://example.com/1.jpg']
+    journal = RunJournal(db)
+    journal.record(movie, Step.summarized, {'info': dump_info(info)})
+    journal.record(movie, Step.cover, ['http://example.com/1.jpg', 'fanart.jpg'])
+    journal.close()
+
+    # 模拟重新运行：新的Movie实例对应同一个文件
+    journal = RunJournal(db)
+    movie = make_movie(tmp_path)
+    assert journal.pending_count() == 1
+    assert journal.steps(movie) == [Step.summarized, Step.cover]
+    restored = load_info(journal.load(movie, Step.summarized)['info'])
+    assert restored.title == '标题' and restored.covers == info.covers
+    assert journal.load(movie, Step.nfo) is None
+    journal.finish(movie)
+    assert journal.pending_count() == 0
+
+
+def test_changed_file_is_a_new_movie(tmp_path):
+    journal = RunJournal(str(tmp_path / 'journal.db'))
+    movie = make_movie(tmp_path)
+    journal.record(movie, Step.crawled, {})
+    (tmp_path / 'ABC-123.mp4').write_bytes(b'1' * 32)
+    other = Movie('ABC-123')
+    other.files = [str(tmp_path / 'ABC-123.mp4')]
+    assert journal.done(movie, Step.crawled)
+    assert not journal.done(other, Step.crawled)
+
+
+def test_concurrent_writers(tmp_path):
+    journal = RunJournal(str(tmp_path / 'journal.db'))
+    movies = [make_movie(tmp_path, f'ABC-{i:03d}.mp4') for i in range(20)]
+    threads = [threading.Thread(target=journal.record, args=(m, Step.crawled, {'i': i})) for i, m in enumerate(movies)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    assert journal.pending_count() == 20
+    journal.close()
+
+
+def test_config_change_discards_records(tmp_path):
+    db = str(tmp_path / 'journal.db')
+    movie = make_movie(tmp_path)
+    journal = RunJournal(db, 'a')
+    journal.record(movie, Step.crawled, {})
+    journal.close()
+
+    journal = RunJournal(db, 'a')
+    assert journal.done(make_movie(tmp_path), Step.crawled)
+    journal.close()
+    # 配置修改后，以前抓取的数据不再有效
+    journal = RunJournal(db, 'b')
+    assert journal.pending_count() == 0
+    assert not journal.done(make_movie(tmp_path), Step.crawled)
+    journal.close()
+
+
+def test_config_fingerprint():
+    assert config_fingerprint() == config_fingerprint()
+    assert len(config_fingerprint()) == 40
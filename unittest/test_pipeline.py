@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.pipeline import Stage, Pipeline
+
+
+def test_all_items_pass_through():
+    stages = [Stage('double', lambda x: x * 2, 2), Stage('inc', lambda x: x + 1, 3)]
+    results = Pipeline(stages, queue_size=1).run(range(20))
+    assert sorted(results) == [i * 2 + 1 for i in range(20)]
+
+
+def test_failed_item_is_dropped():
+    errors = []
+    def fail_on_odd(x):
+        if x % 2:
+            raise ValueError(x)
+        return x
+    stages = [Stage('check', fail_on_odd), Stage('same', lambda x: x)]
+    pipe = Pipeline(stages, on_error=lambda stage, item, e: errors.append((stage.name, item)))
+    results = pipe.run(range(6))
+    assert sorted(results) == [0, 2, 4]
+    assert sorted(errors) == [('check', 1), ('check', 3), ('check', 5)]
+
+
+
+def test_dropped_item_is_reported():
+    dropped, done = [], []
+    stages = [Stage('filter', lambda x: x if x % 3 else None), Stage('same', lambda x: x)]
+    pipe = Pipeline(stages, on_done=done.append, on_drop=lambda stage, item: dropped.append((stage.name, item)))
+    pipe.run(range(7))
+    assert sorted(done) == [1, 2, 4, 5]
+    assert sorted(dropped) == [('filter', 0), ('filter', 3), ('filter', 6)]
+
+
+def test_stages_overlap():
+    """下游阶段处理前一个条目时，上游阶段应当已经在处理下一个条目"""
+    active = set()
+    overlapped = threading.Event()
+    lock = threading.Lock()
+    def make(name):
+        def func(x):
+            with lock:
+                active.add(name)
+                if len(active) > 1:
+                    overlapped.set()
+            time.sleep(0.05)
+            with lock:
+                active.discard(name)
+            return x
+        return func
+    stages = [Stage('a', make('a')), Stage('b', make('b'))]
+    Pipeline(stages).run(range(4))
+    assert overlapped.is_set()
@@ -0,0 +1,108 @@
+import io
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.image import parse_image_size
+from javsp.web.probe import probe_image, rank_covers
+
+
+def make_jpeg(width, height, exif=b''):
+    buf = io.BytesIO()
+    Image.new('RGB', (width, height), 'blue').save(buf, format='JPEG', exif=exif)
+    return buf.getvalue()
+
+
+FILES = {
+    '/big.jpg': ('image/jpeg', make_jpeg(800, 538)),
+    '/small.jpg': ('image/jpeg', make_jpeg(147, 200)),
+    '/small2.jpg': ('image/jpeg', make_jpeg(147, 200)),
+    '/medium.jpg': ('image/jpeg', make_jpeg(400, 269)),
+    '/page.jpg': ('text/html', b'<html>not found</html>'),
+    '/s3.jpg': ('binary/octet-stream', make_jpeg(800, 538)),
+    '/mislabeled.jpg': ('text/plain', make_jpeg(800, 538)),
+    # EXIF数据较大，SOF位于前16KiB之后
+    '/exif.jpg': ('image/jpeg', make_jpeg(800, 538, exif=b'Exif\x00\x00' + b'\x00' * 30000)),
+}
+
+
+def route(request):
+    if request.path not in FILES:
+        return 404, {}, b''
+    content_type, body = FILES[request.path]
+    headers = {'Content-Type': content_type}
+    rng = request.headers.get('Range')
+    if rng:
+        start, end = [int(i) for i in rng.split('=')[1].split('-')]
+        part = body[start:end+1]
+        headers['Content-Range'] = f'bytes {start}-{start+len(part)-1}/{len(body)}'
+        return 206, headers, part
+    return 200, headers, body
+
+
+@pytest.fixture
+def server(serve):
+    return serve(route)
+
+
+def test_probe_image(server):
+    result = probe_image(f'{server}/big.jpg')
+    assert result.ok
+    assert (result.width, result.height) == (800, 538)
+    assert result.size == len(FILES['/big.jpg'][1])
+    assert not probe_image(f'{server}/missing.jpg').ok
+    assert not probe_image(f'{server}/page.jpg').ok
+
+
+def test_rank_covers(server):
+    big_covers = [f'{server}/missing.jpg', f'{server}/page.jpg']
+    covers = [f'{server}/small.jpg', f'{server}/big.jpg', f'{server}/small2.jpg']
+    ranked = [i.url for i in rank_covers(big_covers, covers)]
+    # 探测失败的地址排在最后，仍然作为备选
+    assert ranked == [f'{server}/big.jpg', f'{server}/small.jpg', f'{server}/small2.jpg',
+                      f'{server}/missing.jpg', f'{server}/page.jpg']
+
+
+def test_probe_image_by_content(server):
+    for name in ('s3.jpg', 'mislabeled.jpg'):
+        result = probe_image(f'{server}/{name}')
+        assert result.ok and (result.width, result.height) == (800, 538)
+
+
+def test_parse_image_size_from_header_only():
+    for fmt in ('JPEG', 'PNG', 'WEBP', 'GIF'):
+        buf = io.BytesIO()
+        Image.new('RGB', (801, 537), 'red').save(buf, format=fmt)
+        assert parse_image_size(buf.getvalue()[:1024]) == (801, 537)
+    assert parse_image_size(b'<html>') is None
+
+
+def test_probe_jpeg_with_large_exif(server):
+    result = probe_image(f'{server}/exif.jpg')
+    assert result.ok and (result.width, result.height) == (800, 538)
+
+
+def test_fake_highres_cover_is_demoted(server):
+    big_covers = [f'{server}/small.jpg']
+    covers = [f'{server}/big.jpg']
+    ranked = [i.url for i in rank_covers(big_covers, covers)]
+    assert ranked == [f'{server}/big.jpg', f'{server}/small.jpg']
+
+
+def test_demoted_cover_ranks_after_normal_covers(server):
+    big_covers = [f'{server}/small2.jpg']
+    covers = [f'{server}/big.jpg', f'{server}/small.jpg']
+    ranked = [i.url for i in rank_covers(big_covers, covers)]
+    assert ranked == [f'{server}/big.jpg', f'{server}/small.jpg', f'{server}/small2.jpg']
+
+
+def test_fallback_cover_ranks_last_despite_resolution(server):
+    covers = [f'{server}/medium.jpg', f'{server}/big.jpg']
+    ranked = [i.url for i in rank_covers([], covers)]
+    assert ranked == [f'{server}/big.jpg', f'{server}/medium.jpg']
+    # javdb的带水印封面分辨率更高时也排在其他封面之后
+    ranked = [i.url for i in rank_covers([], covers, fallback=[f'{server}/big.jpg'])]
+    assert ranked == [f'{server}/medium.jpg', f'{server}/big.jpg']
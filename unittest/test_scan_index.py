@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import shutil
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.avid import get_recognizer
+from javsp.file import scan_movies, walk_videos
+from javsp.scan_index import ScanIndex
+
+
+def make_files(root, names):
+    for name in names:
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'0' * 16)
+
+
+def age_dirs(root):
+    """将所有文件夹的修改时间改为较早的时间，避免被视为刚刚修改过的文件夹"""
+    past = time.time() - 3600
+    for dirpath, _, _ in os.walk(root):
+        os.utime(dirpath, (past, past))
+
+
+def test_incremental_scan(tmp_path):
+    root = str(tmp_path / 'movies')
+    make_files(root, ['ABC-123.mp4', 'sub/DEF-456.mkv', 'sub/readme.txt', 'FC2-123456/Unknown.mp4', '.hidden/GHI-789.mp4'])
+    age_dirs(root)
+    index = ScanIndex(str(tmp_path / 'scan.db'))
+    recognizer = get_recognizer()
+    videos = index.scan(root, recognizer)
+    assert sorted(videos) == sorted(walk_videos(root, recognizer))
+    assert {i.dvdid for i in videos} == {'ABC-123', 'DEF-456', 'FC2-123456'}
+    assert index.stats == {'dirs': 3, 'listed': 3, 'files': 3, 'recognized': 3}
+
+    # 没有任何变化时不会重新列出文件夹，也不会重新识别番号
+    assert index.scan(root, recognizer) == videos
+    assert index.stats['listed'] == 0 and index.stats['recognized'] == 0
+
+    # 只有发生了变化的文件夹会被重新列出
+    make_files(root, ['sub/JKL-012.mp4'])
+    shutil.rmtree(os.path.join(root, 'FC2-123456'))
+    age_dirs(root)
+    videos = index.scan(root, recognizer)
+    assert [os.path.basename(i.path) for i in videos] == ['ABC-123.mp4', 'DEF-456.mkv', 'JKL-012.mp4']
+    assert index.stats['listed'] == 2 and index.stats['recognized'] == 1
+    assert index.store.query("SELECT COUNT(*) FROM dirs WHERE path LIKE '%FC2-123456%'") == [(0,)]
+    index.close()
+
+
+def test_recent_dir_is_relisted(tmp_path):
+    root = str(tmp_path / 'movies')
+    make_files(root, ['ABC-123.mp4'])
+    index = ScanIndex(str(tmp_path / 'scan.db'))
+    index.scan(root, get_recognizer())
+    # 刚刚修改过的文件夹在同一时间单位内可能还会变化，因此不记录其修改时间
+    index.scan(root, get_recognizer())
+    assert index.stats['listed'] == 1 and index.stats['recognized'] == 0
+
+
+def test_scan_movies_with_index(tmp_path):
+    root = str(tmp_path / 'movies')
+    make_files(root, ['ABC-123-1.mp4', 'ABC-123-2.mp4', 'sub/DEF-456.mp4'])
+    for name in ('ABC-123-1.mp4', 'ABC-123-2.mp4', 'sub/DEF-456.mp4'):
+        with open(os.path.join(root, name), 'wb') as f:
+            f.truncate(300 * 2**20)
+    age_dirs(root)
+    index = ScanIndex(str(tmp_path / 'scan.db'))
+    expected = [(i.dvdid, i.files) for i in scan_movies(root)]
+    for _ in range(2):
+        movies = scan_movies(root, index)
+        assert sorted((i.dvdid, i.files) for i in movies) == sorted(expected)
+
+
+def test_failed_dir_is_kept(tmp_path, monkeypatch):
+    from javsp import scan_index
+    root = str(tmp_path / 'movies')
+    make_files(root, ['sub/ABC-123.mp4', 'sub/deep/DEF-456.mp4'])
+    age_dirs(root)
+    index = ScanIndex(str(tmp_path / 'scan.db'))
+    recognizer = get_recognizer()
+    assert [i.dvdid for i in index.scan(root, recognizer)] == ['ABC-123', 'DEF-456']
+
+    # 文件夹暂时无法列出（如网络共享不稳定）
+    sub = os.path.join(root, 'sub')
+    real_stat = os.stat
+    def flaky_stat(path, *args, **kwargs):
+        if path == sub:
+            raise OSError('network error')
+        return real_stat(path, *args, **kwargs)
+    monkeypatch.setattr(scan_index.os, 'stat', flaky_stat)
+    assert index.scan(root, recognizer) == []
+    monkeypatch.setattr(scan_index.os, 'stat', real_stat)
+
+    # 恢复后上级文件夹虽然没有变化，无法访问过的文件夹仍会被重新列出
+    assert [i.dvdid for i in index.scan(root, recognizer)] == ['ABC-123', 'DEF-456']
+    assert index.stats['listed'] == 1
+    index.close()
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.web.session import session_get, session_stats
+
+
+def route(request):
+    return 200, {'Set-Cookie': 'sid=1'}, b'ok'
+
+
+@pytest.fixture
+def server(serve):
+    return serve(route)
+
+
+def test_connections_are_reused(server):
+    for i in range(5):
+        r = session_get(f'{server}/{i}', proxies={})
+        assert r.content == b'ok'
+    stats = session_stats()[server.split('//')[1]]
+    assert stats['requests'] == 5
+    assert stats['connections'] == 1
+    assert stats['reuse_ratio'] == pytest.approx(0.8)
+
+
+def test_response_cookies_are_not_shared(server):
+    session_get(f'{server}/a', proxies={})
+    r = session_get(f'{server}/b', proxies={})
+    assert 'Cookie' not in r.request.headers
+
+
+def redirect_route(request):
+    if request.path == '/login':
+        return 302, {'Set-Cookie': 'age_check=1; Path=/', 'Location': '/target'}, b''
+    return 200, {}, request.headers.get('Cookie', '').encode()
+
+
+def test_redirect_cookies_reach_target(serve):
+    server = serve(redirect_route)
+    r = session_get(f'{server}/login', proxies={})
+    assert r.history and r.content == b'age_check=1'
+    # 重定向过程中设置的cookie不能泄漏给后续的请求
+    r = session_get(f'{server}/target', proxies={})
+    assert r.content == b''
@@ -0,0 +1,56 @@
+import os
+import sys
+import pytest
+
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.slices import group_slices
+
+
+def basenames(files):
+    return [os.path.basename(i) for i in files]
+
+
+@pytest.mark.parametrize('files, expected', [
+    (['ABC-123-2.mp4', 'ABC-123-1.mp4'], ['ABC-123-1.mp4', 'ABC-123-2.mp4']),
+    (['ABC-123-CD2.mp4', 'ABC-123.mp4'], ['ABC-123.mp4', 'ABC-123-CD2.mp4']),
+    (['ABC-123 - Part2.mp4', 'ABC-123 - Part1.mp4'], ['ABC-123 - Part1.mp4', 'ABC-123 - Part2.mp4']),
+    ([f'ABC-123-{i}.mp4' for i in range(12, 0, -1)], [f'ABC-123-{i}.mp4' for i in range(1, 13)]),
+])
+def test_group_slices(files, expected):
+    group = group_slices('ABC-123', [os.path.join('dir', i) for i in files])
+    assert group.reason is None
+    assert basenames(group.files) == expected
+
+
+def test_group_slices__structured():
+    group = group_slices('ABC-123', ['ABC-123.CD2 .mp4', 'ABC-123.CD1.mp4'])
+    assert [(i.index, i.tag, i.postfix) for i in group.slices] == [(2, '2', '.mp4'), (1, '1', '.mp4')]
+    group = group_slices('ABC-123', ['ABC-123- B.mp4', 'ABC-123-a.mp4'])
+    assert group.files == ['ABC-123-a.mp4', 'ABC-123- B.mp4']
+    assert [i.index for i in group.slices] == [2, 1]
+
+
+@pytest.mark.parametrize('files, reason', [
+    (['ABC-123-1.mp4', 'ABC-123-第2部分.mp4'], '无法识别分片标识'),
+    (['ABC-123-1.mp4', 'ABC-123-2.mkv'], '后缀不一致'),
+    (['ABC-123-1.mp4', 'ABC-123-1 .mp4', 'ABC-123-3.mp4'], '分片编号重复'),
+    (['ABC-123-1.mp4', 'ABC-123-3.mp4'], '分片编号应从0/1/A开始且连续'),
+    (['ABC-123.mp4', 'ABC-123-C.mp4'], '分片编号应从0/1/A开始且连续'),
+])
+def test_group_slices__rejected(files, reason):
+    group = group_slices('ABC-123', files)
+    assert group.files is None
+    assert group.reason.startswith(reason)
+    assert len(group.slices) == len(files)
+
+
+def test_group_slices__anime_languages():
+    group = group_slices('ANIME:TEST', ['TEST.cht.mp4', 'TEST.简中.mp4', 'TEST.mkv'])
+    assert group.files == ['TEST.mkv', 'TEST.简中.mp4', 'TEST.cht.mp4']
+    assert [i.tag for i in group.slices] == ['cht', 'chs', 'raw']
+    # 动漫的分片仍然按分片处理
+    group = group_slices('ANIME:TEST', ['TEST 02.mp4', 'TEST 01.mp4'])
+    assert group.files == ['TEST 01.mp4', 'TEST 02.mp4']
+    group = group_slices('ANIME:TEST', ['TEST.chs.mp4', 'TEST.简体.mp4'])
+    assert group.files is None
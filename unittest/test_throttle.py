@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.web.throttle import TokenBucket, crawler_context, current_crawler
+
+
+def test_bucket_spacing():
+    bucket = TokenBucket(0.05, burst=1)
+    start = time.monotonic()
+    waits = [bucket.acquire() for _ in range(4)]
+    elapsed = time.monotonic() - start
+    assert waits[0] == 0
+    assert elapsed >= 0.14
+
+
+def test_bucket_burst():
+    bucket = TokenBucket(10, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    assert bucket.reserve() > 9
+
+
+def test_unlimited_bucket():
+    bucket = TokenBucket(0)
+    assert all(bucket.acquire() == 0 for _ in range(100))
+
+
+def test_crawler_context():
+    assert current_crawler() is None
+    with crawler_context('javsp.web.javdb'):
+        assert current_crawler() == 'javsp.web.javdb'
+        with crawler_context('javsp.web.javbus'):
+            assert current_crawler() == 'javsp.web.javbus'
+        assert current_crawler() == 'javsp.web.javdb'
+    assert current_crawler() is None
+
+
+def test_removed_config_keys(caplog):
+    import yaml
+    from pydantic_extra_types.pendulum_dt import Duration
+    from javsp.config import Cfg, CrawlerID
+    with open(os.path.join(os.path.dirname(__file__), '..', 'config.yml'), encoding='utf-8') as f:
+        data = yaml.safe_load(f)
+    # 旧版本的配置文件: 没有network.rate_limit，仍然使用已移除的配置项
+    del data['network']['rate_limit']
+    data['crawler']['sleep_after_scraping'] = 'PT2S'
+    data['summarizer']['extra_fanarts']['scrap_interval'] = 'PT1.5S'
+    cfg = Cfg.model_validate(data)
+    interval = Duration(seconds=2)
+    assert cfg.network.rate_limit.crawler == {CrawlerID.javdb: interval, CrawlerID.javlib: interval}
+    assert 'sleep_after_scraping' in caplog.text and 'scrap_interval' in caplog.text
@@ -0,0 +1,65 @@
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.walker import list_dir, parallel_walk, preorder_key
+
+
+def make_tree(root, names):
+    for name in names:
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'0' * 8)
+
+
+def test_list_dir(tmp_path):
+    root = str(tmp_path)
+    make_tree(root, ['b.mp4', 'a.MKV', 'c.txt', 'sub/x.mp4', '.hidden/y.mp4'])
+    os.symlink(os.path.join(root, 'sub'), os.path.join(root, 'link'))
+    listing = list_dir(root, {'.mp4', '.mkv'}, re.compile(r'^\.'))
+    assert listing.subdirs == ['sub']
+    assert [name for name, _ in listing.files] == ['a.MKV', 'b.mp4']
+    assert listing.files[1][1].st_size == 8
+    assert list_dir(os.path.join(root, 'missing'), {'.mp4'}, re.compile(r'^\.')) is None
+
+
+def test_parallel_walk(tmp_path):
+    root = str(tmp_path)
+    names = [f'd{i}/e{j}/f{k}.mp4' for i in range(5) for j in range(4) for k in range(3)] + ['skip/g.mp4']
+    make_tree(root, names)
+    ignore = re.compile('^skip$')
+
+    def visit(path, display):
+        listing = list_dir(path, {'.mp4'}, ignore)
+        return [(os.path.join(path, i), os.path.join(display, i)) for i in listing.subdirs], listing.files
+
+    results = list(parallel_walk(root, visit, workers=4))
+    assert len(results) == 1 + 5 + 5 * 4
+    found = {os.path.relpath(os.path.join(path, name), root) for path, _, files in results for name, _ in files}
+    assert found == {i.replace('/', os.sep) for i in names if not i.startswith('skip')}
+    # 按preorder_key排序后与os.walk（按名称排序）的先序遍历顺序一致
+    ordered = sorted((path for path, _, _ in results), key=lambda x: preorder_key(root, x))
+    expected = []
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames[:] = sorted(i for i in dirnames if not ignore.match(i))
+        expected.append(dirpath)
+    assert ordered == expected
+
+
+def test_parallel_walk_ordered(tmp_path):
+    import time
+    root = str(tmp_path)
+    names = [f'd{i}/e{j}/f.mp4' for i in range(4) for j in range(3)]
+    make_tree(root, names)
+
+    def visit(path, display):
+        # 先序遍历中靠前的文件夹处理得更慢，使完成顺序与先序遍历的顺序不同
+        time.sleep(0.02 if os.path.basename(path) in ('d0', 'e0') else 0)
+        listing = list_dir(path, {'.mp4'}, re.compile('^$'))
+        return [(os.path.join(path, i), os.path.join(display, i)) for i in listing.subdirs], None
+
+    paths = [path for path, _, _ in parallel_walk(root, visit, workers=4, ordered=True)]
+    assert paths == sorted(paths, key=lambda x: preorder_key(root, x))
+    assert len(paths) == 1 + 4 + 4 * 3
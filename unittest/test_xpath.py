@@ -0,0 +1,62 @@
+import os
+import sys
+
+import lxml.html
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from javsp.web.xpath import XPathRegistry, xpath_stats
+
+
+PAGE = '''<html><body>
+<div class="info">
+  <p><span>識別碼:</span> <span>ABC-123</span></p>
+  <p><span>長度:</span> 120分鐘</p>
+  <a href="/genre/1">g1</a>
+</div>
+<div class="other"><a href="/genre/2">g2</a></div>
+</body></html>'''
+
+
+def test_registry():
+    xp = XPathRegistry('test.sample', {
+        'info': "//div[@class='info']",
+        'field': "p/span[text()=$label]",
+        'links_all': "//a/text()",
+        'links_inside': ".//a/text()",
+        'count': "count(//a)",
+    })
+    html = lxml.html.fromstring(PAGE)
+    info = xp.info(html)[0]
+    assert xp.field(info, label='識別碼:')[0].getnext().text == 'ABC-123'
+    assert xp.field(info, label='長度:')[0].tail.strip() == '120分鐘'
+    assert xp.field(info, label='不存在:') == []
+    assert xp.field.first(info, label='不存在:', default='x') == 'x'
+    # '//'总是从整个文档查找，'.//'只查找节点内部
+    assert xp.links_all(info) == ['g1', 'g2']
+    assert xp.links_inside(info) == ['g1']
+    assert type(xp.links_inside(info)[0]) is str
+    assert xp.count.first(html) == 2.0
+    assert xp['info'] is xp.info
+    assert len(xp) == 5
+    with pytest.raises(AttributeError):
+        xp.undefined
+    with pytest.raises(ValueError):
+        xp.add('info', '//div')
+
+    stats = {i['name']: i for i in xpath_stats()}
+    assert stats['sample.field']['calls'] == 4
+    assert stats['sample.field']['path'] == "p/span[text()=$label]"
+    assert stats['sample.info']['elapsed'] > 0
+
+
+def test_syntax_error():
+    with pytest.raises(Exception):
+        XPathRegistry('test.bad', {'bad': "//div[@class='x'"})
+
+
+def test_crawler_registries():
+    from javsp.web import avsox, fanza, javbus
+    assert len(fanza.xp) > 0
+    for mod in (avsox, javbus):
+        assert len(mod.crawler.xp) == len(mod.crawler.fields) + len(mod.crawler.scopes) + len(mod.crawler.exprs)